@@ -1,5 +1,6 @@
 from django.contrib import admin
 from restaurants.models import DietType, Restaurant, Table, Diner
+from restaurants.models.archived_reservation import ArchivedReservation
 from restaurants.models.reservation import Reservation
 
 
@@ -11,6 +12,10 @@ class ReservationAdmin(admin.ModelAdmin):
     list_display = 'datetime',
 
 
+class ArchivedReservationAdmin(admin.ModelAdmin):
+    list_display = ('datetime', 'table', 'archived_at')
+
+
 class RestaurantAdmin(admin.ModelAdmin):
     list_display = ('name', 'location_lat', 'location_long', 'open_time', 'close_time')
 
@@ -25,6 +30,7 @@ class DinerAdmin(admin.ModelAdmin):
 
 admin.site.register(DietType, DietTypeAdmin)
 admin.site.register(Reservation, ReservationAdmin)
+admin.site.register(ArchivedReservation, ArchivedReservationAdmin)
 admin.site.register(Restaurant, RestaurantAdmin)
 admin.site.register(Table, TableAdmin)
 admin.site.register(Diner, DinerAdmin)
@@ -0,0 +1,50 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, MANY_RELATION_KWARGS
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        return self.child_relation.to_internal_values(data)
+
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    Primary key related field that, used with many=True, fetches all the related objects with a single query instead of
+    one query per primary key. The errors are the same as the ones of PrimaryKeyRelatedField.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_values(self, data) -> list:
+        queryset = self.get_queryset()
+        model_pk_field = queryset.model._meta.pk
+
+        items = []
+        pks = []
+        for item in data:
+            if self.pk_field is not None:
+                item = self.pk_field.to_internal_value(item)
+            try:
+                pks.append(model_pk_field.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+            items.append(item)
+
+        instances = queryset.in_bulk(pks)
+
+        for item, pk in zip(items, pks):
+            if pk not in instances:
+                self.fail('does_not_exist', pk_value=item)
+
+        return [instances[pk] for pk in pks]
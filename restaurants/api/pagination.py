@@ -0,0 +1,115 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+import rest_framework.exceptions
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from restaurants.services.ranking import RankedRestaurants
+from restaurants.services.restaurants_service import AvailableRestaurants
+
+
+class RestaurantsCursorPagination(BasePagination):
+    """
+    Keyset pagination of the restaurants search. The ranked restaurants are paginated on (total distance, id) and the
+    unsorted ones on id, so every page is read with the same cost no matter how deep it is. The restaurants with
+    available slots are paginated on the same keys.
+
+    The cursor is opaque for the clients, it holds the key of the last restaurant of the page and the amount of
+    restaurants already returned (needed to honor the search limit). The total count of restaurants is only computed
+    when it is requested with count=true.
+    """
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+
+    def __init__(self) -> None:
+        self.request = None
+        self.next_cursor = None
+        self.count = None
+
+    def encode_cursor(self, cursor: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded_cursor = request.query_params.get(self.cursor_query_param)
+        if encoded_cursor is None:
+            return None
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded_cursor.encode()).decode())
+            after_id = cursor['i']
+            position = cursor['p']
+            total_distance = cursor.get('d')
+            if not isinstance(after_id, int) or not isinstance(position, int) or position < 0:
+                raise ValueError()
+            if total_distance is not None and not isinstance(total_distance, (int, float)):
+                raise ValueError()
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+            raise rest_framework.exceptions.ValidationError({self.cursor_query_param: ['Invalid cursor.']})
+
+        return {'i': after_id, 'p': position, 'd': total_distance}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        cursor = self.decode_cursor(request)
+        position = cursor['p'] if cursor else 0
+
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+
+        if isinstance(queryset, (RankedRestaurants, AvailableRestaurants)):
+            limit = queryset.limit
+            after = None
+            if cursor:
+                is_ranked = not isinstance(queryset, AvailableRestaurants) or queryset.ranked
+                if is_ranked and cursor['d'] is None:
+                    raise rest_framework.exceptions.ValidationError({self.cursor_query_param: ['Invalid cursor.']})
+                after = (cursor['d'], cursor['i'])
+        else:
+            # The search limit of the unsorted restaurants is the slice of the queryset, the pages are read from the
+            # whole queryset after the last id instead
+            limit = queryset.query.high_mark if queryset.query.is_sliced else None
+            queryset = queryset.all()
+            queryset.query.clear_limits()
+
+        # One restaurant more than the page size is read to know if there is a next page
+        qty = self.page_size + 1
+        if limit is not None:
+            qty = min(qty, limit - position)
+
+        if isinstance(queryset, (RankedRestaurants, AvailableRestaurants)):
+            page = queryset.get_page_after(after, qty)
+        else:
+            if cursor:
+                queryset = queryset.filter(id__gt=cursor['i'])
+            page = list(queryset.order_by('id')[:max(qty, 0)])
+
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            last_restaurant = page[-1]
+            next_cursor = {'i': last_restaurant.id, 'p': position + len(page)}
+            if hasattr(last_restaurant, 'total_distance'):
+                next_cursor['d'] = last_restaurant.total_distance
+            self.next_cursor = next_cursor
+
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_cursor))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return Response(response)
@@ -1,20 +1,48 @@
-from datetime import timezone, datetime
+from collections import OrderedDict
+from datetime import timezone, timedelta
 from rest_framework import serializers
-from rest_framework.relations import PrimaryKeyRelatedField
 
+from restaurants.api.fields import BulkPrimaryKeyRelatedField
 from restaurants.models import Diner, Restaurant, DietType, Table
 from restaurants.models.reservation import Reservation
+from restaurants.services.ranking import DistanceScorer
 
 
 class FindRestaurantsValidator(serializers.Serializer):
-    diners = PrimaryKeyRelatedField(allow_empty=True, many=True, queryset=Diner.objects.all())
+    diners = BulkPrimaryKeyRelatedField(allow_empty=True, many=True, queryset=Diner.objects.all())
     target_datetime = serializers.DateTimeField(default_timezone=timezone.utc, allow_null=True)
+    metric = serializers.ChoiceField(choices=DistanceScorer.metrics, default='euclidean')
+    max_distance_km = serializers.FloatField(min_value=0, allow_null=True, default=None)
+    limit = serializers.IntegerField(min_value=1, allow_null=True, default=None)
+
+    def validate(self, attrs):
+        if attrs['max_distance_km'] is not None and not attrs['diners']:
+            raise serializers.ValidationError({'max_distance_km': ['The distance can only be used with diners.']})
+        return attrs
+
+
+class AvailableSlotsValidator(serializers.Serializer):
+    window_start = serializers.DateTimeField(default_timezone=timezone.utc)
+    window_end = serializers.DateTimeField(default_timezone=timezone.utc)
+    step = serializers.IntegerField(min_value=5, max_value=240, default=30)
+    limit = serializers.IntegerField(min_value=1, allow_null=True, default=None)
+
+    def validate(self, attrs):
+        if attrs['window_end'] < attrs['window_start']:
+            raise serializers.ValidationError({'window_end': ['The window can not end before it starts.']})
+        if attrs['window_end'] - attrs['window_start'] > timedelta(days=1):
+            raise serializers.ValidationError({'window_end': ['The window can not be longer than a day.']})
+        return attrs
+
+
+class RestaurantsQueryParamsValidator(serializers.Serializer):
+    match = serializers.ChoiceField(choices=['all', 'any'], default='all')
 
 
 class DietTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = DietType
-        fields = '__all__'
+        exclude = ['bit']
 
 
 class RestaurantSerializer(serializers.ModelSerializer):
@@ -22,10 +50,80 @@ class RestaurantSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Restaurant
-        fields = '__all__'
+        exclude = ['diet_endorsement_mask', 'grid_cell']
+
+
+class RestaurantReadListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        restaurants_page = list(data)
+
+        # The diet types of the whole page are read in a single query
+        diet_types_by_restaurant = {restaurant.id: [] for restaurant in restaurants_page}
+        diet_endorsements = Restaurant.diet_endorsement_types.through.objects.filter(
+            restaurant_id__in=diet_types_by_restaurant.keys()
+        ).order_by('diettype_id').values_list('restaurant_id', 'diettype_id', 'diettype__name')
+        for restaurant_id, diet_type_id, diet_type_name in diet_endorsements:
+            diet_types_by_restaurant[restaurant_id].append(
+                OrderedDict([('id', diet_type_id), ('name', diet_type_name)])
+            )
+
+        return [
+            self.child.get_representation(restaurant, diet_types_by_restaurant[restaurant.id])
+            for restaurant in restaurants_page
+        ]
+
+
+class RestaurantReadSerializer(serializers.BaseSerializer):
+    """
+    Read only version of RestaurantSerializer for the search results, with the same representation. The dicts are
+    built directly instead of field by field, and with many=True the diet types of all the restaurants are read at once.
+    """
+
+    time_field = serializers.TimeField()
+
+    class Meta:
+        list_serializer_class = RestaurantReadListSerializer
+
+    def to_representation(self, instance):
+        diet_types = [
+            OrderedDict([('id', diet_type.id), ('name', diet_type.name)])
+            for diet_type in instance.diet_endorsement_types.order_by('id')
+        ]
+        return self.get_representation(instance, diet_types)
+
+    def get_representation(self, restaurant: Restaurant, diet_types: list) -> OrderedDict:
+        return OrderedDict([
+            ('id', restaurant.id),
+            ('diet_endorsement_types', diet_types),
+            ('name', restaurant.name),
+            ('open_time', self.time_field.to_representation(restaurant.open_time)),
+            ('close_time', self.time_field.to_representation(restaurant.close_time)),
+            ('location_lat', float(restaurant.location_lat)),
+            ('location_long', float(restaurant.location_long)),
+        ])
 
 
 class ReservationSerializer(serializers.ModelSerializer):
+    diners = BulkPrimaryKeyRelatedField(allow_empty=False, many=True, queryset=Diner.objects.all())
+    table = serializers.PrimaryKeyRelatedField(queryset=Table.objects.select_related('restaurant'))
+
     class Meta:
         model = Reservation
-        fields = ['id', 'diners', 'table', 'datetime']
\ No newline at end of file
+        fields = ['id', 'diners', 'table', 'datetime']
+
+
+class ReservationsBatchItemValidator(serializers.Serializer):
+    # The diners and the table of all the batch are fetched at once, only their ids are validated here
+    diners = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    table = serializers.IntegerField()
+    datetime = serializers.DateTimeField(default_timezone=timezone.utc)
+
+
+class ReservationsBatchValidator(serializers.Serializer):
+    reservations = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=100)
+
+
+class BestFitReservationValidator(serializers.Serializer):
+    diners = BulkPrimaryKeyRelatedField(allow_empty=False, many=True, queryset=Diner.objects.all())
+    restaurant = serializers.PrimaryKeyRelatedField(queryset=Restaurant.objects.all())
+    datetime = serializers.DateTimeField(default_timezone=timezone.utc)
@@ -1,11 +1,15 @@
 from django.urls import path
 
-from restaurants.api.views import RestaurantsView, ReservationsView
+from restaurants.api.views import RestaurantsView, ReservationsView, RestaurantsSearchCacheView, \
+    ReservationsBatchView, RestaurantsAvailableSlotsView
 
 app_name = 'restaurants'
 
 urlpatterns = [
     path('restaurants/', RestaurantsView.as_view()),
+    path('restaurants/available-slots/', RestaurantsAvailableSlotsView.as_view()),
+    path('restaurants/search-cache/', RestaurantsSearchCacheView.as_view()),
     path('reservations/', ReservationsView.as_view()),
+    path('reservations/batch/', ReservationsBatchView.as_view()),
     path('reservations/<pk>', ReservationsView.as_view(), name='delete_reservation'),
 ]
\ No newline at end of file
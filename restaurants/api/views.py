@@ -1,36 +1,49 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.serializers import DateTimeField
 from rest_framework.views import APIView
 
+import restaurants.services.metrics
 import restaurants.services.restaurants_service
+import restaurants.services.search_cache
 import rest_framework.exceptions
-from rest_framework.pagination import PageNumberPagination
 
 from restaurants import custom_errors
-from restaurants.api.serializers import RestaurantSerializer, ReservationSerializer
+from restaurants.api.pagination import RestaurantsCursorPagination
+from restaurants.api.serializers import RestaurantReadSerializer, ReservationSerializer, RestaurantsQueryParamsValidator
+from restaurants.middleware import profile_duration
 from restaurants.models.reservation import Reservation
 
 
-def get_validation_error_response(validation_error: rest_framework.exceptions.ValidationError, http_status_code: int):
-    response = {
+def get_validation_error_data(validation_error: rest_framework.exceptions.ValidationError) -> dict:
+    return {
         'errors': {
             'display_error': 'Validation Error',
             'field_errors': validation_error.detail
         }
     }
-    return Response(response, status=http_status_code)
 
 
-def get_business_requirement_error_response(business_logic_error: custom_errors.BusinessError, http_status_code):
-    response = {
+def get_validation_error_response(validation_error: rest_framework.exceptions.ValidationError, http_status_code: int):
+    return Response(get_validation_error_data(validation_error), status=http_status_code)
+
+
+def get_business_requirement_error_data(business_logic_error: custom_errors.BusinessError) -> dict:
+    if restaurants.services.metrics.is_enabled():
+        restaurants.services.metrics.business_errors.inc(code=business_logic_error.error_code)
+    return {
         'errors': {
             'display_error': business_logic_error.message,
             'internal_error_code': business_logic_error.error_code
         }
     }
-    return Response(response, status=http_status_code)
+
+
+def get_business_requirement_error_response(business_logic_error: custom_errors.BusinessError, http_status_code):
+    return Response(get_business_requirement_error_data(business_logic_error), status=http_status_code)
 
 
 class RestaurantsView(APIView):
@@ -42,22 +55,82 @@ class RestaurantsView(APIView):
         target_datetime_str = self.request.query_params.get('target_datetime', default=None)
 
         try:
-            restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
-                diners=diners_ids,
-                target_datetime=target_datetime_str
-            )
+            query_params_validator = RestaurantsQueryParamsValidator(data=self.request.query_params)
+            query_params_validator.is_valid(raise_exception=True)
+
+            with restaurants.services.metrics.time_service('find_restaurants'):
+                # In the "all" mode the restaurants must match every diet restriction of every diner, in the "any"
+                # mode they must match at least one diet restriction of every diner
+                restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
+                    diners=diners_ids,
+                    target_datetime=target_datetime_str,
+                    or_version=query_params_validator.validated_data['match'] == 'any',
+                    metric=self.request.query_params.get('metric', default='euclidean'),
+                    max_distance_km=self.request.query_params.get('max_distance_km', default=None),
+                    limit=self.request.query_params.get('limit', default=None)
+                )
+
+                # PAGINATION
+                paginator = RestaurantsCursorPagination()
+                page = paginator.paginate_queryset(restaurants_qs, request)
+        except rest_framework.exceptions.ValidationError as e:
+            return get_validation_error_response(validation_error=e, http_status_code=400)
+
+        with profile_duration(request, 'serialize'):
+            data = RestaurantReadSerializer(page, many=True).data
+        return paginator.get_paginated_response(data)
+
+
+class RestaurantsAvailableSlotsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+
+        try:
+            query_params_validator = RestaurantsQueryParamsValidator(data=self.request.query_params)
+            query_params_validator.is_valid(raise_exception=True)
+
+            with restaurants.services.metrics.time_service('find_available_slots'):
+                available_restaurants = restaurants.services.restaurants_service.find_available_slots(
+                    diners=self.request.query_params.getlist('diners', default=None),
+                    window_start=self.request.query_params.get('window_start', default=None),
+                    window_end=self.request.query_params.get('window_end', default=None),
+                    step=self.request.query_params.get('step', default=30),
+                    or_version=query_params_validator.validated_data['match'] == 'any',
+                    metric=self.request.query_params.get('metric', default='euclidean'),
+                    max_distance_km=self.request.query_params.get('max_distance_km', default=None),
+                    limit=self.request.query_params.get('limit', default=None)
+                )
+
+                # PAGINATION
+                paginator = RestaurantsCursorPagination()
+                page = paginator.paginate_queryset(available_restaurants, request)
         except rest_framework.exceptions.ValidationError as e:
             return get_validation_error_response(validation_error=e, http_status_code=400)
 
-        # PAGINATION
-        paginator = PageNumberPagination()
-        page = paginator.paginate_queryset(restaurants_qs, request)
-        if page is not None:
-            serializer = RestaurantSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+        with profile_duration(request, 'serialize'):
+            restaurants_data = RestaurantReadSerializer(page, many=True).data
+            datetime_field = DateTimeField()
+            results = [
+                {
+                    'restaurant': restaurant_data,
+                    'slots': [
+                        datetime_field.to_representation(start_datetime)
+                        for start_datetime in restaurant.free_start_datetimes
+                    ]
+                }
+                for restaurant_data, restaurant in zip(restaurants_data, page)
+            ]
+        return paginator.get_paginated_response(results)
+
+
+class RestaurantsSearchCacheView(APIView):
+    permission_classes = [AllowAny]
 
-        serializer = RestaurantSerializer(restaurants_qs, many=True)
-        return Response(serializer.data)
+    def get(self, request):
+        response = {'enabled': restaurants.services.search_cache.is_enabled()}
+        response.update(restaurants.services.search_cache.get_stats())
+        return Response(response)
 
 
 class ReservationsView(APIView):
@@ -68,13 +141,22 @@ class ReservationsView(APIView):
         diners_ids = request.data.get('diners')
         target_datetime_str = request.data.get('target_datetime')
         table_id = request.data.get('table')
+        restaurant_id = request.data.get('restaurant')
 
         try:
-            new_reservation = restaurants.services.restaurants_service.create_reservation(
-                diners=diners_ids,
-                target_datetime=target_datetime_str,
-                table=table_id
-            )
+            if table_id is None and restaurant_id is not None:
+                # The smallest free table of the restaurant that can hold the diners is booked
+                new_reservation = restaurants.services.restaurants_service.create_best_fit_reservation(
+                    diners=diners_ids,
+                    target_datetime=target_datetime_str,
+                    restaurant=restaurant_id
+                )
+            else:
+                new_reservation = restaurants.services.restaurants_service.create_reservation(
+                    diners=diners_ids,
+                    target_datetime=target_datetime_str,
+                    table=table_id
+                )
         except rest_framework.exceptions.ValidationError as e:
             return get_validation_error_response(validation_error=e, http_status_code=400)
         except custom_errors.DinerWithOverlappingReservationError as e:
@@ -87,11 +169,43 @@ class ReservationsView(APIView):
             return get_business_requirement_error_response(business_logic_error=e, http_status_code=409)
         except custom_errors.RestaurantDoesntMatchAllDinersDietRestrictionsError as e:
             return get_business_requirement_error_response(business_logic_error=e, http_status_code=409)
+        except custom_errors.NoFreeTableError as e:
+            return get_business_requirement_error_response(business_logic_error=e, http_status_code=409)
 
-        reservation_serializer = ReservationSerializer(new_reservation)
-        return Response(reservation_serializer.data, status=200)
+        with profile_duration(request, 'serialize'):
+            data = ReservationSerializer(new_reservation).data
+        return Response(data, status=200)
 
     def delete(self, request, pk):
         reservation = get_object_or_404(Reservation, pk=pk)
         reservation.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ReservationsBatchView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+
+        try:
+            results = restaurants.services.restaurants_service.create_reservations(
+                reservations=request.data.get('reservations')
+            )
+        except rest_framework.exceptions.ValidationError as e:
+            return get_validation_error_response(validation_error=e, http_status_code=400)
+
+        with profile_duration(request, 'serialize'):
+            # The diners of all the new reservations are read at once for the serializer
+            prefetch_related_objects([result for result in results if isinstance(result, Reservation)], 'diners')
+
+            # Every reservation of the batch gets the status code and the body it would get from ReservationsView
+            response_results = []
+            for result in results:
+                if isinstance(result, Reservation):
+                    response_results.append({'status_code': 200, 'reservation': ReservationSerializer(result).data})
+                elif isinstance(result, rest_framework.exceptions.ValidationError):
+                    response_results.append({'status_code': 400, **get_validation_error_data(result)})
+                else:
+                    response_results.append({'status_code': 409, **get_business_requirement_error_data(result)})
+
+        return Response({'results': response_results}, status=200)
@@ -48,3 +48,15 @@ class RestaurantDoesntMatchAllDinersDietRestrictionsError(BusinessError):
 
     def __init__(self) -> None:
         self.message = "The restaurant doesn't match all diners diet restrictions"
+
+
+class NoFreeTableError(BusinessError):
+    error_code = '40906'
+
+    def __init__(self, diners_qty, target_datetime) -> None:
+        self.diners_qty = diners_qty
+        self.target_datetime = target_datetime
+        self.message = "The restaurant has no free table for {} diners on the selected datetime ({})".format(
+            diners_qty,
+            target_datetime
+        )
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from restaurants.services.archive import archive_reservations, get_archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Moves the reservations that ended more than the retention days ago, with their diners, to the archive. ' \
+           'With --loop it keeps archiving every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.RESERVATIONS_RETENTION_DAYS)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds between the runs of the loop.')
+
+    def handle(self, *args, **options):
+        if options['retention_days'] < 0:
+            raise CommandError('--retention-days can\'t be negative')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        while True:
+            cutoff = get_archive_cutoff(options['retention_days'])
+            archived_qty = archive_reservations(cutoff, chunk_size=options['chunk_size'])
+            self.stdout.write('Archived {} reservations that ended before {}'.format(archived_qty, cutoff.isoformat()))
+
+            if not options['loop']:
+                return
+            # The connection is reopened after the wait when it broke or it is too old, like in the requests
+            close_old_connections()
+            time.sleep(options['interval'])
+            close_old_connections()
@@ -0,0 +1,98 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Sqrt, Power
+
+from restaurants.models import Restaurant
+from restaurants.models.restaurant import get_grid_cell
+from restaurants.services.ranking import DistanceScorer, RankedRestaurants
+
+
+class Command(BaseCommand):
+    help = 'Compares the database sort of the restaurants by total distance with the top-K ranking. The restaurants ' \
+           'are created in a transaction that is rolled back at the end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--diners', type=int, default=4)
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        randomizer = random.Random(options['seed'])
+        diners_coordinates = [
+            (randomizer.uniform(19.2, 19.6), randomizer.uniform(-99.3, -99.0)) for _ in range(options['diners'])
+        ]
+
+        results = []
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.create_restaurants(size, randomizer)
+                results.append({
+                    'restaurants': size,
+                    'k': options['k'],
+                    'db_sort': self.measure(
+                        lambda: self.get_db_sorted_top(diners_coordinates, options['k']),
+                        options['repeat']
+                    ),
+                    'top_k': self.measure(
+                        lambda: self.get_top_k(diners_coordinates, options['k']),
+                        options['repeat']
+                    ),
+                })
+                transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def create_restaurants(self, size, randomizer):
+        restaurants = []
+        for i in range(size):
+            lat = randomizer.uniform(14.5, 32.7)
+            long = randomizer.uniform(-117.1, -86.7)
+            restaurants.append(Restaurant(
+                name='Benchmark restaurant {}'.format(i),
+                open_time='08:00:00',
+                close_time='23:00:00',
+                location_lat=lat,
+                location_long=long,
+                grid_cell=get_grid_cell(lat, long)
+            ))
+        Restaurant.objects.bulk_create(restaurants, batch_size=500)
+
+    def get_db_sorted_top(self, diners_coordinates, k):
+        # The ranking as it was done before the vectorized scorer, one distance expression per diner
+        total_distance_expr = Value(0)
+        for lat, long in diners_coordinates:
+            total_distance_expr += Sqrt(Power(lat - F('location_lat'), 2) + Power(long - F('location_long'), 2))
+        return [
+            restaurant.id for restaurant in
+            Restaurant.objects.annotate(total_distance=total_distance_expr).order_by('total_distance')[:k]
+        ]
+
+    def get_top_k(self, diners_coordinates, k):
+        ranked_restaurants = RankedRestaurants(Restaurant.objects.all(), DistanceScorer(diners_coordinates))
+        return [restaurant.id for restaurant in ranked_restaurants[0:k]]
+
+    def measure(self, function, repeat):
+        durations = []
+        peak_memory = 0
+        for _ in range(repeat):
+            tracemalloc.start()
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        return {
+            'median_ms': round(statistics.median(durations) * 1000, 2),
+            'min_ms': round(min(durations) * 1000, 2),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
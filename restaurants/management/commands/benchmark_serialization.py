@@ -0,0 +1,94 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from restaurants.api.serializers import RestaurantSerializer, RestaurantReadSerializer
+from restaurants.models import DietType, Restaurant
+from restaurants.models.restaurant import get_grid_cell
+
+
+class Command(BaseCommand):
+    help = 'Compares RestaurantSerializer with RestaurantReadSerializer on pages of restaurants. The restaurants are ' \
+           'created in a transaction that is rolled back at the end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[20, 100, 1000])
+        parser.add_argument('--diet-types', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        randomizer = random.Random(options['seed'])
+
+        results = []
+        with transaction.atomic():
+            restaurants = self.create_restaurants(max(options['page_sizes']), options['diet_types'], randomizer)
+
+            for page_size in options['page_sizes']:
+                # Like the pages of the search, the restaurants are fetched without prefetching anything
+                restaurants_page = list(Restaurant.objects.filter(id__in=restaurants[:page_size]).order_by('id'))
+
+                drf_result = self.measure(RestaurantSerializer, restaurants_page, options['repeat'])
+                fast_result = self.measure(RestaurantReadSerializer, restaurants_page, options['repeat'])
+                if drf_result.pop('json') != fast_result.pop('json'):
+                    raise CommandError('The serializers gave a different JSON for a page of {}'.format(page_size))
+
+                results.append({
+                    'page_size': page_size,
+                    'restaurant_serializer': drf_result,
+                    'restaurant_read_serializer': fast_result,
+                })
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def create_restaurants(self, qty, diet_types_qty, randomizer):
+        diet_types = [DietType.objects.create(name='Benchmark diet {}'.format(i)) for i in range(diet_types_qty)]
+
+        restaurants = []
+        for i in range(qty):
+            lat = randomizer.uniform(19.0, 19.8)
+            long = randomizer.uniform(-99.5, -98.8)
+            restaurants.append(Restaurant(
+                name='Benchmark restaurant {}'.format(i),
+                open_time='08:00:00',
+                close_time='23:00:00',
+                location_lat=lat,
+                location_long=long,
+                grid_cell=get_grid_cell(lat, long)
+            ))
+        restaurants = Restaurant.objects.bulk_create(restaurants, batch_size=500)
+        if restaurants[0].id is None:
+            restaurants = list(Restaurant.objects.filter(name__startswith='Benchmark restaurant ').order_by('id'))
+
+        # The diet types are added in id order, the order both serializers give them
+        endorsements = []
+        for restaurant in restaurants:
+            for diet_type in sorted(randomizer.sample(diet_types, randomizer.randint(0, 3)), key=lambda d: d.id):
+                endorsements.append(Restaurant.diet_endorsement_types.through(
+                    restaurant_id=restaurant.id,
+                    diettype_id=diet_type.id
+                ))
+        Restaurant.diet_endorsement_types.through.objects.bulk_create(endorsements, batch_size=500)
+
+        return [restaurant.id for restaurant in restaurants]
+
+    def measure(self, serializer_class, restaurants_page, repeat):
+        durations = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                rendered_json = JSONRenderer().render(serializer_class(restaurants_page, many=True).data)
+                durations.append(time.perf_counter() - start)
+
+        return {
+            'queries': len(context.captured_queries),
+            'us_per_restaurant': round(min(durations) * 1000000 / len(restaurants_page), 1),
+            'json': rendered_json,
+        }
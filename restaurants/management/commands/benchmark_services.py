@@ -0,0 +1,184 @@
+import io
+import json
+import random
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+import rest_framework.exceptions
+
+from restaurants import custom_errors
+from restaurants.models import Diner, Table
+from restaurants.services.ranking import RankedRestaurants
+import restaurants.services.restaurants_service
+
+
+class Command(BaseCommand):
+    help = 'Measures find_restaurants and create_reservation over a dataset generated with populatedb, and prints ' \
+           'the latency percentiles, the queries and the peak memory of every case as JSON. The dataset is created ' \
+           'in a transaction that is rolled back at the end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=5000)
+        parser.add_argument('--diners', type=int, default=20000)
+        parser.add_argument('--reservations', type=int, default=50000)
+        parser.add_argument('--party-sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--memory-iterations', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None, help='File to write the JSON to, instead of the stdout.')
+
+    def handle(self, *args, **options):
+        self.randomizer = random.Random(options['seed'])
+        self.options = options
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            call_command(
+                'populatedb',
+                restaurants=options['restaurants'],
+                diners=options['diners'],
+                reservations=options['reservations'],
+                seed=options['seed'],
+                stdout=io.StringIO()
+            )
+            populate_seconds = time.perf_counter() - start
+
+            self.diners_ids = list(Diner.objects.values_list('id', flat=True))
+            # The parties of the bookings have no diet restrictions, so they can book any table
+            self.unrestricted_diners_ids = list(Diner.objects.filter(diet_types_mask=0).values_list('id', flat=True))
+            # The searches are in the days of the reservations of populatedb (60 from tomorrow)
+            self.first_day = datetime.now(tz=timezone.utc).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ) + timedelta(days=1)
+
+            cases = []
+            for party_size in options['party_sizes']:
+                for match in ['all', 'any']:
+                    for with_target_datetime in [False, True]:
+                        cases.append({
+                            'service': 'find_restaurants',
+                            'match': match,
+                            'target_datetime': with_target_datetime,
+                            'party_size': party_size,
+                            **self.measure(lambda: self.find_restaurants(party_size, match, with_target_datetime)),
+                        })
+
+                tables = list(Table.objects.filter(capacity__gte=party_size).values_list('id', flat=True))
+                cases.append({
+                    'service': 'create_reservation',
+                    'party_size': party_size,
+                    **self.measure(lambda: self.create_reservation(party_size, tables)),
+                })
+
+            transaction.set_rollback(True)
+
+        results = {
+            'commit': self.get_commit(),
+            'database': connection.vendor,
+            'dataset': {
+                'restaurants': options['restaurants'],
+                'diners': options['diners'],
+                'reservations': options['reservations'],
+                'seed': options['seed'],
+                'populate_seconds': round(populate_seconds, 2),
+            },
+            'settings': {
+                'availability_index_enabled': settings.AVAILABILITY_INDEX_ENABLED,
+                'find_restaurants_cache_enabled': settings.FIND_RESTAURANTS_CACHE_ENABLED,
+            },
+            'iterations': options['iterations'],
+            'cases': cases,
+        }
+
+        rendered_results = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(rendered_results + '\n')
+        else:
+            self.stdout.write(rendered_results)
+
+    def get_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def get_party(self, party_size, diners_ids=None):
+        return self.randomizer.sample(diners_ids or self.diners_ids, party_size)
+
+    def get_target_datetime(self):
+        # Between 13:00 and 21:00, when every restaurant of populatedb is open for the whole reservation
+        return self.first_day + timedelta(
+            days=self.randomizer.randrange(60), minutes=self.randomizer.randrange(13 * 60, 21 * 60 + 1, 15)
+        )
+
+    def find_restaurants(self, party_size, match, with_target_datetime):
+        found_restaurants = restaurants.services.restaurants_service.find_restaurants(
+            diners=self.get_party(party_size),
+            target_datetime=self.get_target_datetime().strftime('%Y-%m-%d %H:%M:%S') if with_target_datetime else None,
+            or_version=match == 'any'
+        )
+        # The first page, like the restaurants view reads it
+        if isinstance(found_restaurants, RankedRestaurants):
+            return found_restaurants.get_page_after(None, self.options['page_size'] + 1)
+        return list(found_restaurants.order_by('id')[:self.options['page_size'] + 1])
+
+    def create_reservation(self, party_size, tables):
+        # The bookings are after the reservations of populatedb, some of them still conflict with each other
+        target_datetime = self.get_target_datetime() + timedelta(days=60)
+        try:
+            restaurants.services.restaurants_service.create_reservation(
+                diners=self.get_party(party_size, self.unrestricted_diners_ids),
+                target_datetime=target_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+                table=self.randomizer.choice(tables)
+            )
+        except custom_errors.BusinessError as e:
+            return e.error_code
+        except rest_framework.exceptions.ValidationError:
+            return 'validation'
+        return None
+
+    def measure(self, function):
+        durations = []
+        queries = []
+        errors = defaultdict(int)
+        for _ in range(self.options['iterations']):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                result = function()
+                durations.append(time.perf_counter() - start)
+            queries.append(len(context.captured_queries))
+            # The bookings return the code of their error, if any
+            if isinstance(result, str):
+                errors[result] += 1
+
+        # The memory is traced apart, tracing it slows down the measured calls
+        peak_memory = 0
+        for _ in range(self.options['memory_iterations']):
+            tracemalloc.start()
+            function()
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        p50, p95, p99 = numpy.percentile(numpy.array(durations) * 1000, [50, 95, 99])
+        return {
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'errors': dict(errors),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
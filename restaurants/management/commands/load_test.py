@@ -0,0 +1,115 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy
+from django.core.management.base import BaseCommand
+
+from restaurants.models import Diner
+
+
+class Command(BaseCommand):
+    help = 'Sends concurrent restaurants searches to a running server for a while, and prints the responses per ' \
+           'second, the latency percentiles and the responses by status code as JSON. The diners of the searches ' \
+           'are read from the database of the server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=int, default=30, help='Seconds.')
+        parser.add_argument('--party-sizes', type=int, nargs='+', default=[2, 4])
+        parser.add_argument('--timeout', type=int, default=30, help='Seconds to wait for every response.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None, help='File to write the JSON to, instead of the stdout.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.diners_ids = list(Diner.objects.values_list('id', flat=True))
+        # The searches are in the days of the reservations of populatedb (60 from tomorrow)
+        self.first_day = datetime.now(tz=timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) + timedelta(days=1)
+
+        self.lock = threading.Lock()
+        self.durations = []
+        self.status_codes = defaultdict(int)
+        self.server = None
+
+        deadline = time.perf_counter() + options['duration']
+        threads = [
+            threading.Thread(target=self.send_requests, args=(random.Random(options['seed'] + i), deadline))
+            for i in range(options['concurrency'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed_seconds = time.perf_counter() - start
+
+        p50, p95, p99 = numpy.percentile(numpy.array(self.durations or [0]) * 1000, [50, 95, 99])
+        results = {
+            'url': options['url'],
+            'server': self.server,
+            'concurrency': options['concurrency'],
+            'duration_seconds': round(elapsed_seconds, 2),
+            'responses': len(self.durations),
+            'responses_per_second': round(len(self.durations) / elapsed_seconds, 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'status_codes': dict(self.status_codes),
+        }
+
+        rendered_results = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(rendered_results + '\n')
+        else:
+            self.stdout.write(rendered_results)
+
+    def get_search_url(self, randomizer):
+        party_size = randomizer.choice(self.options['party_sizes'])
+        query_params = {}
+        if len(self.diners_ids) >= party_size:
+            query_params['diners'] = randomizer.sample(self.diners_ids, party_size)
+        # Half of the searches are for a datetime when every restaurant of populatedb is open
+        if randomizer.random() < 0.5:
+            query_params['target_datetime'] = (self.first_day + timedelta(
+                days=randomizer.randrange(60), minutes=randomizer.randrange(13 * 60, 21 * 60 + 1, 15)
+            )).strftime('%Y-%m-%d %H:%M:%S')
+
+        return '{}/api/v1/restaurants/?{}'.format(
+            self.options['url'].rstrip('/'), urllib.parse.urlencode(query_params, doseq=True)
+        )
+
+    def send_requests(self, randomizer, deadline):
+        while time.perf_counter() < deadline:
+            url = self.get_search_url(randomizer)
+            server = None
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=self.options['timeout']) as response:
+                    response.read()
+                    status_code = response.status
+                    server = response.headers.get('Server')
+            except urllib.error.HTTPError as e:
+                status_code = e.code
+            except OSError:
+                # Connection errors and timeouts
+                status_code = 'error'
+            duration = time.perf_counter() - start
+
+            with self.lock:
+                # The connection errors are only counted, they would lower the latencies
+                if status_code != 'error':
+                    self.durations.append(duration)
+                self.status_codes[status_code] += 1
+                if self.server is None:
+                    self.server = server
@@ -1,14 +1,263 @@
-from datetime import datetime, timezone
+import math
+import random
+from datetime import datetime, timedelta, timezone
 
-from django.core.management.base import BaseCommand
+import numpy
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from faker import Faker
 
 from restaurants.models import DietType, Diner, Restaurant, Table
-from restaurants.models.reservation import Reservation
+from restaurants.models.diettype import get_diet_types_mask
+from restaurants.models.opening_interval import set_opening_intervals
+from restaurants.models.reservation import Reservation, get_reservation_end_datetime
+from restaurants.models.restaurant import get_grid_cell
+from restaurants.services import search_cache
+
+# Diet types of the synthetic data, with their popularity
+synthetic_diet_types = [
+    ('Vegetarian', 30), ('Vegan', 15), ('Gluten-Free', 15), ('Lactose-Free', 12), ('Halal', 8), ('Kosher', 6),
+    ('Paleo', 7), ('Keto', 7),
+]
+# Amount of diet types of the diners and of the endorsements of the restaurants, with their weights
+diner_diet_types_qty_weights = [70, 20, 8, 2]
+restaurant_diet_types_qty_weights = [30, 30, 20, 12, 8]
+
+tables_capacities = [2, 2, 2, 4, 4, 4, 6, 6, 8, 10]
+opening_hours = [('08:00:00', '23:30:00'), ('11:30:00', '23:59:00'), ('12:00:00', '02:00:00')]
+
+# The reservations are made in fixed slots, more than a reservation span apart so a table and a diner never get two
+# overlapping reservations. Every opening hours above is open during all of them
+reservations_slots_times = [(12, 0), (14, 15), (16, 30), (18, 45), (21, 0)]
 
 
 class Command(BaseCommand):
+    help = 'Creates a small fixture of diners, restaurants and reservations or, with --restaurants, --diners or ' \
+           '--reservations, that amount of synthetic ones clustered around cities.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=0)
+        parser.add_argument('--diners', type=int, default=0)
+        parser.add_argument('--reservations', type=int, default=0)
+        parser.add_argument('--days', type=int, default=60, help='Days from tomorrow with reservations.')
+        parser.add_argument('--cities', type=int, default=None, help='Cities to cluster the locations around.')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Rows created per transaction.')
+        parser.add_argument('--seed', type=int, default=42)
 
     def handle(self, *args, **options):
+        if not options['restaurants'] and not options['diners'] and not options['reservations']:
+            self.create_fixture()
+            return
+
+        if options['reservations'] and (not options['restaurants'] or not options['diners']):
+            raise CommandError('The reservations need --restaurants and --diners.')
+
+        self.randomizer = random.Random(options['seed'])
+        Faker.seed(options['seed'])
+        self.faker = Faker()
+        self.chunk_size = options['chunk_size']
+
+        self.diet_types = self.get_diet_types()
+        self.cities = self.get_cities(options['cities'] or max(1, min(50, options['restaurants'] // 2000)))
+
+        restaurants_ids = self.create_restaurants(options['restaurants'])
+        diners_ids = self.create_diners(options['diners'])
+        tables_ids, tables_capacities = self.create_tables(restaurants_ids)
+        self.create_reservations(options['reservations'], options['days'], tables_ids, tables_capacities, diners_ids)
+
+        # The data was created without the signals
+        search_cache.invalidate_catalog()
+        self.stdout.write('Created {restaurants} restaurants, {diners} diners and {reservations} reservations'.format(
+            **options
+        ))
+
+    def get_diet_types(self) -> list:
+        diet_types = []
+        for name, weight in synthetic_diet_types:
+            diet_type = DietType.objects.filter(name=name).first() or DietType.objects.create(name=name)
+            diet_types.append((diet_type, weight))
+        return diet_types
+
+    def get_cities(self, qty) -> list:
+        # Cities on land with a weight following Zipf's law, so a few big cities have most of the restaurants
+        cities = []
+        for rank in range(1, qty + 1):
+            lat, long, *_ = self.faker.location_on_land()
+            cities.append((float(lat), float(long), 1 / rank))
+        return cities
+
+    def get_location(self) -> tuple:
+        lat, long, _ = self.randomizer.choices(self.cities, weights=[city[2] for city in self.cities])[0]
+        # Most of the locations are a few kilometers from the city center
+        lat = min(max(self.randomizer.gauss(lat, 0.08), -90), 90)
+        long = min(max(self.randomizer.gauss(long, 0.08), -180), 180)
+        return lat, long
+
+    def sample_diet_types(self, qty_weights) -> list:
+        qty = self.randomizer.choices(range(len(qty_weights)), weights=qty_weights)[0]
+        diet_types = set()
+        while len(diet_types) < qty:
+            diet_types.add(self.randomizer.choices(
+                [diet_type for diet_type, _ in self.diet_types],
+                weights=[weight for _, weight in self.diet_types]
+            )[0])
+        return sorted(diet_types, key=lambda diet_type: diet_type.id)
+
+    def bulk_create(self, model, instances) -> list:
+        """Creates the instances and returns their ids, in the same order."""
+        last_id = model.objects.aggregate(Max('id'))['id__max'] or 0
+        instances = model.objects.bulk_create(instances, batch_size=500)
+        if connection.features.can_return_rows_from_bulk_insert:
+            return [instance.id for instance in instances]
+        # Nothing else writes while the data is generated, the new rows are the ones after the last id
+        return list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
+
+    def get_chunks_sizes(self, qty):
+        for start in range(0, qty, self.chunk_size):
+            yield min(self.chunk_size, qty - start)
+
+    def create_restaurants(self, qty) -> numpy.ndarray:
+        names = [self.faker.company() for _ in range(min(qty, 2000))]
+
+        restaurants_ids = []
+        for chunk_size in self.get_chunks_sizes(qty):
+            restaurants = []
+            diet_types = []
+            for _ in range(chunk_size):
+                lat, long = self.get_location()
+                open_time, close_time = self.randomizer.choice(opening_hours)
+                restaurant_diet_types = self.sample_diet_types(restaurant_diet_types_qty_weights)
+                restaurants.append(Restaurant(
+                    name=self.randomizer.choice(names),
+                    open_time=open_time,
+                    close_time=close_time,
+                    location_lat=lat,
+                    location_long=long,
+                    grid_cell=get_grid_cell(lat, long),
+                    diet_endorsement_mask=get_diet_types_mask(diet_type.bit for diet_type in restaurant_diet_types)
+                ))
+                diet_types.append(restaurant_diet_types)
+
+            with transaction.atomic():
+                chunk_ids = self.bulk_create(Restaurant, restaurants)
+                for restaurant, restaurant_id in zip(restaurants, chunk_ids):
+                    restaurant.id = restaurant_id
+                set_opening_intervals(restaurants)
+                Restaurant.diet_endorsement_types.through.objects.bulk_create([
+                    Restaurant.diet_endorsement_types.through(restaurant_id=restaurant_id, diettype_id=diet_type.id)
+                    for restaurant_id, restaurant_diet_types in zip(chunk_ids, diet_types)
+                    for diet_type in restaurant_diet_types
+                ], batch_size=500)
+            restaurants_ids.extend(chunk_ids)
+
+        return numpy.array(restaurants_ids, dtype=numpy.int64)
+
+    def create_diners(self, qty) -> numpy.ndarray:
+        first_names = [self.faker.first_name() for _ in range(min(qty, 1000))]
+        last_names = [self.faker.last_name() for _ in range(min(qty, 1000))]
+
+        diners_ids = []
+        for chunk_size in self.get_chunks_sizes(qty):
+            diners = []
+            diet_types = []
+            for _ in range(chunk_size):
+                lat, long = self.get_location()
+                diner_diet_types = self.sample_diet_types(diner_diet_types_qty_weights)
+                diners.append(Diner(
+                    name='{} {}'.format(self.randomizer.choice(first_names), self.randomizer.choice(last_names)),
+                    house_location_lat=lat,
+                    house_location_long=long,
+                    diet_types_mask=get_diet_types_mask(diet_type.bit for diet_type in diner_diet_types)
+                ))
+                diet_types.append(diner_diet_types)
+
+            with transaction.atomic():
+                chunk_ids = self.bulk_create(Diner, diners)
+                Diner.diet_types.through.objects.bulk_create([
+                    Diner.diet_types.through(diner_id=diner_id, diettype_id=diet_type.id)
+                    for diner_id, diner_diet_types in zip(chunk_ids, diet_types)
+                    for diet_type in diner_diet_types
+                ], batch_size=500)
+            diners_ids.extend(chunk_ids)
+
+        return numpy.array(diners_ids, dtype=numpy.int64)
+
+    def create_tables(self, restaurants_ids) -> tuple:
+        tables_ids = []
+        capacities = []
+        tables = []
+        for i, restaurant_id in enumerate(restaurants_ids):
+            for _ in range(self.randomizer.randint(3, 15)):
+                capacity = self.randomizer.choice(tables_capacities)
+                tables.append(Table(restaurant_id=int(restaurant_id), capacity=capacity))
+
+            if len(tables) >= self.chunk_size or i == len(restaurants_ids) - 1:
+                with transaction.atomic():
+                    tables_ids.extend(self.bulk_create(Table, tables))
+                capacities.extend(table.capacity for table in tables)
+                tables = []
+
+        return numpy.array(tables_ids, dtype=numpy.int64), numpy.array(capacities, dtype=numpy.int8)
+
+    def create_reservations(self, qty, days, tables_ids, tables_capacities, diners_ids) -> None:
+        if not qty:
+            return
+
+        first_day = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        slots_qty = days * len(reservations_slots_times)
+        tables_slots_qty = len(tables_ids) * slots_qty
+        if qty > tables_slots_qty:
+            raise CommandError('There is room for {} reservations at most, use more --days'.format(tables_slots_qty))
+
+        # Every reservation takes a different (table, slot). They are spread with a stride coprime with the amount of
+        # them, so no reservation is kept in memory to avoid repeating them
+        stride = self.randomizer.randrange(tables_slots_qty // 3, tables_slots_qty) if tables_slots_qty > 3 else 1
+        while math.gcd(stride, tables_slots_qty) != 1:
+            stride += 1
+        offset = self.randomizer.randrange(tables_slots_qty)
+
+        # The diners of the reservations of a slot follow their own stride, so a diner is never twice in the same slot
+        diners_stride = self.randomizer.randrange(len(diners_ids) // 3, len(diners_ids)) if len(diners_ids) > 3 else 1
+        while math.gcd(diners_stride, len(diners_ids)) != 1:
+            diners_stride += 1
+        slots_diners_used = {}
+
+        for chunk_start, chunk_size in zip(range(0, qty, self.chunk_size), self.get_chunks_sizes(qty)):
+            reservations = []
+            reservations_diners = []
+            for k in range(chunk_start, chunk_start + chunk_size):
+                table_slot = (offset + k * stride) % tables_slots_qty
+                table_index, slot = divmod(table_slot, slots_qty)
+                day, slot_time = divmod(slot, len(reservations_slots_times))
+                hour, minute = reservations_slots_times[slot_time]
+                reservation_datetime = first_day + timedelta(days=day, hours=hour, minutes=minute)
+
+                party_size = self.randomizer.randint(1, min(int(tables_capacities[table_index]), 6))
+                diners_used = slots_diners_used.get(slot, 0)
+                if diners_used + party_size > len(diners_ids):
+                    raise CommandError('There are not enough diners for the reservations, use more --diners or --days')
+                slots_diners_used[slot] = diners_used + party_size
+                reservations_diners.append([
+                    int(diners_ids[(slot + (diners_used + i) * diners_stride) % len(diners_ids)])
+                    for i in range(party_size)
+                ])
+
+                reservations.append(Reservation(
+                    table_id=int(tables_ids[table_index]),
+                    datetime=reservation_datetime,
+                    end_datetime=get_reservation_end_datetime(reservation_datetime)
+                ))
+
+            with transaction.atomic():
+                chunk_ids = self.bulk_create(Reservation, reservations)
+                Reservation.diners.through.objects.bulk_create([
+                    Reservation.diners.through(reservation_id=reservation_id, diner_id=diner_id)
+                    for reservation_id, diners in zip(chunk_ids, reservations_diners)
+                    for diner_id in diners
+                ], batch_size=500)
+
+    def create_fixture(self):
         # Diet types
         vegan_diet_type = DietType.objects.create(name='Vegan')
         paleo_diet_type = DietType.objects.create(name='Paleo')
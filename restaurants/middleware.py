@@ -0,0 +1,188 @@
+import contextlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from restaurants.routers import use_primary, use_replica
+from restaurants.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Length of the slowest statement in the log lines
+slowest_sql_max_length = 1000
+
+
+class RequestProfile:
+    """Queries and timings of a request. It wraps the execution of the queries of every database connection."""
+
+    def __init__(self) -> None:
+        self.queries_qty = 0
+        self.db_duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+        self.durations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries_qty += 1
+            self.db_duration += duration
+            if self.slowest_sql is None or duration > self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+    def add_duration(self, name: str, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def get_server_timing(self, total_duration: float) -> str:
+        metrics = [
+            'db;dur={:.2f};desc="{} queries"'.format(self.db_duration * 1000, self.queries_qty),
+            'db-slowest;dur={:.2f}'.format(self.slowest_duration * 1000),
+        ]
+        metrics.extend('{};dur={:.2f}'.format(name, duration * 1000) for name, duration in self.durations.items())
+        metrics.append('total;dur={:.2f}'.format(total_duration * 1000))
+        return ', '.join(metrics)
+
+    def get_log_data(self, request, response, total_duration: float) -> dict:
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status_code': response.status_code,
+            'total_ms': round(total_duration * 1000, 2),
+            'queries': self.queries_qty,
+            'db_ms': round(self.db_duration * 1000, 2),
+            'slowest_ms': round(self.slowest_duration * 1000, 2),
+            'slowest_sql': self.slowest_sql[:slowest_sql_max_length] if self.slowest_sql is not None else None,
+            **{name + '_ms': round(duration * 1000, 2) for name, duration in self.durations.items()},
+        }
+
+
+@contextlib.contextmanager
+def profile_duration(request, name: str):
+    """Adds the duration of the block to the profile of the request, if it is profiled."""
+    profile = getattr(request, 'sql_profile', None)
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_duration(name, time.perf_counter() - start)
+
+
+class SQLProfilingMiddleware:
+    """
+    Adds the queries, the database time, the slowest statement, the serialization and the rendering time of every
+    request to a Server-Timing header and, optionally, to a JSON log line. When it is disabled Django drops it.
+    """
+
+    def __init__(self, get_response) -> None:
+        if not settings.SQL_PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        request.sql_profile = profile
+
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(profile))
+            response = self.get_response(request)
+        total_duration = time.perf_counter() - start
+
+        response['Server-Timing'] = profile.get_server_timing(total_duration)
+        if settings.SQL_PROFILING_LOG:
+            logger.info(json.dumps(profile.get_log_data(request, response, total_duration)))
+        return response
+
+    def process_template_response(self, request, response):
+        # The responses of the API are rendered after the view returns them
+        render_start = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered_response: request.sql_profile.add_duration('render', time.perf_counter() - render_start)
+        )
+        return response
+
+
+class _QueriesCounter:
+    def __init__(self) -> None:
+        self.queries_qty = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries_qty += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Observes the duration, the status code and the queries of the requests of every view in the metrics."""
+
+    def __init__(self, get_response) -> None:
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries_counter = _QueriesCounter()
+
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries_counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view = self.get_view_name(request)
+        metrics.view_duration.observe(duration, view=view, method=request.method)
+        metrics.view_responses.inc(view=view, method=request.method, status_code=response.status_code)
+        metrics.view_db_queries.observe(queries_counter.queries_qty, view=view)
+        return response
+
+    def get_view_name(self, request) -> str:
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            # Not found
+            return 'none'
+        view_class = getattr(resolver_match.func, 'view_class', None)
+        return view_class.__name__ if view_class is not None else resolver_match.func.__name__
+
+
+class PrimaryPinningMiddleware:
+    """
+    Sends the reads of the requests that write to the primary database, and the ones of the next requests of the same
+    client during DATABASE_PRIMARY_PIN_SECONDS, so the clients read their own writes while the replicas catch up. The
+    reads of the other requests go to a single replica, chosen for every request.
+    """
+
+    cookie_name = 'primary_db_pinned'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response) -> None:
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in self.safe_methods
+        if not writes and self.cookie_name not in request.COOKIES:
+            with use_replica():
+                return self.get_response(request)
+
+        with use_primary():
+            response = self.get_response(request)
+
+        if writes:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=settings.DATABASE_PRIMARY_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,40 @@
+import datetime
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_reservations_end_datetime(apps, schema_editor):
+    Reservation = apps.get_model('restaurants', 'Reservation')
+    Reservation.objects.using(schema_editor.connection.alias).update(
+        end_datetime=F('datetime') + datetime.timedelta(hours=2)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='end_datetime',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='End datetime'),
+        ),
+        migrations.RunPython(fill_reservations_end_datetime, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reservation',
+            name='end_datetime',
+            field=models.DateTimeField(editable=False, verbose_name='End datetime'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['table', 'datetime', 'end_datetime'], name='reservation_table_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['datetime', 'end_datetime'], name='reservation_range_idx'),
+        ),
+    ]
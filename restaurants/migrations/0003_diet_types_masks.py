@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+
+def fill_diet_types_bits_and_masks(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    DietType = apps.get_model('restaurants', 'DietType')
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Diner = apps.get_model('restaurants', 'Diner')
+
+    # The masks are signed 64 bits integers
+    diet_types_qty = DietType.objects.using(db_alias).count()
+    if diet_types_qty > 63:
+        raise RuntimeError(
+            'There are {} diet types, the diet types masks can only hold 63. Merge or delete the diet types above that '
+            'amount before migrating.'.format(diet_types_qty)
+        )
+
+    for bit, diet_type in enumerate(DietType.objects.using(db_alias).order_by('id')):
+        diet_type.bit = bit
+        diet_type.save(update_fields=['bit'])
+
+        Restaurant.objects.using(db_alias).filter(diet_endorsement_types=diet_type).update(
+            diet_endorsement_mask=models.F('diet_endorsement_mask') + (1 << bit)
+        )
+        Diner.objects.using(db_alias).filter(diet_types=diet_type).update(
+            diet_types_mask=models.F('diet_types_mask') + (1 << bit)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0002_reservation_end_datetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diettype',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Bit'),
+        ),
+        migrations.AddField(
+            model_name='diner',
+            name='diet_types_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Diet Types Mask'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='diet_endorsement_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Diet Endorsement Mask'),
+        ),
+        migrations.RunPython(fill_diet_types_bits_and_masks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='diettype',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, verbose_name='Bit'),
+        ),
+        migrations.AddConstraint(
+            model_name='diettype',
+            constraint=models.UniqueConstraint(fields=('bit',), name='unique_bit'),
+        ),
+    ]
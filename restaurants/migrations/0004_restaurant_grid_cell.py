@@ -0,0 +1,35 @@
+import math
+
+from django.db import migrations, models
+
+
+def fill_restaurants_grid_cell(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+
+    # Grid of 0.1 x 0.1 degrees, with 3600 columns
+    for restaurant in Restaurant.objects.using(schema_editor.connection.alias).iterator():
+        grid_row = math.floor((restaurant.location_lat + 90) / 0.1)
+        grid_column = min(math.floor((restaurant.location_long + 180) / 0.1), 3599)
+        restaurant.grid_cell = grid_row * 3600 + grid_column
+        restaurant.save(update_fields=['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_diet_types_masks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='grid_cell',
+            field=models.IntegerField(editable=False, null=True, verbose_name='Grid Cell'),
+        ),
+        migrations.RunPython(fill_restaurants_grid_cell, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='grid_cell',
+            field=models.IntegerField(db_index=True, editable=False, verbose_name='Grid Cell'),
+        ),
+    ]
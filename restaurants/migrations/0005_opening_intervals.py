@@ -0,0 +1,57 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_opening_intervals(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    OpeningInterval = apps.get_model('restaurants', 'OpeningInterval')
+
+    # Intervals of minutes of the day, the opening hours through midnight are split at the end of the day
+    opening_intervals = []
+    for restaurant in Restaurant.objects.using(schema_editor.connection.alias).iterator():
+        open_minute = restaurant.open_time.hour * 60 + restaurant.open_time.minute
+        if restaurant.open_time.second or restaurant.open_time.microsecond:
+            open_minute += 1
+        close_minute = restaurant.close_time.hour * 60 + restaurant.close_time.minute
+
+        if restaurant.open_time < restaurant.close_time:
+            intervals = [(open_minute, close_minute)] if open_minute <= close_minute else []
+        elif restaurant.open_time > restaurant.close_time:
+            intervals = [(open_minute, 1440), (0, close_minute)]
+        else:
+            intervals = []
+
+        opening_intervals.extend(
+            OpeningInterval(restaurant_id=restaurant.id, start_minute=start_minute, end_minute=end_minute)
+            for start_minute, end_minute in intervals
+        )
+
+    OpeningInterval.objects.using(schema_editor.connection.alias).bulk_create(opening_intervals, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0004_restaurant_grid_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningInterval',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_minute', models.PositiveSmallIntegerField(verbose_name='Start Minute')),
+                ('end_minute', models.PositiveSmallIntegerField(verbose_name='End Minute')),
+                ('restaurant', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='opening_intervals',
+                    to='restaurants.Restaurant'
+                )),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='openinginterval',
+            index=models.Index(fields=['start_minute', 'end_minute'], name='opening_interval_range_idx'),
+        ),
+        migrations.RunPython(fill_opening_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_opening_intervals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField(verbose_name='End datetime')),
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(verbose_name='Updated at')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived at')),
+                ('diners', models.ManyToManyField(related_name='archived_reservations', to='restaurants.Diner')),
+                ('table', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='archived_reservations',
+                    to='restaurants.Table'
+                )),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['datetime'], name='archived_reservation_dt_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import models
+from restaurants.models.diner import Diner
+from restaurants.models.table import Table
+
+
+class ArchivedReservation(models.Model):
+    """Past reservation moved out of the reservations table, it keeps the id of the reservation."""
+    id = models.IntegerField(primary_key=True)
+    diners = models.ManyToManyField(to=Diner, related_name='archived_reservations')
+    table = models.ForeignKey(to=Table, on_delete=models.CASCADE, related_name='archived_reservations')
+    datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField(verbose_name='End datetime')
+    created_at = models.DateTimeField(verbose_name='Created at')
+    updated_at = models.DateTimeField(verbose_name='Updated at')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Archived at')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['datetime'], name='archived_reservation_dt_idx'),
+        ]
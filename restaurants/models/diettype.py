@@ -1,13 +1,42 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
+# The diet types are mapped to the bits of a signed 64 bits integer, so restaurants and diners can store the set of
+# their diet types in a single column
+diet_types_max_qty = 63
+
+
+def get_diet_types_mask(diet_types_bits) -> int:
+    mask = 0
+    for bit in diet_types_bits:
+        mask |= 1 << bit
+    return mask
+
 
 class DietType(models.Model):
     name = models.CharField(max_length=50, verbose_name='Name')
+    bit = models.PositiveSmallIntegerField(editable=False, verbose_name='Bit')
 
     def __str__(self):
         return self.name
 
+    def _get_free_bit(self):
+        used_bits = set(DietType.objects.values_list('bit', flat=True))
+        return next((bit for bit in range(diet_types_max_qty) if bit not in used_bits), None)
+
+    def clean(self):
+        if self.bit is None and self._get_free_bit() is None:
+            raise ValidationError('There can not be more than {} diet types'.format(diet_types_max_qty))
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            self.bit = self._get_free_bit()
+            if self.bit is None:
+                raise ValueError('There can not be more than {} diet types'.format(diet_types_max_qty))
+        super().save(*args, **kwargs)
+
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=['name'], name='unique_name')
+            models.UniqueConstraint(fields=['name'], name='unique_name'),
+            models.UniqueConstraint(fields=['bit'], name='unique_bit')
         ]
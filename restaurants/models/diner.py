@@ -5,5 +5,6 @@ from restaurants.models.diettype import DietType
 class Diner(models.Model):
     name = models.CharField(max_length=255, verbose_name='Name')
     diet_types = models.ManyToManyField(to=DietType, blank=True)
+    diet_types_mask = models.BigIntegerField(default=0, editable=False, verbose_name='Diet Types Mask')
     house_location_lat = models.FloatField(verbose_name="Home Location Latitude")
     house_location_long = models.FloatField(verbose_name="Home Location Longitude")
@@ -0,0 +1,72 @@
+import datetime
+
+from django.db import models
+from restaurants.models.restaurant import Restaurant
+
+# The opening hours of the restaurants are stored as intervals of minutes of the day, the hours through midnight are
+# split in an interval until the end of the day and another one from its start. A restaurant is open for a reservation
+# when every interval of the reservation, split the same way, is inside one of its opening intervals.
+minutes_per_day = 24 * 60
+
+_time_field = models.TimeField()
+
+
+def get_day_minute(value: datetime.time, round_up: bool = False) -> int:
+    minute = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minute += 1
+    return minute
+
+
+def get_opening_intervals(open_time: datetime.time, close_time: datetime.time) -> list:
+    # The partial minutes are left out of the opening hours
+    open_minute = get_day_minute(open_time, round_up=True)
+    close_minute = get_day_minute(close_time)
+
+    if open_time < close_time:
+        return [(open_minute, close_minute)] if open_minute <= close_minute else []
+    if open_time > close_time:
+        return [(open_minute, minutes_per_day), (0, close_minute)]
+    return []
+
+
+def get_reservation_intervals(start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> list:
+    # The partial minutes are included in the reservation
+    start_minute = get_day_minute(start_datetime.time())
+    end_minute = get_day_minute(end_datetime.time(), round_up=True)
+
+    if end_datetime.date() != start_datetime.date():
+        return [(start_minute, minutes_per_day), (0, end_minute)]
+    return [(start_minute, end_minute)]
+
+
+def is_open(opening_intervals: list, reservation_intervals: list) -> bool:
+    return all(
+        any(start_minute <= reservation_start and end_minute >= reservation_end
+            for start_minute, end_minute in opening_intervals)
+        for reservation_start, reservation_end in reservation_intervals
+    )
+
+
+def set_opening_intervals(restaurants) -> None:
+    """Replaces the opening intervals of the restaurants. The restaurants bulk created or updated must call it."""
+    OpeningInterval.objects.filter(restaurant__in=[restaurant.id for restaurant in restaurants]).delete()
+    OpeningInterval.objects.bulk_create([
+        OpeningInterval(restaurant_id=restaurant.id, start_minute=start_minute, end_minute=end_minute)
+        for restaurant in restaurants
+        # The times of the restaurants created from strings are kept as strings until they are read again
+        for start_minute, end_minute in get_opening_intervals(
+            _time_field.to_python(restaurant.open_time), _time_field.to_python(restaurant.close_time)
+        )
+    ], batch_size=500)
+
+
+class OpeningInterval(models.Model):
+    restaurant = models.ForeignKey(to=Restaurant, on_delete=models.CASCADE, related_name='opening_intervals')
+    start_minute = models.PositiveSmallIntegerField(verbose_name='Start Minute')
+    end_minute = models.PositiveSmallIntegerField(verbose_name='End Minute')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_minute', 'end_minute'], name='opening_interval_range_idx'),
+        ]
@@ -1,11 +1,43 @@
+import datetime
+
 from django.db import models
 from restaurants.models.diner import Diner
 from restaurants.models.table import Table
 
+reservation_hours_span = 2
+
+
+def get_reservation_end_datetime(start_datetime):
+    return start_datetime + datetime.timedelta(hours=reservation_hours_span)
+
 
 class Reservation(models.Model):
     diners = models.ManyToManyField(to=Diner)
     table = models.ForeignKey(to=Table, on_delete=models.CASCADE)
     datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField(editable=False, verbose_name='End datetime')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created at')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated at')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        reservation = super().from_db(db, field_names, values)
+        # The stored datetime tells which datetime a moved reservation leaves, without reading it again
+        reservation._stored_datetime = reservation.__dict__.get('datetime')
+        return reservation
+
+    def save(self, *args, **kwargs):
+        # The end of the reservation is stored so the overlap checks can use an index instead of computing it per row
+        self.end_datetime = get_reservation_end_datetime(self.datetime)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'datetime' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'end_datetime'}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'datetime' in update_fields:
+            self._stored_datetime = self.datetime
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table', 'datetime', 'end_datetime'], name='reservation_table_range_idx'),
+            models.Index(fields=['datetime', 'end_datetime'], name='reservation_range_idx'),
+        ]
@@ -1,15 +1,43 @@
+import math
+
 from django.db import models
 from restaurants.models.diettype import DietType
 
+# The restaurants locations are bucketed in the cells of a fixed grid of grid_cell_degrees x grid_cell_degrees, so the
+# restaurants close to a location can be looked up by their cells
+grid_cell_degrees = 0.1
+grid_columns_qty = round(360 / grid_cell_degrees)
+
+
+def get_grid_row(lat: float) -> int:
+    return math.floor((lat + 90) / grid_cell_degrees)
+
+
+def get_grid_column(long: float) -> int:
+    # The longitude 180 is kept in the last column instead of wrapping it to the first one
+    return min(math.floor((long + 180) / grid_cell_degrees), grid_columns_qty - 1)
+
+
+def get_grid_cell(lat: float, long: float) -> int:
+    return get_grid_row(lat) * grid_columns_qty + get_grid_column(long)
+
 
 class Restaurant(models.Model):
     name = models.CharField(max_length=255, verbose_name='Name')
     diet_endorsement_types = models.ManyToManyField(to=DietType, blank=True)
+    diet_endorsement_mask = models.BigIntegerField(default=0, editable=False, verbose_name='Diet Endorsement Mask')
     open_time = models.TimeField()
     close_time = models.TimeField()
     location_lat = models.FloatField(verbose_name='Location Latitude')
     location_long = models.FloatField(verbose_name='Location Longitude')
+    grid_cell = models.IntegerField(editable=False, db_index=True, verbose_name='Grid Cell')
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.grid_cell = get_grid_cell(float(self.location_lat), float(self.location_long))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'location_lat', 'location_long'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'grid_cell'}
+        super().save(*args, **kwargs)
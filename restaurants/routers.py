@@ -0,0 +1,71 @@
+import contextlib
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_pinning = threading.local()
+_replica = threading.local()
+
+
+def is_pinned_to_primary() -> bool:
+    return getattr(_pinning, 'depth', 0) > 0
+
+
+def get_replica() -> str:
+    # The reads of a thread stay on the same replica, the replicas can lag differently behind the primary database and
+    # the queries of a request must see the same rows
+    alias = getattr(_replica, 'alias', None)
+    if alias not in settings.DATABASE_REPLICAS:
+        alias = _replica.alias = random.choice(settings.DATABASE_REPLICAS)
+    return alias
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Sends the reads of the thread to the primary database while the block runs."""
+    _pinning.depth = getattr(_pinning, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _pinning.depth -= 1
+
+
+@contextlib.contextmanager
+def use_replica():
+    """Sends the reads of the thread to a replica chosen at random while the block runs."""
+    previous_alias = getattr(_replica, 'alias', None)
+    _replica.alias = random.choice(settings.DATABASE_REPLICAS)
+    try:
+        yield
+    finally:
+        _replica.alias = previous_alias
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends the writes to the primary (default) database and the reads to a replica of DATABASE_REPLICAS, the same one
+    for all the reads of a request (or of a thread, outside the requests). The reads that must see the writes go to the
+    primary: the ones in a transaction of the primary database (e.g. the validations of the bookings) and the ones of
+    the threads pinned to it.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or is_pinned_to_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return get_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas have the same rows as the primary database
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The migrations reach the replicas through the replication
+        return db == DEFAULT_DB_ALIAS
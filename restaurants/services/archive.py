@@ -0,0 +1,57 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from restaurants.models.archived_reservation import ArchivedReservation
+from restaurants.models.reservation import Reservation
+
+
+def get_archive_cutoff(retention_days: int = None) -> datetime.datetime:
+    """Returns the datetime before which the reservations that ended are archived."""
+    if retention_days is None:
+        retention_days = settings.RESERVATIONS_RETENTION_DAYS
+    return datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(days=retention_days)
+
+
+def _archive_chunk(cutoff: datetime.datetime, chunk_size: int) -> int:
+    # The reservations of the chunk are locked, so a concurrent delete can't run between the copy and the delete
+    reservations = list(Reservation.objects.select_for_update().filter(end_datetime__lt=cutoff).order_by('id').values(
+        'id', 'table_id', 'datetime', 'end_datetime', 'created_at', 'updated_at'
+    )[:chunk_size])
+    if not reservations:
+        return 0
+
+    reservations_ids = [reservation['id'] for reservation in reservations]
+    diners_links = Reservation.diners.through.objects.filter(reservation_id__in=reservations_ids).values_list(
+        'reservation_id', 'diner_id'
+    )
+
+    ArchivedReservation.objects.bulk_create(
+        [ArchivedReservation(**reservation) for reservation in reservations], batch_size=500
+    )
+    ArchivedReservation.diners.through.objects.bulk_create([
+        ArchivedReservation.diners.through(archivedreservation_id=reservation_id, diner_id=diner_id)
+        for reservation_id, diner_id in diners_links
+    ], batch_size=500)
+
+    Reservation.objects.filter(id__in=reservations_ids).delete()
+    return len(reservations)
+
+
+def archive_reservations(cutoff: datetime.datetime, chunk_size: int = 1000) -> int:
+    """
+    Moves the reservations that ended before the cutoff, with their diners, to the archive. Every chunk is moved in
+    its own transaction, so the reservations table is never locked for long. Returns the amount of moved reservations.
+    """
+    # The bookings can't be in the past, so only the reservations that didn't end yet can conflict with them
+    if cutoff > datetime.datetime.now(tz=datetime.timezone.utc):
+        raise ValueError('The cutoff of the archive must be in the past')
+
+    archived_qty = 0
+    while True:
+        with transaction.atomic():
+            chunk_archived_qty = _archive_chunk(cutoff, chunk_size)
+        if not chunk_archived_qty:
+            return archived_qty
+        archived_qty += chunk_archived_qty
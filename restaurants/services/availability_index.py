@@ -0,0 +1,175 @@
+import bisect
+import datetime
+import threading
+
+from django.conf import settings
+
+from restaurants.models import Table
+from restaurants.models.reservation import Reservation, reservation_hours_span, get_reservation_end_datetime
+
+
+class AvailabilityIndex:
+    """
+    In-memory occupancy of every table over a time horizon split in fixed slots. Each table keeps a bitset (a python
+    int) where the bit of a slot is on when a reservation of the table overlaps the slot, and the sorted start datetimes
+    of its reservations to resolve the slots that are only partially covered.
+    """
+
+    def __init__(self, origin: datetime.datetime, horizon_days: int, slot_minutes: int = 15) -> None:
+        self.origin = origin
+        self.slot = datetime.timedelta(minutes=slot_minutes)
+        self.slots_qty = horizon_days * 24 * 60 // slot_minutes
+        self.end = origin + self.slot * self.slots_qty
+        self._span = datetime.timedelta(hours=reservation_hours_span)
+        self._lock = threading.RLock()
+        self._tables = {}  # table id -> (restaurant id, capacity)
+        self._busy_slots = {}  # table id -> bitset of the occupied slots
+        self._starts = {}  # table id -> sorted reservations start datetimes
+        self._reservations = {}  # reservation id -> (table id, start datetime)
+
+    def covers(self, target_datetime: datetime.datetime) -> bool:
+        return self.origin <= target_datetime and get_reservation_end_datetime(target_datetime) < self.end
+
+    def _get_slots_mask(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime) -> int:
+        first_slot = max((start_datetime - self.origin) // self.slot, 0)
+        last_slot = min((end_datetime - self.origin) // self.slot, self.slots_qty - 1)
+        if first_slot > last_slot:
+            return 0
+        return ((1 << (last_slot - first_slot + 1)) - 1) << first_slot
+
+    def _refresh_table_slots(self, table_id: int, start_datetime: datetime.datetime) -> None:
+        # A slot can be shared by several reservations, so the slots of a removed reservation are rebuilt from the
+        # reservations of the table that may touch them
+        starts = self._starts.get(table_id, [])
+        stale_mask = self._get_slots_mask(start_datetime, start_datetime + self._span)
+        mask = self._busy_slots.get(table_id, 0) & ~stale_mask
+        first = bisect.bisect_left(starts, start_datetime - self._span - self.slot)
+        last = bisect.bisect_right(starts, start_datetime + self._span + self.slot)
+        for start in starts[first:last]:
+            mask |= self._get_slots_mask(start, start + self._span) & stale_mask
+        self._busy_slots[table_id] = mask
+
+    def set_table(self, table_id: int, restaurant_id: int, capacity: int) -> None:
+        with self._lock:
+            self._tables[table_id] = (restaurant_id, capacity)
+
+    def remove_table(self, table_id: int) -> None:
+        with self._lock:
+            self._tables.pop(table_id, None)
+            self._busy_slots.pop(table_id, None)
+            self._starts.pop(table_id, None)
+            self._reservations = {
+                reservation_id: reservation for reservation_id, reservation in self._reservations.items()
+                if reservation[0] != table_id
+            }
+
+    def add_reservation(self, reservation_id: int, table_id: int, start_datetime: datetime.datetime) -> None:
+        with self._lock:
+            self.remove_reservation(reservation_id)
+            if start_datetime + self._span < self.origin or start_datetime >= self.end:
+                return
+            self._reservations[reservation_id] = (table_id, start_datetime)
+            bisect.insort(self._starts.setdefault(table_id, []), start_datetime)
+            self._busy_slots[table_id] = self._busy_slots.get(table_id, 0) | self._get_slots_mask(
+                start_datetime,
+                start_datetime + self._span
+            )
+
+    def remove_reservation(self, reservation_id: int) -> None:
+        with self._lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is None:
+                return
+            table_id, start_datetime = reservation
+            starts = self._starts[table_id]
+            del starts[bisect.bisect_left(starts, start_datetime)]
+            self._refresh_table_slots(table_id, start_datetime)
+
+    def is_table_free(self, table_id: int, target_datetime: datetime.datetime) -> bool:
+        end_target_datetime = get_reservation_end_datetime(target_datetime)
+        if not self._busy_slots.get(table_id, 0) & self._get_slots_mask(target_datetime, end_target_datetime):
+            return True
+
+        # The slots only tell that a reservation is close, the reservations starts tell if it really overlaps
+        starts = self._starts[table_id]
+        first = bisect.bisect_left(starts, target_datetime - self._span)
+        return first == len(starts) or starts[first] > end_target_datetime
+
+    def get_restaurants_with_free_table(self, target_datetime: datetime.datetime, diners_qty: int) -> set:
+        with self._lock:
+            return {
+                restaurant_id for table_id, (restaurant_id, capacity) in self._tables.items()
+                if capacity >= diners_qty and self.is_table_free(table_id, target_datetime)
+            }
+
+    def get_restaurants_without_free_table(self, target_datetime: datetime.datetime, diners_qty: int) -> set:
+        """Returns the restaurants with tables with capacity for the diners, all of them occupied at the datetime."""
+        with self._lock:
+            restaurants_with_tables = set()
+            restaurants_with_free_table = set()
+            for table_id, (restaurant_id, capacity) in self._tables.items():
+                if capacity < diners_qty:
+                    continue
+                restaurants_with_tables.add(restaurant_id)
+                if restaurant_id not in restaurants_with_free_table and self.is_table_free(table_id, target_datetime):
+                    restaurants_with_free_table.add(restaurant_id)
+            return restaurants_with_tables - restaurants_with_free_table
+
+    def load(self) -> None:
+        with self._lock:
+            for table_id, restaurant_id, capacity in Table.objects.values_list('id', 'restaurant_id', 'capacity'):
+                self.set_table(table_id, restaurant_id, capacity)
+
+            reservations = Reservation.objects.filter(end_datetime__gte=self.origin, datetime__lt=self.end)
+            for reservation_id, table_id, start_datetime in reservations.values_list('id', 'table_id', 'datetime'):
+                self.add_reservation(reservation_id, table_id, start_datetime)
+
+
+_availability_index = None
+_availability_index_lock = threading.Lock()
+
+
+def get_availability_index():
+    """
+    Returns the availability index of the process, building it from the database when it doesn't exist yet or when its
+    horizon must roll to the current day. Returns None if the index is disabled in the settings.
+    """
+    global _availability_index
+
+    if not settings.AVAILABILITY_INDEX_ENABLED:
+        return None
+
+    today = datetime.datetime.now(tz=datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    origin = today - datetime.timedelta(days=1)
+
+    with _availability_index_lock:
+        if _availability_index is None or _availability_index.origin != origin:
+            availability_index = AvailabilityIndex(
+                origin=origin,
+                horizon_days=settings.AVAILABILITY_INDEX_HORIZON_DAYS,
+                slot_minutes=settings.AVAILABILITY_INDEX_SLOT_MINUTES
+            )
+            # The index is published before it loads, so the writes committed while it loads are applied to it. They
+            # wait for its lock, and they are applied after the loaded reservations
+            previous_availability_index = _availability_index
+            with availability_index._lock:
+                _availability_index = availability_index
+                try:
+                    availability_index.load()
+                except Exception:
+                    _availability_index = previous_availability_index
+                    raise
+
+        return _availability_index
+
+
+def get_built_availability_index():
+    # Returns the index only if it already exists, the writes must not trigger a build
+    return _availability_index
+
+
+def reset_availability_index() -> None:
+    global _availability_index
+
+    with _availability_index_lock:
+        _availability_index = None
@@ -0,0 +1,218 @@
+import bisect
+import contextlib
+import functools
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from restaurants.services import search_cache
+
+# In-process metrics, rendered in the Prometheus text format. Every process has its own values, so with several
+# processes or instances each one must be scraped.
+
+default_duration_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+queries_buckets = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_labels(label_names, label_values, extra_labels=()) -> str:
+    labels = list(zip(label_names, label_values)) + list(extra_labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    ) + '}'
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name: str, description: str, label_names=()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, amount=1, **labels) -> None:
+        label_values = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[label_values] += amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(labels[name] for name in self.label_names), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def get_samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, _format_labels(self.label_names, label_values), value) for label_values, value in values]
+
+
+class Histogram:
+    """Histogram with fixed buckets, the observations are counted in the first bucket they fit in."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names=(), buckets=default_duration_buckets) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Counts per bucket (the last one is +Inf) and sum of the observations, by label values
+        self._values = {}
+
+    def observe(self, value, **labels) -> None:
+        label_values = tuple(labels[name] for name in self.label_names)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts_and_sum = self._values.get(label_values)
+            if counts_and_sum is None:
+                counts_and_sum = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0]
+            counts_and_sum[0][bucket_index] += 1
+            counts_and_sum[1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            counts_and_sum = self._values.get(tuple(labels[name] for name in self.label_names))
+            return sum(counts_and_sum[0]) if counts_and_sum is not None else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def get_samples(self) -> list:
+        with self._lock:
+            values = sorted(
+                (label_values, (list(counts), total)) for label_values, (counts, total) in self._values.items()
+            )
+
+        samples = []
+        for label_values, (counts, total) in values:
+            cumulative_count = 0
+            for upper_bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative_count += count
+                labels = _format_labels(self.label_names, label_values, [('le', upper_bound)])
+                samples.append((self.name + '_bucket', labels, cumulative_count))
+            labels = _format_labels(self.label_names, label_values)
+            samples.append((self.name + '_sum', labels, total))
+            samples.append((self.name + '_count', labels, cumulative_count))
+        return samples
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector) -> None:
+        """Registers a function that returns (name, type, description, value) of metrics kept elsewhere."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.description))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+            for name, labels, value in metric.get_samples():
+                lines.append('{}{} {}'.format(name, labels, _format_value(value)))
+        for collector in collectors:
+            for name, metric_type, description, value in collector():
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} {}'.format(name, metric_type))
+                lines.append('{} {}'.format(name, _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+service_duration = registry.register(Histogram(
+    'restaurants_service_duration_seconds', 'Duration of the service calls.', ['function']
+))
+view_duration = registry.register(Histogram(
+    'restaurants_view_duration_seconds', 'Duration of the requests by view.', ['view', 'method']
+))
+view_responses = registry.register(Counter(
+    'restaurants_view_responses_total', 'Responses by view and status code.', ['view', 'method', 'status_code']
+))
+view_db_queries = registry.register(Histogram(
+    'restaurants_view_db_queries', 'Database queries per request by view.', ['view'], buckets=queries_buckets
+))
+business_errors = registry.register(Counter(
+    'restaurants_business_errors_total', 'Business errors returned by code.', ['code']
+))
+
+
+def _collect_search_cache_stats() -> list:
+    stats = search_cache.get_stats()
+    return [
+        ('restaurants_search_cache_hits_total', 'counter', 'Searches answered by the search cache.', stats['hits']),
+        ('restaurants_search_cache_misses_total', 'counter', 'Searches missing in the search cache.', stats['misses']),
+    ]
+
+
+registry.register_collector(_collect_search_cache_stats)
+
+
+def is_enabled() -> bool:
+    return settings.METRICS_ENABLED
+
+
+def timed(function):
+    """Observes the duration of every call of the service function."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not is_enabled():
+            return function(*args, **kwargs)
+        with service_duration.time(function=function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+@contextlib.contextmanager
+def time_service(function_name: str):
+    """
+    Observes the duration of the block as a call of the service function. The searches return lazy results, so they are
+    timed where the results are read instead of with timed.
+    """
+    if not is_enabled():
+        yield
+        return
+    with service_duration.time(function=function_name):
+        yield
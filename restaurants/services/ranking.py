@@ -0,0 +1,287 @@
+import heapq
+import itertools
+
+import numpy
+from django.db.models import QuerySet
+
+from restaurants.models import Restaurant
+
+_earth_radius_km = 6371.0088
+
+
+class DistanceScorer:
+    """
+    Computes the distances from a group of diners to many restaurants at once. The diners coordinates are kept as a
+    column of the matrix and the restaurants coordinates as a row, so every diner/restaurant pair is computed in a
+    single vectorized operation.
+    """
+
+    metrics = ('euclidean', 'haversine')
+
+    def __init__(self, diners_coordinates, metric: str = 'euclidean') -> None:
+        coordinates = numpy.array(diners_coordinates, dtype=numpy.float64).reshape(-1, 2)
+        self.diners_lats = coordinates[:, 0:1]
+        self.diners_longs = coordinates[:, 1:2]
+        self.metric = metric
+
+    def get_distances(self, lats, longs, metric: str = None) -> numpy.ndarray:
+        """Returns a (diners, restaurants) matrix with the distance from every diner to every restaurant."""
+        lats = numpy.asarray(lats, dtype=numpy.float64)
+        longs = numpy.asarray(longs, dtype=numpy.float64)
+
+        if (metric or self.metric) == 'haversine':
+            # Great-circle distance in kilometers
+            diners_lats = numpy.radians(self.diners_lats)
+            lats = numpy.radians(lats)
+            a = numpy.sin((lats - diners_lats) / 2) ** 2 + \
+                numpy.cos(diners_lats) * numpy.cos(lats) * numpy.sin(numpy.radians(longs - self.diners_longs) / 2) ** 2
+            return 2 * _earth_radius_km * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+
+        # Euclidean distance in degrees
+        return numpy.sqrt((self.diners_lats - lats) ** 2 + (self.diners_longs - longs) ** 2)
+
+    def get_total_distances(self, lats, longs) -> numpy.ndarray:
+        return self.get_distances(lats, longs).sum(axis=0)
+
+    def get_within_distance_mask(self, lats, longs, max_distance_km: float) -> numpy.ndarray:
+        """Returns which restaurants are at max_distance_km or less from every diner."""
+        return (self.get_distances(lats, longs, metric='haversine') <= max_distance_km).all(axis=0)
+
+
+class RankedRestaurants:
+    """
+    The restaurants of a queryset sorted by the total distance from the diners, and by id on ties. Only the id and the
+    location of the restaurants are read to rank them, the restaurants themselves are fetched when a slice of the
+    ranking is read, with the total distance in the `total_distance` attribute.
+
+    The restaurants farther than max_distance_km from any diner are left out, and only the first `limit` restaurants
+    are kept when a limit is given.
+
+    Reading the first K restaurants (a page, or the whole ranking when there is a limit) streams the candidates through
+    a bounded heap of the best K, so the memory used depends on K and not on the amount of candidates. The whole
+    ranking is only sorted when it is needed, e.g. when iterating over it.
+    """
+
+    chunk_size = 2000
+
+    def __init__(self, restaurants_qs: QuerySet, scorer: DistanceScorer, max_distance_km: float = None,
+                 limit: int = None) -> None:
+        self.restaurants_qs = restaurants_qs
+        self.scorer = scorer
+        self.max_distance_km = max_distance_km
+        self.limit = limit
+        self._ids = numpy.empty(0, dtype=numpy.int64)
+        self._total_distances = numpy.empty(0, dtype=numpy.float64)
+        self._ranked_qty = 0  # the best _ranked_qty restaurants are known
+        self._is_complete = False  # the whole ranking is known
+        self._count = None
+
+    @classmethod
+    def from_ranking(cls, ids, total_distances, limit: int = None) -> 'RankedRestaurants':
+        """Returns the ranked restaurants of an already known whole ranking, e.g. one returned by get_ranking."""
+        ranked_restaurants = cls(None, None, limit=limit)
+        ranked_restaurants.set_ranking(ids, total_distances, is_complete=True)
+        return ranked_restaurants
+
+    def get_ranking(self, qty: int = None) -> tuple:
+        """
+        Returns the ids and the total distances of the best qty restaurants (of the whole ranking when qty is None), and
+        whether they are the whole ranking.
+        """
+        self._rank(qty)
+        ids, total_distances = self._ids[:qty], self._total_distances[:qty]
+        return ids.tolist(), total_distances.tolist(), self._is_complete and len(ids) == len(self._ids)
+
+    def set_ranking(self, ids, total_distances, is_complete: bool) -> None:
+        """Sets the best restaurants of an already known ranking, e.g. one returned by get_ranking."""
+        self._ids = numpy.array(ids, dtype=numpy.int64)
+        self._total_distances = numpy.array(total_distances, dtype=numpy.float64)
+        self._ranked_qty = len(self._ids)
+        self._is_complete = is_complete
+
+    def _get_scored_chunks(self):
+        """Yields the ids and the total distances of the candidates, a chunk of them at a time."""
+        rows = self.restaurants_qs.values_list('id', 'location_lat', 'location_long').iterator(
+            chunk_size=self.chunk_size
+        )
+
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                return
+
+            ids = numpy.array([row[0] for row in chunk], dtype=numpy.int64)
+            lats = numpy.array([row[1] for row in chunk], dtype=numpy.float64)
+            longs = numpy.array([row[2] for row in chunk], dtype=numpy.float64)
+
+            if self.max_distance_km is not None:
+                within_distance = self.scorer.get_within_distance_mask(lats, longs, self.max_distance_km)
+                ids, lats, longs = ids[within_distance], lats[within_distance], longs[within_distance]
+
+            yield ids, self.scorer.get_total_distances(lats, longs)
+
+    def _sort_all(self) -> None:
+        ids_chunks = [numpy.empty(0, dtype=numpy.int64)]
+        total_distances_chunks = [numpy.empty(0, dtype=numpy.float64)]
+        for ids, total_distances in self._get_scored_chunks():
+            ids_chunks.append(ids)
+            total_distances_chunks.append(total_distances)
+
+        ids = numpy.concatenate(ids_chunks)
+        total_distances = numpy.concatenate(total_distances_chunks)
+        order = numpy.lexsort((ids, total_distances))
+
+        self._ids = ids[order]
+        self._total_distances = total_distances[order]
+
+    def _select_top(self, qty: int, after: tuple = None):
+        """Returns the ids and the total distances of the best qty restaurants ranked after the `after` key."""
+        # Max-heap (through negated keys) of the best qty (total distance, id) pairs seen so far, its root is the worst
+        heap = []
+
+        for ids, total_distances in self._get_scored_chunks():
+            # Only the restaurants after the (total distance, id) key are candidates
+            if after is not None:
+                after_total_distance, after_id = after
+                is_after = (total_distances > after_total_distance) | \
+                    ((total_distances == after_total_distance) & (ids > after_id))
+                ids, total_distances = ids[is_after], total_distances[is_after]
+
+            # Only the best qty of the chunk (with the ties of the last one) and the ones better than the worst of the
+            # heap can get into it
+            candidates = numpy.ones(len(ids), dtype=bool)
+            if len(ids) > qty:
+                candidates &= total_distances <= numpy.partition(total_distances, qty - 1)[qty - 1]
+            if len(heap) == qty:
+                candidates &= total_distances <= -heap[0][0]
+
+            for total_distance, restaurant_id in zip(total_distances[candidates].tolist(), ids[candidates].tolist()):
+                item = (-total_distance, -restaurant_id)
+                if len(heap) < qty:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        best = sorted((-total_distance, -restaurant_id) for total_distance, restaurant_id in heap)
+        return (
+            numpy.array([restaurant_id for _, restaurant_id in best], dtype=numpy.int64),
+            numpy.array([total_distance for total_distance, _ in best], dtype=numpy.float64)
+        )
+
+    def _rank(self, qty: int = None) -> None:
+        """Ranks at least the best qty restaurants, or all of them when qty is None."""
+        if self.limit is not None:
+            qty = self.limit if qty is None else min(qty, self.limit)
+
+        if self._is_complete or (qty is not None and qty <= self._ranked_qty):
+            return
+
+        if qty is None:
+            self._sort_all()
+            self._is_complete = True
+        else:
+            self._ids, self._total_distances = self._select_top(qty)
+            self._is_complete = len(self._ids) < qty or qty == self.limit
+
+        self._ranked_qty = len(self._ids)
+
+    def rank(self) -> None:
+        """Ranks the whole ranking at once, so the pages read after it don't rank the candidates again."""
+        self._rank()
+
+    @property
+    def ids(self) -> list:
+        self._rank()
+        return self._ids.tolist()
+
+    def count(self) -> int:
+        if self._is_complete:
+            return len(self._ids)
+
+        if self._count is None:
+            if self.max_distance_km is None:
+                self._count = self.restaurants_qs.count()
+            else:
+                self._count = sum(len(ids) for ids, _ in self._get_scored_chunks())
+
+            if self.limit is not None:
+                self._count = min(self._count, self.limit)
+
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            if item < 0:
+                self._rank()
+            else:
+                self._rank(item + 1)
+            position = range(len(self._ids))[item]
+            restaurants_page = self[position:position + 1]
+            if not restaurants_page:
+                raise LookupError('The restaurant ranked at the position {} was deleted.'.format(item))
+            return restaurants_page[0]
+
+        if item.stop is None or item.stop < 0 or (item.start or 0) < 0:
+            self._rank()
+        else:
+            self._rank(item.stop)
+
+        return self._get_restaurants(self._ids[item], self._total_distances[item])
+
+    def get_page_after(self, after: tuple, qty: int) -> list:
+        """
+        Returns the qty restaurants ranked right after the (total distance, id) key, or the first qty restaurants when
+        after is None. The page is selected with the bounded heap, so reading page N costs the same as reading page 1.
+        """
+        restaurants_page = []
+        while qty > 0:
+            ids, total_distances = self._get_ranked_after(after, qty)
+            restaurants = self._get_restaurants(ids, total_distances)
+            restaurants_page.extend(restaurants)
+            if len(ids) < qty:
+                break
+
+            # The restaurants deleted after they were ranked are replaced by the next ones, so the page is only short
+            # at the end of the ranking
+            qty -= len(restaurants)
+            after = (total_distances[-1], ids[-1])
+
+        return restaurants_page
+
+    def _get_ranked_after(self, after: tuple, qty: int) -> tuple:
+        """Returns the ids and the total distances of the qty restaurants ranked right after the key."""
+        # The page starts at the first restaurant after the key in the known ranking, it is read from it when the known
+        # ranking holds the whole page
+        start = 0
+        if after is not None:
+            after_total_distance, after_id = after
+            is_after = (self._total_distances > after_total_distance) | \
+                ((self._total_distances == after_total_distance) & (self._ids > after_id))
+            start = int(numpy.argmax(is_after)) if is_after.any() else len(self._ids)
+        if self._is_complete or start + qty <= self._ranked_qty:
+            return self._ids[start:start + qty], self._total_distances[start:start + qty]
+
+        return self._select_top(qty, after=after)
+
+    def _get_restaurants(self, ids: numpy.ndarray, total_distances: numpy.ndarray) -> list:
+        ids = ids.tolist()
+        restaurants_by_id = Restaurant.objects.in_bulk(ids)
+
+        restaurants_page = []
+        for restaurant_id, total_distance in zip(ids, total_distances.tolist()):
+            # The restaurants deleted after they were ranked are skipped
+            restaurant = restaurants_by_id.get(restaurant_id)
+            if restaurant is None:
+                continue
+            restaurant.total_distance = total_distance
+            restaurants_page.append(restaurant)
+        return restaurants_page
+
+    def __iter__(self):
+        self._rank()
+        chunk_size = 100
+        for start in range(0, len(self._ids), chunk_size):
+            yield from self[start:start + chunk_size]
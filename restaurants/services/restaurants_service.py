@@ -1,26 +1,128 @@
 import datetime
-from django.db.models import QuerySet, Q, Subquery, F, Value, DateTimeField, ExpressionWrapper, BooleanField
-from django.db.models.functions import Sqrt, Power
-
-from restaurants.api.serializers import FindRestaurantsValidator, ReservationSerializer
+import functools
+import itertools
+import operator
+import random
+import time
+from collections import defaultdict
+from typing import Union
+
+import rest_framework.exceptions
+from django.conf import settings
+from django.db import connection, transaction, OperationalError
+from django.db.models import QuerySet, Q, Subquery, F, Count, Max
+from django.db.models.signals import post_save
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from restaurants.api.serializers import FindRestaurantsValidator, ReservationSerializer, ReservationsBatchValidator, \
+    ReservationsBatchItemValidator, BestFitReservationValidator, AvailableSlotsValidator
 from restaurants.custom_errors import DinerWithOverlappingReservationError, ReservationForAPastTimeError, \
-    TableCanNotHoldDinersQtyError, TableOccupiedError, RestaurantDoesntMatchAllDinersDietRestrictionsError
-from restaurants.models import Restaurant, Diner, DietType
-from restaurants.models.reservation import Reservation
+    TableCanNotHoldDinersQtyError, TableOccupiedError, RestaurantDoesntMatchAllDinersDietRestrictionsError, \
+    NoFreeTableError
+from restaurants.models import Restaurant, Diner, Table
+from restaurants.models.opening_interval import OpeningInterval, get_opening_intervals, \
+    get_reservation_intervals
+from restaurants.models.reservation import Reservation, get_reservation_end_datetime
+from restaurants.services.availability_index import get_availability_index
+from restaurants.services import metrics, search_cache, slots
+from restaurants.services.ranking import DistanceScorer, RankedRestaurants
+from restaurants.services.spatial import get_bounding_box_query, get_party_bounding_box
+
+
+def _get_overlapping_reservations(target_datetime, end_target_datetime) -> QuerySet:
+    # Two reservations overlap when each one starts before (or when) the other ends. Both bounds are stored columns,
+    # so this is a range predicate that the (table, datetime, end_datetime) index can serve
+    return Reservation.objects.filter(datetime__lte=end_target_datetime, end_datetime__gte=target_datetime)
+
+
+def _get_restaurants_with_free_table_query(target_datetime, diners_qty: int) -> Q:
+    overlapping_reservations = _get_overlapping_reservations(
+        target_datetime,
+        get_reservation_end_datetime(target_datetime)
+    )
 
-_reservation_hours_span = 2
+    return (
+        # Filtering by restaurant with tables capacity for the amount of diners
+        Q(table__capacity__gte=diners_qty) &
 
+        # Filtering by restaurants with available tables
+        ~Q(table__in=Subquery(overlapping_reservations.values('table_id').distinct()))
+    )
 
-def create_reservation(diners: list, target_datetime: str, table: int):
+
+def check_availability_index(target_datetime: datetime.datetime, diners_qty: int = 1) -> set:
+    """
+    Compares the restaurants with a free table according to the availability index with the ones according to the
+    database. Returns the ids of the restaurants where both disagree.
+    """
+    availability_index = get_availability_index()
+    if availability_index is None or not availability_index.covers(target_datetime):
+        return set()
+
+    index_restaurants_ids = availability_index.get_restaurants_with_free_table(target_datetime, diners_qty)
+    db_restaurants_ids = set(Restaurant.objects.filter(
+        _get_restaurants_with_free_table_query(target_datetime, diners_qty)
+    ).values_list('id', flat=True).distinct())
+
+    return index_restaurants_ids ^ db_restaurants_ids
+
+
+def _lock_booking_rows(tables_ids, diners_ids) -> None:
+    # The tables and the diners of the bookings are locked in id order, so concurrent bookings of the same table or
+    # diner wait for each other while the bookings of other tables and diners go on. SQLite doesn't lock rows, there
+    # the database write lock serializes the bookings instead
+    list(Table.objects.select_for_update().filter(id__in=tables_ids).order_by('id').values_list('id', flat=True))
+    list(Diner.objects.select_for_update().filter(id__in=diners_ids).order_by('id').values_list('id', flat=True))
+
+
+def _book(booking):
+    """Runs the booking function in a transaction, and again when it fails because of a lock conflict."""
+    # A transaction that failed can only be retried when it is not part of an outer one
+    can_retry = not transaction.get_connection().in_atomic_block
+    max_attempts = settings.RESERVATION_BOOKING_MAX_ATTEMPTS
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with transaction.atomic():
+                return booking()
+        except OperationalError:
+            if not can_retry or attempt == max_attempts:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _validate_party(diners: list, restaurant: Restaurant, target_datetime, end_target_datetime) -> None:
+    # Validating the restaurant match all diet restriction of all diners, the diet types of the diners must be a subset
+    # of the diet types of the restaurant
+    party_diet_mask = 0
+    for diner in diners:
+        party_diet_mask |= diner.diet_types_mask
+
+    if party_diet_mask & ~restaurant.diet_endorsement_mask:
+        raise RestaurantDoesntMatchAllDinersDietRestrictionsError()
+
+    # Validating that diners don't have overlapping reservations, the overlaps of the whole party are read at once and
+    # the first diner of the party with an overlap is reported
+    overlapping_diners_ids = set(Reservation.diners.through.objects.filter(
+        diner_id__in=[diner.id for diner in diners],
+        reservation__datetime__lte=end_target_datetime,
+        reservation__end_datetime__gte=target_datetime
+    ).values_list('diner_id', flat=True))
+
+    for diner in diners:
+        if diner.id in overlapping_diners_ids:
+            raise DinerWithOverlappingReservationError(diner_id=diner.id)
+
+
+def _book_reservation(diners: list, target_datetime: str, table: int):
     validator = ReservationSerializer(data={'diners': diners, 'table': table, 'datetime': target_datetime})
     validator.is_valid(raise_exception=True)
 
-    diners_ids = diners
     diners = validator.validated_data['diners']
     table = validator.validated_data['table']
     target_datetime = validator.validated_data['datetime']
 
-    end_target_datetime = target_datetime + datetime.timedelta(hours=_reservation_hours_span)
+    end_target_datetime = get_reservation_end_datetime(target_datetime)
 
     # Validating that the reservation not for a past datetime
     if target_datetime < datetime.datetime.now(tz=datetime.timezone.utc):
@@ -30,94 +132,325 @@ def create_reservation(diners: list, target_datetime: str, table: int):
     if table.capacity < len(diners):
         raise TableCanNotHoldDinersQtyError(table_capacity=table.capacity, diners_qty=len(diners))
 
+    _lock_booking_rows(tables_ids=[table.id], diners_ids=[diner.id for diner in diners])
+
     # Validating the table is not occupied on the selected datetime
-    overlapping_reservations = Reservation.objects.annotate(
-        end_datetime=ExpressionWrapper(
-            F('datetime') + datetime.timedelta(hours=_reservation_hours_span),
-            output_field=DateTimeField()
-        )
-    ).filter(
-        Q(table_id=table.id) &
-        (
-                (Q(datetime__lte=target_datetime) & Q(end_datetime__gte=target_datetime)) |
-                (Q(datetime__lte=end_target_datetime) & Q(end_datetime__gt=end_target_datetime))
-        )
+    overlapping_reservations = _get_overlapping_reservations(target_datetime, end_target_datetime).filter(
+        table_id=table.id
     )
 
     if overlapping_reservations.exists():
         raise TableOccupiedError(target_datetime=target_datetime)
 
-    # Validating the restaurant match all diet restriction of all diners
-    diners_diet_types_set = set(DietType.objects.filter(diner__in=diners_ids).distinct())
-    restaurant_diet_types_set = set(DietType.objects.filter(restaurant=table.restaurant_id).distinct())
+    _validate_party(diners, table.restaurant, target_datetime, end_target_datetime)
 
-    # if the diners diet types is not a subset of the restaurant diet types then raise an exception
-    if not diners_diet_types_set <= restaurant_diet_types_set:
-        raise RestaurantDoesntMatchAllDinersDietRestrictionsError()
+    # Saving reservation
+    reservation = Reservation.objects.create(datetime=target_datetime, table_id=table.id)
+    reservation.diners.add(*diners)
+    return reservation
 
-    # Validating that diners don't have overlapping reservations
-    for diner in diners:
-        overlapping_reservations_qs = Reservation.objects.annotate(
-            end_datetime=ExpressionWrapper(
-                F('datetime') + datetime.timedelta(hours=_reservation_hours_span),
-                output_field=DateTimeField()
-            )
-        ).filter(
-            Q(diners=diner) &
-            (
-                    (Q(datetime__lte=target_datetime) & Q(end_datetime__gte=target_datetime)) |
-                    (Q(datetime__lte=end_target_datetime) & Q(end_datetime__gt=end_target_datetime))
-            )
-        )
 
-        if overlapping_reservations_qs.exists():
-            raise DinerWithOverlappingReservationError(diner_id=diner.id)
+@metrics.timed
+def create_reservation(diners: list, target_datetime: str, table: int):
+    # The checks of the table and the diners reservations and the insert are atomic, so two concurrent bookings can't
+    # both pass the checks
+    return _book(functools.partial(_book_reservation, diners, target_datetime, table))
+
+
+def _book_best_fit_reservation(diners: list, target_datetime: str, restaurant: int):
+    validator = BestFitReservationValidator(data={
+        'diners': diners,
+        'restaurant': restaurant,
+        'datetime': target_datetime
+    })
+    validator.is_valid(raise_exception=True)
+
+    diners = validator.validated_data['diners']
+    restaurant = validator.validated_data['restaurant']
+    target_datetime = validator.validated_data['datetime']
+
+    end_target_datetime = get_reservation_end_datetime(target_datetime)
+
+    # Validating that the reservation not for a past datetime
+    if target_datetime < datetime.datetime.now(tz=datetime.timezone.utc):
+        raise ReservationForAPastTimeError(target_datetime)
+
+    # The tables that can hold the diners, from the smallest one
+    tables_ids = list(Table.objects.filter(
+        restaurant_id=restaurant.id,
+        capacity__gte=len(diners)
+    ).order_by('capacity', 'id').values_list('id', flat=True))
+
+    if not tables_ids:
+        max_capacity = Table.objects.filter(restaurant_id=restaurant.id).aggregate(Max('capacity'))['capacity__max']
+        raise TableCanNotHoldDinersQtyError(table_capacity=max_capacity or 0, diners_qty=len(diners))
+
+    _lock_booking_rows(tables_ids=tables_ids, diners_ids=[diner.id for diner in diners])
+
+    # The reservations of the tables that overlap the target datetime come from a range scan of the (table, datetime,
+    # end_datetime) index, the smallest table without any of them is the best fit
+    occupied_tables_ids = set(_get_overlapping_reservations(target_datetime, end_target_datetime).filter(
+        table_id__in=tables_ids
+    ).values_list('table_id', flat=True))
+
+    free_tables_ids = [table_id for table_id in tables_ids if table_id not in occupied_tables_ids]
+    if not free_tables_ids:
+        raise NoFreeTableError(diners_qty=len(diners), target_datetime=target_datetime)
+
+    _validate_party(diners, restaurant, target_datetime, end_target_datetime)
 
     # Saving reservation
-    reservation = Reservation.objects.create(datetime=target_datetime, table_id=table.id)
-    reservation.save()
+    reservation = Reservation.objects.create(datetime=target_datetime, table_id=free_tables_ids[0])
     reservation.diners.add(*diners)
     return reservation
 
 
-def find_restaurants(diners=None, target_datetime: str = None, or_version=False) -> QuerySet:
+@metrics.timed
+def create_best_fit_reservation(diners: list, target_datetime: str, restaurant: int):
+    # The table is picked and booked in the same transaction, with the candidate tables locked
+    return _book(functools.partial(_book_best_fit_reservation, diners, target_datetime, restaurant))
+
+
+def _overlaps(start_datetime, end_datetime, intervals) -> bool:
+    return any(
+        other_start_datetime <= end_datetime and other_end_datetime >= start_datetime
+        for other_start_datetime, other_end_datetime in intervals
+    )
+
+
+def _book_reservations(reservations: list) -> list:
+    batch_validator = ReservationsBatchValidator(data={'reservations': reservations})
+    batch_validator.is_valid(raise_exception=True)
+
+    does_not_exist_message = PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+    results = []
+    pending_items = []  # (position, validated data) of the reservations that are still valid
+    for position, reservation in enumerate(batch_validator.validated_data['reservations']):
+        validator = ReservationsBatchItemValidator(data={
+            'diners': reservation.get('diners'),
+            'table': reservation.get('table'),
+            'datetime': reservation.get('target_datetime')
+        })
+        if validator.is_valid():
+            results.append(None)
+            pending_items.append((position, validator.validated_data))
+        else:
+            results.append(rest_framework.exceptions.ValidationError(validator.errors))
+
+    if not pending_items:
+        return results
+
+    # Fetching the diners and the tables of the whole batch
+    diners_by_id = Diner.objects.in_bulk({diner_id for _, item in pending_items for diner_id in item['diners']})
+    tables_by_id = Table.objects.select_related('restaurant').in_bulk({item['table'] for _, item in pending_items})
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    valid_items = []
+    for position, item in pending_items:
+        missing_diners_ids = [diner_id for diner_id in item['diners'] if diner_id not in diners_by_id]
+        if missing_diners_ids:
+            results[position] = rest_framework.exceptions.ValidationError({
+                'diners': [does_not_exist_message.format(pk_value=missing_diners_ids[0])]
+            })
+        elif item['table'] not in tables_by_id:
+            results[position] = rest_framework.exceptions.ValidationError({
+                'table': [does_not_exist_message.format(pk_value=item['table'])]
+            })
+        elif item['datetime'] < now:
+            results[position] = ReservationForAPastTimeError(item['datetime'])
+        elif tables_by_id[item['table']].capacity < len(item['diners']):
+            results[position] = TableCanNotHoldDinersQtyError(
+                table_capacity=tables_by_id[item['table']].capacity,
+                diners_qty=len(item['diners'])
+            )
+        else:
+            item['end_datetime'] = get_reservation_end_datetime(item['datetime'])
+            valid_items.append((position, item))
+
+    if not valid_items:
+        return results
+
+    _lock_booking_rows(
+        tables_ids={item['table'] for _, item in valid_items},
+        diners_ids={diner_id for _, item in valid_items for diner_id in item['diners']}
+    )
+
+    # Fetching the existing reservations that overlap the reservations of the batch, for their tables and for
+    # their diners, with one query each
+    tables_intervals = defaultdict(list)
+    tables_overlaps_query = functools.reduce(operator.or_, [
+        Q(table_id=item['table'], datetime__lte=item['end_datetime'], end_datetime__gte=item['datetime'])
+        for _, item in valid_items
+    ])
+    for table_id, start_datetime, end_datetime in Reservation.objects.filter(tables_overlaps_query).values_list(
+        'table_id', 'datetime', 'end_datetime'
+    ):
+        tables_intervals[table_id].append((start_datetime, end_datetime))
+
+    diners_intervals = defaultdict(list)
+    diners_overlaps_query = functools.reduce(operator.or_, [
+        Q(
+            diner_id__in=item['diners'],
+            reservation__datetime__lte=item['end_datetime'],
+            reservation__end_datetime__gte=item['datetime']
+        )
+        for _, item in valid_items
+    ])
+    for diner_id, start_datetime, end_datetime in Reservation.diners.through.objects.filter(
+        diners_overlaps_query
+    ).values_list('diner_id', 'reservation__datetime', 'reservation__end_datetime'):
+        diners_intervals[diner_id].append((start_datetime, end_datetime))
+
+    # The reservations are checked in the batch order, the accepted ones occupy their table and their diners for
+    # the next ones
+    accepted_items = []
+    for position, item in valid_items:
+        table = tables_by_id[item['table']]
+        party_diet_mask = 0
+        for diner_id in item['diners']:
+            party_diet_mask |= diners_by_id[diner_id].diet_types_mask
+        overlapping_diners_ids = [
+            diner_id for diner_id in item['diners']
+            if _overlaps(item['datetime'], item['end_datetime'], diners_intervals[diner_id])
+        ]
+
+        if _overlaps(item['datetime'], item['end_datetime'], tables_intervals[table.id]):
+            results[position] = TableOccupiedError(target_datetime=item['datetime'])
+        elif party_diet_mask & ~table.restaurant.diet_endorsement_mask:
+            results[position] = RestaurantDoesntMatchAllDinersDietRestrictionsError()
+        elif overlapping_diners_ids:
+            results[position] = DinerWithOverlappingReservationError(diner_id=overlapping_diners_ids[0])
+        else:
+            tables_intervals[table.id].append((item['datetime'], item['end_datetime']))
+            for diner_id in item['diners']:
+                diners_intervals[diner_id].append((item['datetime'], item['end_datetime']))
+            accepted_items.append((position, item))
+
+    if not accepted_items:
+        return results
+
+    # Saving the reservations
+    new_reservations = [
+        Reservation(table_id=item['table'], datetime=item['datetime'], end_datetime=item['end_datetime'])
+        for _, item in accepted_items
+    ]
+    Reservation.objects.bulk_create(new_reservations)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # The ids of the inserted rows are needed for the diners relations, the backends that can't return them from
+        # a bulk insert read them back with a single query. A table has one reservation at most at a datetime, the
+        # accepted reservations don't overlap and the tables are locked
+        ids_by_table_datetime = {
+            (table_id, start_datetime): reservation_id
+            for reservation_id, table_id, start_datetime in Reservation.objects.filter(
+                functools.reduce(operator.or_, [
+                    Q(table_id=reservation.table_id, datetime=reservation.datetime)
+                    for reservation in new_reservations
+                ])
+            ).values_list('id', 'table_id', 'datetime')
+        }
+        for reservation in new_reservations:
+            reservation.id = ids_by_table_datetime[(reservation.table_id, reservation.datetime)]
+            reservation._state.adding = False
+            reservation._state.db = Reservation.objects.db
+
+    # bulk_create doesn't send the post_save signals the availability index and the search cache rely on
+    for reservation in new_reservations:
+        post_save.send(
+            sender=Reservation, instance=reservation, created=True, update_fields=None, raw=False,
+            using=reservation._state.db
+        )
+
+    Reservation.diners.through.objects.bulk_create([
+        Reservation.diners.through(reservation_id=reservation.id, diner_id=diner_id)
+        for reservation, (_, item) in zip(new_reservations, accepted_items)
+        for diner_id in dict.fromkeys(item['diners'])
+    ])
+
+    for reservation, (position, _) in zip(new_reservations, accepted_items):
+        results[position] = reservation
+
+    return results
+
+
+@metrics.timed
+def create_reservations(reservations: list) -> list:
+    """
+    Creates a batch of reservations. The whole batch is validated with a fixed amount of queries, the conflicts between
+    its own reservations included, and the valid reservations are inserted in a single transaction.
+
+    Returns, for every reservation of the batch, the created Reservation or the ValidationError/BusinessError that
+    prevented it.
+    """
+    # The checks against the existing reservations and the inserts are atomic, a retried booking checks the whole batch
+    # again
+    return _book(functools.partial(_book_reservations, reservations))
+
+
+def find_restaurants(diners=None, target_datetime: str = None, or_version=False, metric: str = 'euclidean',
+                     max_distance_km: float = None, limit: int = None) -> Union[QuerySet, RankedRestaurants]:
     if diners is None:
         diners = []
 
-    validator = FindRestaurantsValidator(data={'diners': diners, 'target_datetime': target_datetime})
+    validator = FindRestaurantsValidator(data={
+        'diners': diners,
+        'target_datetime': target_datetime,
+        'metric': metric,
+        'max_distance_km': max_distance_km,
+        'limit': limit
+    })
     validator.is_valid(raise_exception=True)
 
     diners_ids = diners
-    # diners = validator.validated_data['diners']  # Diners objects, we dont need it in this service
+    diners = validator.validated_data['diners']
     target_datetime = validator.validated_data['target_datetime']
+    metric = validator.validated_data['metric']
+    max_distance_km = validator.validated_data['max_distance_km']
+    limit = validator.validated_data['limit']
+
+    # The first restaurants of the rankings of the searches with diners are cached when the search cache is enabled
+    search_key = None
+    ranking = None
+    if diners_ids and search_cache.is_enabled():
+        search_key = search_cache.get_search_key(
+            [diner.id for diner in diners], target_datetime, or_version, metric, max_distance_km, limit
+        )
+        ranking = search_cache.get_ranking(search_key)
+
+    diners_coordinates = [(diner.house_location_lat, diner.house_location_long) for diner in diners]
 
     query = Q()
 
+    # filtering by the restaurants close to the diners. Only the restaurants in the grid cells of the region at
+    # max_distance_km or less from every diner are considered, the exact distances are checked in the ranking
+    if max_distance_km is not None:
+        query &= get_bounding_box_query(get_party_bounding_box(diners_coordinates, max_distance_km))
+
     # filtering by the restaurants that match the dietary restrictions. In the AND version every returned restaurant
     # must match all dietary restrictions of every user. In the OR version every restaurant must match at least one
     # dietary restriction of every user
     if diners_ids:
 
+        diners_diet_masks = {diner.id: diner.diet_types_mask for diner in diners}
+
         if not or_version:
             # *************** AND VERSION ***************
 
-            diet_types_ids = list(DietType.objects.filter(diner__in=diners_ids).values_list('id', flat=True).distinct())
+            # The diet types of the diners are merged in a single mask, a restaurant matches all of them if its
+            # endorsement mask contains every bit of the party mask
+            party_diet_mask = 0
+            for diet_types_mask in diners_diet_masks.values():
+                party_diet_mask |= diet_types_mask
 
-            if len(diet_types_ids) > 0:
+            if party_diet_mask:
 
-                restaurants_ids_qs = Restaurant.objects.filter(
+                restaurants_ids_qs = Restaurant.objects.annotate(
+                    party_diet_match=F('diet_endorsement_mask').bitand(party_diet_mask)
+                ).filter(
                     Q(table__capacity__gte=len(diners_ids)) &
-                    Q(diet_endorsement_types=diet_types_ids.pop())
+                    Q(party_diet_match=party_diet_mask)
                 ).values('id').distinct()
 
-                for diet_type_id in diet_types_ids:
-                    restaurants_ids_qs = restaurants_ids_qs.intersection(
-                        Restaurant.objects.filter(
-                            Q(table__capacity__gte=len(diners_ids)) &
-                            Q(diet_endorsement_types=diet_type_id)
-                        ).values('id').distinct()
-                    )
-
                 query &= Q(id__in=Subquery(restaurants_ids_qs))
 
         else:
@@ -125,93 +458,207 @@ def find_restaurants(diners=None, target_datetime: str = None, or_version=False)
 
             # removing diners without dietary restrictions, we only need the restricted ones because the others can
             # go to any restaurant
-            restricted_diners_ids = [diner_id for diner_id in diners_ids if
-                                     DietType.objects.filter(diner=diner_id).count() > 0]
+            restricted_diners_ids = [
+                diner_id for diner_id, diet_types_mask in diners_diet_masks.items() if diet_types_mask
+            ]
 
             if restricted_diners_ids:
 
+                # Joining the restaurants endorsements with the restricted diners diet types, a restaurant matches if
+                # every restricted diner shares at least one diet type with it
                 restaurants_ids_qs = Restaurant.objects.filter(
                     Q(table__capacity__gte=len(diners_ids)) &
-                    Q(diet_endorsement_types__in=Subquery(DietType.objects.filter(diner=restricted_diners_ids.pop()).values('id')))
-                ).values('id').distinct()
-
-                for diner_id in restricted_diners_ids:
-                    restaurants_ids_qs = restaurants_ids_qs.intersection(
-                        Restaurant.objects.filter(
-                            Q(table__capacity__gte=len(diners_ids)) &
-                            Q(diet_endorsement_types__in=Subquery(DietType.objects.filter(diner=diner_id).values('id')))
-                        ).values('id').distinct()
-                    )
+                    Q(diet_endorsement_types__diner__in=restricted_diners_ids)
+                ).values('id').annotate(
+                    matched_diners_qty=Count('diet_endorsement_types__diner', distinct=True)
+                ).filter(matched_diners_qty=len(restricted_diners_ids)).values('id')
 
                 query &= Q(id__in=Subquery(restaurants_ids_qs))
 
     # filtering by time availability
     if target_datetime:
-        end_target_datetime = target_datetime + datetime.timedelta(hours=_reservation_hours_span)
-
-        overlapping_reservations = Reservation.objects.annotate(
-            end_datetime=ExpressionWrapper(
-                F('datetime') + datetime.timedelta(hours=_reservation_hours_span),
-                output_field=DateTimeField()
+        end_target_datetime = get_reservation_end_datetime(target_datetime)
+
+        # Filtering by the restaurants with open hours in the time of the reservation, every interval of minutes of the
+        # reservation must be inside an opening interval of the restaurant
+        opening_hours_query = Q()
+        for reservation_start, reservation_end in get_reservation_intervals(target_datetime, end_target_datetime):
+            opening_hours_query &= Q(id__in=OpeningInterval.objects.filter(
+                start_minute__lte=reservation_start,
+                end_minute__gte=reservation_end
+            ).values('restaurant_id'))
+
+        # Filtering by restaurants with an available table with capacity for the amount of diners. The availability
+        # index answers it from memory when it is enabled and covers the target datetime, the restaurants whose tables
+        # are all occupied are excluded, there are usually much less of them than restaurants with a free table
+        availability_index = get_availability_index()
+        if availability_index is not None and availability_index.covers(target_datetime):
+            availability_query = Q(table__capacity__gte=len(diners_ids)) & ~Q(
+                id__in=availability_index.get_restaurants_without_free_table(target_datetime, len(diners_ids))
             )
-        ).filter(
-            (Q(datetime__gte=target_datetime) & Q(datetime__lte=end_target_datetime)) |
-            (Q(end_datetime__gte=target_datetime) & Q(end_datetime__lte=end_target_datetime))
-        )
+        else:
+            availability_query = _get_restaurants_with_free_table_query(target_datetime, len(diners_ids))
 
-        rn0 = target_datetime.time()  # reservation start time
-        rn1 = end_target_datetime.time()  # reservation end time
-        day_end_time = datetime.time(hour=23, minute=59, second=59, microsecond=999999)
-        day_start_time = datetime.time(hour=0, minute=0, second=0, microsecond=0)
-
-        restaurants_ids_qs = Restaurant.objects.filter(
-
-            # Filtering by the restaurants with open hours in the time of the reservation
-            ((
-                     Q(open_time__lt=F('close_time')) &
-                     (Q(open_time__lte=rn0) & Q(close_time__gte=rn0)) &
-                     (Q(open_time__lte=rn1) & Q(close_time__gte=rn1))
-             ) |
-             (
-                     Q(open_time__gt=F('close_time')) &
-                     (
-                             (Q(open_time__lte=rn0) & Q(
-                                 ExpressionWrapper(Value(rn0 <= day_end_time), BooleanField()))) |
-                             (Q(ExpressionWrapper(Value(rn0 >= day_start_time), BooleanField())) & Q(
-                                 close_time__gte=rn0))
-                     ) &
-                     (
-                             (Q(open_time__lte=rn1) & Q(
-                                 ExpressionWrapper(Value(rn1 <= day_end_time), BooleanField()))) |
-                             (Q(ExpressionWrapper(Value(rn1 >= day_start_time), BooleanField())) & Q(
-                                 close_time__gte=rn1))
-                     )
-             )) &
-
-            # Filtering by restaurant with tables capacity for the amount of diners
-            Q(table__capacity__gte=len(diners_ids)) &
-
-            # Filtering by restaurants with available tables
-            ~Q(table__in=Subquery(overlapping_reservations.values('table_id').distinct()))
-
-        ).values('id').distinct()
+        restaurants_ids_qs = Restaurant.objects.filter(opening_hours_query & availability_query).values('id').distinct()
 
         query &= Q(id__in=Subquery(restaurants_ids_qs))
 
     restaurants_qs = Restaurant.objects.filter(query)
 
-    # if there are diners then sort the restaurants by the total distance from diners to the restaurant
+    # if there are diners then sort the restaurants by the total distance from diners to the restaurant. The ranking is
+    # computed in memory from the restaurants locations, with the euclidean distance in degrees (the default) or the
+    # haversine distance in kilometers
     if diners_ids:
 
-        total_distance_expr = Value(0)
+        scorer = DistanceScorer(diners_coordinates, metric=metric)
+        ranked_restaurants = RankedRestaurants(restaurants_qs, scorer, max_distance_km=max_distance_km, limit=limit)
+        if ranking is not None:
+            ranked_restaurants.set_ranking(*ranking)
+        elif search_key is not None:
+            # Only the first page (and the restaurant that tells if there is a next one) is ranked and cached, the next
+            # pages are ranked after the key of their cursor
+            search_cache.set_ranking(search_key, ranked_restaurants.get_ranking(search_cache.ranking_size))
+        return ranked_restaurants
+
+    if limit is not None:
+        restaurants_qs = restaurants_qs.order_by('id')[:limit]
+
+    return restaurants_qs
+
 
-        for diner_id in diners_ids:
-            diner = Diner.objects.get(id=diner_id)
-            total_distance_expr += Sqrt(
-                Power(diner.house_location_lat - F('location_lat'), 2) +
-                Power(diner.house_location_long - F('location_long'), 2)
+class AvailableRestaurants:
+    """
+    Restaurants found for the diners with a free table at some start datetime of a window, read page by page in the
+    order of find_restaurants. The free start datetimes of every restaurant are in its free_start_datetimes attribute.
+    The limit applies to the restaurants with free start datetimes.
+    """
+
+    max_chunk_size = 500
+
+    def __init__(self, found_restaurants: Union[QuerySet, RankedRestaurants], start_datetimes: list, diners_qty: int,
+                 limit: int = None) -> None:
+        self.found_restaurants = found_restaurants
+        self.ranked = isinstance(found_restaurants, RankedRestaurants)
+        self.start_datetimes = start_datetimes
+        self.diners_qty = diners_qty
+        self.limit = limit
+
+    def _get_found_restaurants_after(self, after: tuple, qty: int) -> list:
+        if self.ranked:
+            return self.found_restaurants.get_page_after(after, qty)
+        restaurants_qs = self.found_restaurants
+        if after is not None:
+            restaurants_qs = restaurants_qs.filter(id__gt=after[1])
+        return list(restaurants_qs.order_by('id')[:qty])
+
+    def _set_free_start_datetimes(self, restaurants_chunk: list) -> None:
+        # The tables that can hold the diners and their reservations that overlap some reservation of the window are
+        # read at once for the whole chunk
+        tables_qty = defaultdict(int)
+        tables_restaurants = {}
+        for table_id, restaurant_id in Table.objects.filter(
+            restaurant_id__in=[restaurant.id for restaurant in restaurants_chunk],
+            capacity__gte=self.diners_qty
+        ).values_list('id', 'restaurant_id'):
+            tables_qty[restaurant_id] += 1
+            tables_restaurants[table_id] = restaurant_id
+
+        tables_reservations = defaultdict(lambda: defaultdict(list))
+        if tables_restaurants:
+            for table_id, reservation_start, reservation_end in Reservation.objects.filter(
+                table_id__in=tables_restaurants.keys(),
+                datetime__lte=get_reservation_end_datetime(self.start_datetimes[-1]),
+                end_datetime__gte=self.start_datetimes[0]
+            ).values_list('table_id', 'datetime', 'end_datetime'):
+                tables_reservations[tables_restaurants[table_id]][table_id].append(
+                    (reservation_start, reservation_end)
+                )
+
+        for restaurant in restaurants_chunk:
+            restaurant.free_start_datetimes = []
+            if not tables_qty[restaurant.id]:
+                continue
+
+            opening_intervals = get_opening_intervals(restaurant.open_time, restaurant.close_time)
+            open_start_datetimes = [
+                start_datetime for start_datetime in self.start_datetimes
+                if slots.is_open_for_reservation(opening_intervals, start_datetime)
+            ]
+            restaurant.free_start_datetimes = slots.get_free_start_datetimes(
+                open_start_datetimes, tables_qty[restaurant.id], tables_reservations[restaurant.id]
             )
 
-        restaurants_qs = restaurants_qs.annotate(total_distance=total_distance_expr).order_by('total_distance')
+    def _iter_after(self, after: tuple, chunk_size: int):
+        if not self.start_datetimes:
+            return
+
+        # The found restaurants are read in chunks that grow while many of them have no free start datetime
+        while True:
+            restaurants_chunk = self._get_found_restaurants_after(after, chunk_size)
+            if not restaurants_chunk:
+                return
+
+            self._set_free_start_datetimes(restaurants_chunk)
+            yield from (restaurant for restaurant in restaurants_chunk if restaurant.free_start_datetimes)
+
+            if len(restaurants_chunk) < chunk_size:
+                return
+            last_restaurant = restaurants_chunk[-1]
+            after = (getattr(last_restaurant, 'total_distance', None), last_restaurant.id)
+            chunk_size = min(chunk_size * 2, self.max_chunk_size)
+
+            # Every chunk of a ranking that is not known yet ranks all the candidates, the next chunks are read from the
+            # whole ranking, ranked once
+            if self.ranked:
+                self.found_restaurants.rank()
+
+    def get_page_after(self, after: tuple, qty: int) -> list:
+        """
+        Returns the qty restaurants with free start datetimes right after the (total distance, id) key of the found
+        restaurants (the total distance is None when they are not ranked), or the first ones when after is None.
+        """
+        if qty <= 0:
+            return []
+        return list(itertools.islice(self._iter_after(after, min(qty, self.max_chunk_size)), qty))
+
+    def count(self) -> int:
+        # Every found restaurant must be checked
+        return sum(1 for _ in itertools.islice(self._iter_after(None, self.max_chunk_size), self.limit))
+
+
+def find_available_slots(diners=None, window_start: str = None, window_end: str = None, step: int = 30,
+                         or_version=False, metric: str = 'euclidean', max_distance_km: float = None,
+                         limit: int = None) -> AvailableRestaurants:
+    """
+    Returns the restaurants found for the diners that have a free table for them at some start datetime of the window,
+    every step minutes. The restaurants keep the order of find_restaurants, and they are read page by page.
+    """
+    validator = AvailableSlotsValidator(data={
+        'window_start': window_start,
+        'window_end': window_end,
+        'step': step,
+        'limit': limit
+    })
+    validator.is_valid(raise_exception=True)
 
-    return restaurants_qs
+    # The restaurants are found without a target datetime, the availability of every start datetime is computed when
+    # the pages are read. The limit is applied after, to the restaurants with free start datetimes
+    found_restaurants = find_restaurants(
+        diners=diners,
+        or_version=or_version,
+        metric=metric,
+        max_distance_km=max_distance_km
+    )
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    start_datetimes = [
+        start_datetime for start_datetime in slots.get_start_datetimes(
+            validator.validated_data['window_start'],
+            validator.validated_data['window_end'],
+            validator.validated_data['step']
+        ) if start_datetime >= now
+    ]
+
+    return AvailableRestaurants(
+        found_restaurants, start_datetimes, max(len(diners or []), 1), limit=validator.validated_data['limit']
+    )
@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.settings import api_settings
+
+from restaurants.models.reservation import get_reservation_end_datetime, reservation_hours_span
+
+# The searches results are cached under keys built from the search parameters and the versions of the data they depend
+# on. Invalidating data just deletes its version, the next search creates a new one, so the old results are not read
+# anymore and expire. A deleted or evicted version is never reused, so no stale result can come back.
+#
+# * catalog: restaurants, tables and diet types, every search depends on it
+# * diner: the location and the diet types of a diner, the searches of the parties with the diner depend on it
+# * day: the reservations that overlap the searches of a day, the searches with a target datetime depend on it
+
+_key_prefix = 'find_restaurants'
+_catalog_version_key = _key_prefix + ':version:catalog'
+
+# Restaurants of the cached rankings, the first page and the restaurant that tells if there is a next one
+ranking_size = api_settings.PAGE_SIZE + 1
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def is_enabled() -> bool:
+    return settings.FIND_RESTAURANTS_CACHE_ENABLED
+
+
+def _get_cache():
+    return caches[settings.FIND_RESTAURANTS_CACHE_ALIAS]
+
+
+def _get_diner_version_key(diner_id: int) -> str:
+    return '{}:version:diner:{}'.format(_key_prefix, diner_id)
+
+
+def _get_day_version_key(day: datetime.date) -> str:
+    return '{}:version:day:{}'.format(_key_prefix, day.isoformat())
+
+
+def _get_utc_day(value: datetime.datetime) -> datetime.date:
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return value.date()
+
+
+def _get_versions(versions_keys: list) -> list:
+    cache = _get_cache()
+    versions = cache.get_many(versions_keys)
+
+    missing_versions = {key: uuid.uuid4().hex for key in versions_keys if key not in versions}
+    if missing_versions:
+        for key, version in missing_versions.items():
+            cache.add(key, version, timeout=None)
+        # Another process could have created some of the versions first
+        missing_versions.update(cache.get_many(missing_versions.keys()))
+        versions.update(missing_versions)
+
+    return [versions[key] for key in versions_keys]
+
+
+def get_search_key(diners_ids, target_datetime: datetime.datetime, or_version: bool, metric: str,
+                   max_distance_km: float, limit: int) -> str:
+    diners_ids = sorted(diners_ids)
+
+    versions_keys = [_catalog_version_key] + [_get_diner_version_key(diner_id) for diner_id in set(diners_ids)]
+    if target_datetime is not None:
+        versions_keys.append(_get_day_version_key(_get_utc_day(target_datetime)))
+
+    search = {
+        'diners': diners_ids,
+        'target_datetime': target_datetime.isoformat() if target_datetime is not None else None,
+        'match': 'any' if or_version else 'all',
+        'metric': metric,
+        'max_distance_km': max_distance_km,
+        'limit': limit,
+        'versions': _get_versions(versions_keys),
+    }
+    return '{}:ranking:{}'.format(_key_prefix, hashlib.sha1(json.dumps(search, sort_keys=True).encode()).hexdigest())
+
+
+def get_ranking(search_key: str):
+    """Returns the cached (ids, total distances, is complete) best restaurants of the ranking of the search, or None."""
+    ranking = _get_cache().get(search_key)
+    with _stats_lock:
+        _stats['hits' if ranking is not None else 'misses'] += 1
+    return ranking
+
+
+def set_ranking(search_key: str, ranking: tuple) -> None:
+    _get_cache().set(search_key, ranking, timeout=settings.FIND_RESTAURANTS_CACHE_TIMEOUT)
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _invalidate(versions_keys: list) -> None:
+    # The versions are deleted right away for the searches of the same transaction, and again after the commit in case
+    # a search of another transaction cached the data from before the commit in between
+    _get_cache().delete_many(versions_keys)
+    transaction.on_commit(lambda: _get_cache().delete_many(versions_keys))
+
+
+def invalidate_catalog() -> None:
+    _invalidate([_catalog_version_key])
+
+
+def invalidate_diners(diners_ids) -> None:
+    _invalidate([_get_diner_version_key(diner_id) for diner_id in diners_ids])
+
+
+def invalidate_reservation_days(reservation_datetime: datetime.datetime) -> None:
+    # A reservation overlaps the searches with a target datetime from one reservation span before its start to its end
+    first_day = _get_utc_day(reservation_datetime - datetime.timedelta(hours=reservation_hours_span))
+    last_day = _get_utc_day(get_reservation_end_datetime(reservation_datetime))
+
+    days = [first_day + datetime.timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+    _invalidate([_get_day_version_key(day) for day in days])
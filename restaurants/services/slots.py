@@ -0,0 +1,70 @@
+import datetime
+
+from restaurants.models.opening_interval import get_reservation_intervals, is_open
+from restaurants.models.reservation import get_reservation_end_datetime, reservation_hours_span
+
+_reservation_span = datetime.timedelta(hours=reservation_hours_span)
+
+# Order of the sweep events on the same instant. The intervals are closed, so an interval that starts at an instant
+# already blocks it and one that ends at an instant still blocks it
+_interval_start_event = 0
+_start_datetime_event = 1
+_interval_end_event = 2
+
+
+def is_open_for_reservation(opening_intervals: list, start_datetime: datetime.datetime) -> bool:
+    """Returns whether the opening intervals of a restaurant cover the whole reservation, like find_restaurants does."""
+    return is_open(
+        opening_intervals, get_reservation_intervals(start_datetime, get_reservation_end_datetime(start_datetime))
+    )
+
+
+def get_start_datetimes(window_start: datetime.datetime, window_end: datetime.datetime, step_minutes: int) -> list:
+    step = datetime.timedelta(minutes=step_minutes)
+    start_datetimes = []
+    start_datetime = window_start
+    while start_datetime <= window_end:
+        start_datetimes.append(start_datetime)
+        start_datetime += step
+    return start_datetimes
+
+
+def _merge_intervals(intervals) -> list:
+    merged_intervals = []
+    for start, end in sorted(intervals):
+        if merged_intervals and start <= merged_intervals[-1][1]:
+            merged_intervals[-1][1] = max(merged_intervals[-1][1], end)
+        else:
+            merged_intervals.append([start, end])
+    return merged_intervals
+
+
+def get_free_start_datetimes(start_datetimes: list, tables_qty: int, tables_reservations: dict) -> list:
+    """
+    Returns the start datetimes (sorted) when at least one of the tables is free for a whole reservation.
+
+    tables_reservations has the (start, end) reservations of every table that has some. A reservation blocks the new
+    reservations that start from one reservation span before its start to its end, the blocked intervals of every table
+    are merged and a single sweep over them and the start datetimes counts the blocked tables at every start datetime.
+    """
+    events = [(start_datetime, _start_datetime_event) for start_datetime in start_datetimes]
+    for reservations in tables_reservations.values():
+        blocked_intervals = _merge_intervals(
+            (reservation_start - _reservation_span, reservation_end)
+            for reservation_start, reservation_end in reservations
+        )
+        for blocked_start, blocked_end in blocked_intervals:
+            events.append((blocked_start, _interval_start_event))
+            events.append((blocked_end, _interval_end_event))
+    events.sort()
+
+    free_start_datetimes = []
+    blocked_tables_qty = 0
+    for event_datetime, event in events:
+        if event == _interval_start_event:
+            blocked_tables_qty += 1
+        elif event == _interval_end_event:
+            blocked_tables_qty -= 1
+        elif blocked_tables_qty < tables_qty:
+            free_start_datetimes.append(event_datetime)
+    return free_start_datetimes
@@ -0,0 +1,86 @@
+import math
+
+from django.db.models import Q
+
+from restaurants.models.restaurant import grid_columns_qty, get_grid_row, get_grid_column
+
+_km_per_latitude_degree = 111.195
+
+# Above this amount of cells the bounding box is filtered by coordinates only, a long list of cells costs more than the
+# range scan it saves
+_max_grid_cells_qty = 400
+
+
+class BoundingBox:
+    def __init__(self, min_lat: float, max_lat: float, min_long: float, max_long: float) -> None:
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.min_long = min_long
+        self.max_long = max_long
+
+    def is_empty(self) -> bool:
+        return self.min_lat > self.max_lat or self.min_long > self.max_long
+
+    def intersection(self, other: 'BoundingBox') -> 'BoundingBox':
+        return BoundingBox(
+            min_lat=max(self.min_lat, other.min_lat),
+            max_lat=min(self.max_lat, other.max_lat),
+            min_long=max(self.min_long, other.min_long),
+            max_long=min(self.max_long, other.max_long)
+        )
+
+
+def get_bounding_box(lat: float, long: float, distance_km: float) -> BoundingBox:
+    """Returns a box that contains every location at distance_km or less from the location."""
+    lat_delta = distance_km / _km_per_latitude_degree
+    min_lat = max(lat - lat_delta, -90.0)
+    max_lat = min(lat + lat_delta, 90.0)
+
+    # The longitude degrees are shorter far from the equator, the widest part of the box is the one closest to a pole
+    min_cos_lat = min(math.cos(math.radians(min_lat)), math.cos(math.radians(max_lat)))
+    if min_cos_lat <= 0 or distance_km >= _km_per_latitude_degree * min_cos_lat * 180:
+        return BoundingBox(min_lat=min_lat, max_lat=max_lat, min_long=-180.0, max_long=180.0)
+
+    long_delta = distance_km / (_km_per_latitude_degree * min_cos_lat)
+    if long - long_delta < -180 or long + long_delta > 180:
+        # The box crosses the antimeridian, it is not worth splitting it in two
+        return BoundingBox(min_lat=min_lat, max_lat=max_lat, min_long=-180.0, max_long=180.0)
+
+    return BoundingBox(min_lat=min_lat, max_lat=max_lat, min_long=long - long_delta, max_long=long + long_delta)
+
+
+def get_party_bounding_box(diners_coordinates, distance_km: float) -> BoundingBox:
+    """Returns a box that contains every location at distance_km or less from all the diners."""
+    party_bounding_box = BoundingBox(min_lat=-90.0, max_lat=90.0, min_long=-180.0, max_long=180.0)
+    for lat, long in diners_coordinates:
+        party_bounding_box = party_bounding_box.intersection(get_bounding_box(lat, long, distance_km))
+    return party_bounding_box
+
+
+def get_grid_cells(bounding_box: BoundingBox):
+    """Returns the grid cells that cover the box, or None if there are too many of them."""
+    rows = range(get_grid_row(bounding_box.min_lat), get_grid_row(bounding_box.max_lat) + 1)
+    columns = range(get_grid_column(bounding_box.min_long), get_grid_column(bounding_box.max_long) + 1)
+
+    if len(rows) * len(columns) > _max_grid_cells_qty:
+        return None
+
+    return [row * grid_columns_qty + column for row in rows for column in columns]
+
+
+def get_bounding_box_query(bounding_box: BoundingBox) -> Q:
+    if bounding_box.is_empty():
+        return Q(pk__in=[])
+
+    query = Q(
+        location_lat__gte=bounding_box.min_lat,
+        location_lat__lte=bounding_box.max_lat,
+        location_long__gte=bounding_box.min_long,
+        location_long__lte=bounding_box.max_long
+    )
+
+    grid_cells = get_grid_cells(bounding_box)
+    if grid_cells is not None:
+        query &= Q(grid_cell__in=grid_cells)
+
+    return query
@@ -0,0 +1,200 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed, pre_delete, pre_save
+from django.dispatch import receiver
+
+from restaurants.models import Table, DietType, Restaurant, Diner
+from restaurants.models.diettype import get_diet_types_mask
+from restaurants.models.opening_interval import set_opening_intervals
+from restaurants.models.reservation import Reservation
+from restaurants.services import search_cache
+from restaurants.services.availability_index import get_built_availability_index
+
+
+def _update_availability_index_on_commit(update) -> None:
+    # The index is looked up when the transaction commits, so an index that is loading at that moment gets the update
+    if not settings.AVAILABILITY_INDEX_ENABLED:
+        return
+
+    def update_built_availability_index():
+        availability_index = get_built_availability_index()
+        if availability_index is not None:
+            update(availability_index)
+
+    transaction.on_commit(update_built_availability_index)
+
+
+@receiver(post_save, sender=Reservation)
+def update_availability_index_on_reservation_save(sender, instance, **kwargs):
+    reservation_id, table_id, start_datetime = instance.id, instance.table_id, instance.datetime
+    _update_availability_index_on_commit(
+        lambda availability_index: availability_index.add_reservation(reservation_id, table_id, start_datetime)
+    )
+
+
+@receiver(post_delete, sender=Reservation)
+def update_availability_index_on_reservation_delete(sender, instance, **kwargs):
+    reservation_id = instance.id
+    _update_availability_index_on_commit(
+        lambda availability_index: availability_index.remove_reservation(reservation_id)
+    )
+
+
+@receiver(post_save, sender=Table)
+def update_availability_index_on_table_save(sender, instance, **kwargs):
+    table_id, restaurant_id, capacity = instance.id, instance.restaurant_id, instance.capacity
+    _update_availability_index_on_commit(
+        lambda availability_index: availability_index.set_table(table_id, restaurant_id, capacity)
+    )
+
+
+@receiver(post_delete, sender=Table)
+def update_availability_index_on_table_delete(sender, instance, **kwargs):
+    table_id = instance.id
+    _update_availability_index_on_commit(lambda availability_index: availability_index.remove_table(table_id))
+
+
+def _update_diet_masks(model, diet_types_field_name: str, mask_field_name: str, instances_ids) -> None:
+    instances_bits = {instance_id: [] for instance_id in instances_ids}
+    diet_types_bits = model.objects.filter(
+        id__in=instances_bits.keys(),
+        **{diet_types_field_name + '__isnull': False}
+    ).values_list('id', diet_types_field_name + '__bit')
+
+    for instance_id, bit in diet_types_bits:
+        instances_bits[instance_id].append(bit)
+    masks = {instance_id: get_diet_types_mask(bits) for instance_id, bits in instances_bits.items()}
+
+    model.objects.bulk_update(
+        [model(id=instance_id, **{mask_field_name: mask}) for instance_id, mask in masks.items()],
+        fields=[mask_field_name]
+    )
+
+
+def _update_diet_masks_on_m2m_changed(model, diet_types_field_name, mask_field_name, instance, action, reverse, pk_set):
+    if reverse and action == 'pre_clear':
+        # The instance is the diet type, the related instances must be taken before the relations are removed
+        instance._cleared_diet_types_relations_ids = list(
+            model.objects.filter(**{diet_types_field_name: instance}).values_list('id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            instances_ids = [instance.id]
+        elif action == 'post_clear':
+            instances_ids = instance.__dict__.pop('_cleared_diet_types_relations_ids', [])
+        else:
+            instances_ids = pk_set
+        _update_diet_masks(model, diet_types_field_name, mask_field_name, instances_ids)
+
+
+@receiver(m2m_changed, sender=Restaurant.diet_endorsement_types.through)
+def update_restaurant_diet_endorsement_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    _update_diet_masks_on_m2m_changed(
+        Restaurant, 'diet_endorsement_types', 'diet_endorsement_mask', instance, action, reverse, pk_set
+    )
+
+
+@receiver(m2m_changed, sender=Diner.diet_types.through)
+def update_diner_diet_types_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    _update_diet_masks_on_m2m_changed(Diner, 'diet_types', 'diet_types_mask', instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=DietType)
+def remove_diet_type_from_masks(sender, instance, **kwargs):
+    # The relations of a deleted diet type are removed without m2m_changed signals
+    bit_mask = 1 << instance.bit
+    Restaurant.objects.filter(diet_endorsement_types=instance).update(
+        diet_endorsement_mask=F('diet_endorsement_mask').bitand(~bit_mask)
+    )
+    Diner.objects.filter(diet_types=instance).update(diet_types_mask=F('diet_types_mask').bitand(~bit_mask))
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_opening_intervals(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or {'open_time', 'close_time'} & set(update_fields):
+        set_opening_intervals([instance])
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+@receiver(post_save, sender=DietType)
+@receiver(post_delete, sender=DietType)
+def invalidate_search_cache_catalog(sender, **kwargs):
+    if search_cache.is_enabled():
+        search_cache.invalidate_catalog()
+
+
+@receiver(m2m_changed, sender=Restaurant.diet_endorsement_types.through)
+def invalidate_search_cache_on_diet_endorsements_changed(sender, action, **kwargs):
+    if search_cache.is_enabled() and action in ('post_add', 'post_remove', 'post_clear'):
+        search_cache.invalidate_catalog()
+
+
+@receiver(post_save, sender=Diner)
+@receiver(post_delete, sender=Diner)
+def invalidate_search_cache_diner(sender, instance, **kwargs):
+    if search_cache.is_enabled():
+        search_cache.invalidate_diners([instance.id])
+
+
+@receiver(m2m_changed, sender=Diner.diet_types.through)
+def invalidate_search_cache_on_diner_diet_types_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not search_cache.is_enabled() or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        search_cache.invalidate_diners([instance.id])
+    elif action == 'post_clear':
+        # The diners of the cleared diet type are not known anymore
+        search_cache.invalidate_catalog()
+    else:
+        search_cache.invalidate_diners(pk_set)
+
+
+@receiver(pre_save, sender=Reservation)
+def invalidate_search_cache_on_reservation_move(sender, instance, **kwargs):
+    # The searches of the days of the previous datetime of a moved reservation are affected too
+    if search_cache.is_enabled() and not instance._state.adding:
+        previous_datetime = getattr(instance, '_stored_datetime', None)
+        if previous_datetime is not None and previous_datetime != instance.datetime:
+            search_cache.invalidate_reservation_days(previous_datetime)
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_search_cache_reservation_days(sender, instance, **kwargs):
+    if search_cache.is_enabled():
+        search_cache.invalidate_reservation_days(instance.datetime)
+
+
+@receiver(request_finished)
+def record_database_connections_use(sender, **kwargs):
+    # The connections are thread local, every one of them records when the last request of its thread finished
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.health_check_idle_since = now
+
+
+@receiver(request_started)
+def check_idle_database_connections(sender, **kwargs):
+    # Django only closes the persistent connections that failed or are older than CONN_MAX_AGE, a connection closed by
+    # the database while it was idle would fail the first query of the request. Only the connections idle for a while
+    # are checked, so the requests of a busy thread don't pay one more round trip to the database
+    idle_seconds = settings.DB_CONN_HEALTH_CHECK_IDLE_SECONDS
+    if not idle_seconds:
+        return
+
+    now = time.monotonic()
+    for connection in connections.all():
+        idle_since = getattr(connection, 'health_check_idle_since', None)
+        if connection.connection is None or idle_since is None or now - idle_since <= idle_seconds:
+            continue
+        if not connection.is_usable():
+            connection.close()
@@ -0,0 +1,102 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from restaurants.models import Diner, Restaurant, Table
+from restaurants.models.archived_reservation import ArchivedReservation
+from restaurants.models.reservation import Reservation
+from restaurants.services.archive import archive_reservations
+
+
+class ArchiveReservationsTest(TestCase):
+
+    def setUp(self):
+        self.now = datetime.now(tz=timezone.utc).replace(microsecond=0)
+        self.diners = [
+            Diner.objects.create(
+                name='Diner {}'.format(i),
+                house_location_lat=19.4349474,
+                house_location_long=-99.1419256
+            )
+            for i in range(3)
+        ]
+        restaurant = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        self.table = Table.objects.create(capacity=4, restaurant=restaurant)
+
+        # The diners of every reservation, to check the archived ones
+        self.reservations_diners = {}
+        self.old_reservations = [
+            self.create_reservation(self.diners[:i + 1], days=-40, hours=i) for i in range(3)
+        ]
+        self.recent_reservation = self.create_reservation(self.diners, days=-10)
+        self.ended_reservation = self.create_reservation(self.diners[:1], hours=-2, minutes=-1)
+        self.in_progress_reservation = self.create_reservation(self.diners[1:], hours=-1)
+        self.future_reservation = self.create_reservation(self.diners, days=1)
+
+    def create_reservation(self, diners, days=0, hours=0, minutes=0):
+        reservation = Reservation.objects.create(
+            table=self.table, datetime=self.now + timedelta(days=days, hours=hours, minutes=minutes)
+        )
+        reservation.diners.add(*diners)
+        self.reservations_diners[reservation.id] = {diner.id for diner in diners}
+        return reservation
+
+    def archive(self, **options):
+        call_command('archive_reservations', stdout=io.StringIO(), **options)
+
+    def assert_archived(self, reservations):
+        reservations_ids = {reservation.id for reservation in reservations}
+        self.assertEqual(reservations_ids, set(ArchivedReservation.objects.values_list('id', flat=True)))
+        self.assertFalse(Reservation.objects.filter(id__in=reservations_ids).exists())
+        self.assertFalse(Reservation.diners.through.objects.filter(reservation_id__in=reservations_ids).exists())
+
+        for reservation in reservations:
+            archived_reservation = ArchivedReservation.objects.get(id=reservation.id)
+            self.assertEqual(
+                (reservation.table_id, reservation.datetime, reservation.end_datetime, reservation.created_at),
+                (archived_reservation.table_id, archived_reservation.datetime, archived_reservation.end_datetime,
+                 archived_reservation.created_at)
+            )
+            self.assertEqual(
+                self.reservations_diners[reservation.id],
+                set(archived_reservation.diners.values_list('id', flat=True))
+            )
+
+    def test_retention_window(self):
+        self.archive(retention_days=30, chunk_size=2)
+
+        self.assert_archived(self.old_reservations)
+        self.assertEqual(4, Reservation.objects.count())
+        # The archive stays queryable from the diners
+        self.assertEqual(3, self.diners[0].archived_reservations.count())
+
+    def test_only_the_ended_reservations(self):
+        self.archive(retention_days=0, chunk_size=1)
+
+        self.assert_archived(self.old_reservations + [self.recent_reservation, self.ended_reservation])
+        self.assertEqual(
+            {self.in_progress_reservation.id, self.future_reservation.id},
+            set(Reservation.objects.values_list('id', flat=True))
+        )
+
+    def test_nothing_to_archive(self):
+        self.archive(retention_days=30)
+        self.archive(retention_days=30)
+
+        self.assert_archived(self.old_reservations)
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.archive(retention_days=-1)
+        with self.assertRaises(CommandError):
+            self.archive(chunk_size=0)
+        with self.assertRaises(ValueError):
+            archive_reservations(self.now + timedelta(hours=1))
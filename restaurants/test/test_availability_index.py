@@ -0,0 +1,222 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from restaurants.models import Diner, Restaurant, Table
+import restaurants.api.views
+import restaurants.services.restaurants_service
+from restaurants.models.reservation import Reservation
+from restaurants.services.availability_index import AvailabilityIndex, get_availability_index, \
+    get_built_availability_index, reset_availability_index
+
+
+class AvailabilityIndexTest(TestCase):
+    def setUp(self):
+        self.origin = datetime(year=2100, month=11, day=1, tzinfo=timezone.utc)
+        self.index = AvailabilityIndex(origin=self.origin, horizon_days=10)
+        self.index.set_table(table_id=1, restaurant_id=1, capacity=2)
+        self.index.set_table(table_id=2, restaurant_id=2, capacity=4)
+
+    def test_reservation_bounds_are_inclusive(self):
+        reservation_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=7, tzinfo=timezone.utc)
+        self.index.add_reservation(reservation_id=1, table_id=1, start_datetime=reservation_datetime)
+
+        self.assertFalse(self.index.is_table_free(1, reservation_datetime))
+        self.assertFalse(self.index.is_table_free(1, reservation_datetime - timedelta(hours=2)))
+        self.assertFalse(self.index.is_table_free(1, reservation_datetime + timedelta(hours=2)))
+        self.assertTrue(self.index.is_table_free(1, reservation_datetime - timedelta(hours=2, seconds=1)))
+        self.assertTrue(self.index.is_table_free(1, reservation_datetime + timedelta(hours=2, seconds=1)))
+        self.assertTrue(self.index.is_table_free(2, reservation_datetime))
+
+    def test_remove_reservation_keeps_the_slots_shared_with_other_reservations(self):
+        first_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc)
+        second_datetime = datetime(year=2100, month=11, day=3, hour=16, minute=10, tzinfo=timezone.utc)
+        self.index.add_reservation(reservation_id=1, table_id=1, start_datetime=first_datetime)
+        self.index.add_reservation(reservation_id=2, table_id=1, start_datetime=second_datetime)
+
+        self.index.remove_reservation(1)
+
+        self.assertTrue(self.index.is_table_free(1, first_datetime - timedelta(minutes=15)))
+        self.assertFalse(self.index.is_table_free(1, second_datetime - timedelta(hours=2)))
+        self.assertFalse(self.index.is_table_free(1, second_datetime))
+
+    def test_restaurants_with_free_table(self):
+        reservation_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc)
+        self.index.add_reservation(reservation_id=1, table_id=2, start_datetime=reservation_datetime)
+
+        self.assertEqual(self.index.get_restaurants_with_free_table(reservation_datetime, 2), {1})
+        self.assertEqual(self.index.get_restaurants_with_free_table(reservation_datetime, 3), set())
+
+        # Moving the reservation to the next day
+        next_day_datetime = reservation_datetime + timedelta(days=1)
+        self.index.add_reservation(reservation_id=1, table_id=2, start_datetime=next_day_datetime)
+        self.assertEqual(self.index.get_restaurants_with_free_table(reservation_datetime, 3), {2})
+
+        self.index.remove_table(2)
+        self.assertEqual(self.index.get_restaurants_with_free_table(reservation_datetime, 2), {1})
+
+    def test_restaurants_without_free_table(self):
+        reservation_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc)
+        self.index.set_table(table_id=3, restaurant_id=2, capacity=2)
+        self.index.add_reservation(reservation_id=1, table_id=1, start_datetime=reservation_datetime)
+        self.index.add_reservation(reservation_id=2, table_id=2, start_datetime=reservation_datetime)
+
+        self.assertEqual(self.index.get_restaurants_without_free_table(reservation_datetime, 2), {1})
+        # The free table of the restaurant 2 can't hold 3 diners
+        self.assertEqual(self.index.get_restaurants_without_free_table(reservation_datetime, 3), {2})
+        self.assertEqual(self.index.get_restaurants_without_free_table(reservation_datetime, 5), set())
+
+
+@override_settings(AVAILABILITY_INDEX_ENABLED=True)
+class FindRestaurantsWithAvailabilityIndexTest(TestCase):
+    def setUp(self):
+        reset_availability_index()
+        self.addCleanup(reset_availability_index)
+
+        self.tomorrow = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + \
+            timedelta(days=1)
+
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        self.diner_2 = Diner.objects.create(
+            name='Tobias',
+            house_location_lat=19.4384214,
+            house_location_long=-99.2036906
+        )
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        self.restaurant_1_table_1 = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=23.93258423336848,
+            location_long=-60.36074714271186
+        )
+        self.restaurant_2_table_1 = Table.objects.create(capacity=2, restaurant=self.restaurant_2)
+        self.restaurant_2_table_2 = Table.objects.create(capacity=4, restaurant=self.restaurant_2)
+
+        # Reservations
+        reservation_1 = Reservation(datetime=self.tomorrow + timedelta(hours=14), table=self.restaurant_1_table_1)
+        reservation_1.save()
+        reservation_1.diners.add(self.diner_1)
+
+        reservation_2 = Reservation(
+            datetime=self.tomorrow + timedelta(hours=15, minutes=10),
+            table=self.restaurant_2_table_1
+        )
+        reservation_2.save()
+        reservation_2.diners.add(self.diner_2)
+
+    def test_availability_index_matches_the_database(self):
+        target_datetime = self.tomorrow + timedelta(hours=11)
+        while target_datetime < self.tomorrow + timedelta(hours=19):
+            for diners_qty in (1, 3):
+                self.assertEqual(
+                    restaurants.services.restaurants_service.check_availability_index(target_datetime, diners_qty),
+                    set()
+                )
+            target_datetime += timedelta(minutes=5)
+
+    def test_find_restaurants_with_availability_index(self):
+        target_datetime_str = (self.tomorrow + timedelta(hours=15)).strftime('%Y-%m-%d %H:%M:%S')
+
+        restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
+            diners=[self.diner_1.id, self.diner_2.id],
+            target_datetime=target_datetime_str
+        )
+        self.assertIsNotNone(get_availability_index())
+        self.assertEqual(restaurants_qs.count(), 1)
+        self.assertEqual(restaurants_qs[0].id, self.restaurant_2.id)
+
+        # The availability comes from the index, which is not aware of the table anymore
+        get_availability_index().remove_table(self.restaurant_2_table_2.id)
+        restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
+            diners=[self.diner_1.id],
+            target_datetime=target_datetime_str
+        )
+        self.assertEqual(restaurants_qs.count(), 0)
+
+
+# The index is updated when the transactions of the writes commit, which the TestCase transaction never does
+@override_settings(AVAILABILITY_INDEX_ENABLED=True)
+class AvailabilityIndexUpdatesTest(TransactionTestCase):
+    def setUp(self):
+        reset_availability_index()
+        self.addCleanup(reset_availability_index)
+
+        self.target_datetime = datetime.now(tz=timezone.utc).replace(
+            hour=14, minute=0, second=0, microsecond=0
+        ) + timedelta(days=1)
+        self.diner = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        restaurant = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        self.table = Table.objects.create(capacity=2, restaurant=restaurant)
+
+    def create_reservation(self):
+        return restaurants.services.restaurants_service.create_reservation(
+            diners=[self.diner.id],
+            target_datetime=self.target_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+            table=self.table.id
+        )
+
+    def test_bookings_and_deletes_update_the_index(self):
+        availability_index = get_availability_index()
+        reservation = self.create_reservation()
+        self.assertFalse(availability_index.is_table_free(self.table.id, self.target_datetime))
+
+        resp = restaurants.api.views.ReservationsView.as_view()(
+            APIRequestFactory().delete('api/v1/reservations/{}'.format(reservation.id)), pk=reservation.id
+        )
+
+        self.assertEqual(204, resp.status_code)
+        self.assertTrue(availability_index.is_table_free(self.table.id, self.target_datetime))
+
+    def test_booking_committed_while_the_index_loads(self):
+        booking_threads = []
+        load = AvailabilityIndex.load
+
+        def book():
+            try:
+                self.create_reservation()
+            finally:
+                connection.close()
+
+        def load_and_book(availability_index):
+            load(availability_index)
+            # The booking commits after the reservations were read, and it waits for the load to finish
+            booking_thread = threading.Thread(target=book)
+            booking_thread.start()
+            booking_thread.join(timeout=0.5)
+            booking_threads.append(booking_thread)
+
+        with mock.patch.object(AvailabilityIndex, 'load', autospec=True, side_effect=load_and_book):
+            get_availability_index()
+        booking_threads[0].join()
+
+        self.assertEqual(1, Reservation.objects.count())
+        self.assertFalse(get_built_availability_index().is_table_free(self.table.id, self.target_datetime))
@@ -0,0 +1,223 @@
+import random
+from datetime import datetime, time, timedelta, timezone
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from restaurants.api.pagination import RestaurantsCursorPagination
+from restaurants.models import DietType, Diner, Restaurant, Table
+from restaurants.models.opening_interval import get_opening_intervals
+from restaurants.models.reservation import Reservation, get_reservation_end_datetime
+from restaurants.services import slots
+from restaurants.services.ranking import RankedRestaurants
+from restaurants.services.restaurants_service import AvailableRestaurants
+import restaurants.api.views
+
+
+class FreeStartDatetimesTest(TestCase):
+    def setUp(self):
+        self.window_start = datetime(year=2100, month=11, day=3, hour=18, minute=0, tzinfo=timezone.utc)
+        self.start_datetimes = slots.get_start_datetimes(
+            self.window_start, self.window_start + timedelta(hours=5), 15
+        )
+
+    def test_closed_intervals_block_their_bounds(self):
+        # Blocks the reservations that start from 18:00 to 22:00
+        reservations = {1: [(self.window_start + timedelta(hours=2), self.window_start + timedelta(hours=4))]}
+
+        self.assertEqual(
+            [self.window_start + timedelta(hours=4, minutes=15),
+             self.window_start + timedelta(hours=4, minutes=30), self.window_start + timedelta(hours=4, minutes=45),
+             self.window_start + timedelta(hours=5)],
+            slots.get_free_start_datetimes(self.start_datetimes, 1, reservations)
+        )
+        # Another table is always free
+        self.assertEqual(self.start_datetimes, slots.get_free_start_datetimes(self.start_datetimes, 2, reservations))
+
+    def test_sweep_matches_checking_every_start_datetime(self):
+        randomizer = random.Random(7)
+        for _ in range(50):
+            tables_qty = randomizer.randint(1, 4)
+            reservations = {}
+            for table_id in range(tables_qty):
+                reservations[table_id] = []
+                for _ in range(randomizer.randint(0, 4)):
+                    reservation_start = self.window_start + timedelta(minutes=randomizer.randrange(-180, 420, 15))
+                    reservations[table_id].append(
+                        (reservation_start, get_reservation_end_datetime(reservation_start))
+                    )
+
+            expected_start_datetimes = [
+                start_datetime for start_datetime in self.start_datetimes
+                if any(
+                    not any(
+                        reservation_start <= get_reservation_end_datetime(start_datetime) and
+                        reservation_end >= start_datetime
+                        for reservation_start, reservation_end in table_reservations
+                    )
+                    for table_reservations in reservations.values()
+                )
+            ]
+            self.assertEqual(
+                expected_start_datetimes,
+                slots.get_free_start_datetimes(self.start_datetimes, tables_qty, reservations)
+            )
+
+    def test_opening_hours(self):
+        opening_intervals = get_opening_intervals(time(18), time(23))
+        self.assertTrue(slots.is_open_for_reservation(opening_intervals, self.window_start))
+        self.assertFalse(slots.is_open_for_reservation(opening_intervals, self.window_start + timedelta(hours=4)))
+        # Open through midnight
+        opening_intervals = get_opening_intervals(time(18), time(2))
+        self.assertTrue(slots.is_open_for_reservation(opening_intervals, self.window_start + timedelta(hours=5)))
+        self.assertFalse(slots.is_open_for_reservation(get_opening_intervals(time(20), time(2)), self.window_start))
+
+
+class RestaurantsAvailableSlotsViewTest(TestCase):
+
+    endpoint_path = 'api/v1/restaurants/available-slots/'
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = restaurants.api.views.RestaurantsAvailableSlotsView.as_view()
+
+        # Diet types
+        vegan_diet_type = DietType.objects.create(name='Vegan')
+
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        self.diner_2 = Diner.objects.create(
+            name='Tobias',
+            house_location_lat=19.4384214,
+            house_location_long=-99.2036906
+        )
+        self.vegan_diner = Diner.objects.create(
+            name='Lucille',
+            house_location_lat=19.4058242,
+            house_location_long=-99.1671942
+        )
+        self.vegan_diner.diet_types.add(vegan_diet_type)
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.4349474,
+            location_long=-99.1419256
+        )
+        self.restaurant_1_table = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+        Table.objects.create(capacity=1, restaurant=self.restaurant_1)
+        Reservation.objects.create(
+            table=self.restaurant_1_table,
+            datetime=datetime(year=2100, month=11, day=3, hour=17, minute=0, tzinfo=timezone.utc)
+        )
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='19:00:00',
+            close_time='01:00:00',
+            location_lat=23.93258423336848,
+            location_long=-60.36074714271186
+        )
+        self.restaurant_2.diet_endorsement_types.add(vegan_diet_type)
+        Table.objects.create(capacity=4, restaurant=self.restaurant_2)
+
+        # Without tables for two diners
+        restaurant_3 = Restaurant.objects.create(
+            name='Paleo',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=19.4349474,
+            location_long=-99.1419256
+        )
+        Table.objects.create(capacity=1, restaurant=restaurant_3)
+
+    def get_available_slots(self, diners, **query_params):
+        query_params = {
+            'diners': [diner.id for diner in diners],
+            'window_start': '2100-11-03 18:00:00',
+            'window_end': '2100-11-03 23:00:00',
+            'step': 60,
+            **query_params
+        }
+        request = self.factory.get(self.endpoint_path, query_params)
+        return self.view(request)
+
+    def test_free_start_datetimes_of_every_restaurant(self):
+        resp = self.get_available_slots([self.diner_1, self.diner_2])
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [
+                (self.restaurant_1.id, ['2100-11-03T20:00:00Z']),
+                (self.restaurant_2.id, ['2100-11-03T19:00:00Z', '2100-11-03T20:00:00Z', '2100-11-03T21:00:00Z',
+                                        '2100-11-03T22:00:00Z', '2100-11-03T23:00:00Z']),
+            ],
+            [(result['restaurant']['id'], result['slots']) for result in resp.data['results']]
+        )
+
+    def test_limit_applies_to_the_restaurants_with_slots(self):
+        # The restaurant without tables for two diners is ranked between the other two
+        resp = self.get_available_slots([self.diner_1, self.diner_2], limit=2)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [self.restaurant_1.id, self.restaurant_2.id],
+            [result['restaurant']['id'] for result in resp.data['results']]
+        )
+
+    def test_restaurants_are_ranked_once(self):
+        # Many restaurants without tables are ranked before the second restaurant with tables
+        for i in range(40):
+            Restaurant.objects.create(
+                name='Restaurant {}'.format(i),
+                open_time='00:00:00',
+                close_time='23:59:00',
+                location_lat=19.4349474,
+                location_long=-99.1419256
+            )
+
+        with mock.patch.object(AvailableRestaurants, 'max_chunk_size', 4), \
+                mock.patch.object(RankedRestaurants, '_get_scored_chunks', autospec=True,
+                                  side_effect=RankedRestaurants._get_scored_chunks) as get_scored_chunks:
+            resp = self.get_available_slots([self.diner_1, self.diner_2], limit=2)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [self.restaurant_1.id, self.restaurant_2.id],
+            [result['restaurant']['id'] for result in resp.data['results']]
+        )
+        # The first chunk and the whole ranking
+        self.assertEqual(2, get_scored_chunks.call_count)
+
+    def test_pagination(self):
+        with mock.patch.object(RestaurantsCursorPagination, 'page_size', 1):
+            resp = self.get_available_slots([self.diner_1, self.diner_2], count='true')
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual(2, resp.data['count'])
+            self.assertEqual([self.restaurant_1.id], [result['restaurant']['id'] for result in resp.data['results']])
+
+            resp = self.view(self.factory.get(resp.data['next']))
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual([self.restaurant_2.id], [result['restaurant']['id'] for result in resp.data['results']])
+            self.assertIsNone(resp.data['next'])
+
+    def test_diet_restrictions(self):
+        resp = self.get_available_slots([self.vegan_diner], step=30, window_end='2100-11-03 20:00:00')
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [(self.restaurant_2.id, ['2100-11-03T19:00:00Z', '2100-11-03T19:30:00Z', '2100-11-03T20:00:00Z'])],
+            [(result['restaurant']['id'], result['slots']) for result in resp.data['results']]
+        )
+
+    def test_invalid_window(self):
+        resp = self.get_available_slots([self.diner_1], window_end='2100-11-03 17:00:00')
+
+        self.assertEqual(400, resp.status_code)
+        self.assertIn('window_end', resp.data['errors']['field_errors'])
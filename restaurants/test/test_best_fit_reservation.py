@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from restaurants.models import DietType, Diner, Restaurant, Table
+from restaurants.models.reservation import Reservation
+import restaurants.api.views
+
+
+class BestFitReservationTest(TestCase):
+
+    endpoint_path = 'api/v1/reservations/'
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = restaurants.api.views.ReservationsView.as_view()
+
+        # Diet types
+        paleo_diet_type = DietType.objects.create(name='Paleo')
+
+        # Diners
+        self.diners = [
+            Diner.objects.create(
+                name='Diner {}'.format(i),
+                house_location_lat=19.4349474,
+                house_location_long=-99.1419256
+            )
+            for i in range(8)
+        ]
+        self.paleo_diner = Diner.objects.create(
+            name='George Michael',
+            house_location_lat=19.4058242,
+            house_location_long=-99.1671942
+        )
+        self.paleo_diner.diet_types.add(paleo_diet_type)
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='23:00:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        self.restaurant_1_table_6 = Table.objects.create(capacity=6, restaurant=self.restaurant_1)
+        self.restaurant_1_table_4_1 = Table.objects.create(capacity=4, restaurant=self.restaurant_1)
+        self.restaurant_1_table_2 = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+        self.restaurant_1_table_4_2 = Table.objects.create(capacity=4, restaurant=self.restaurant_1)
+
+        # The smallest table is occupied
+        reservation = Reservation(
+            datetime=datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc),
+            table=self.restaurant_1_table_2
+        )
+        reservation.save()
+        reservation.diners.add(self.diners[7])
+
+    def post_reservation(self, diners, target_datetime='2100-11-03 15:00:00'):
+        post_request_data = {
+            'diners': [diner.id for diner in diners],
+            'target_datetime': target_datetime,
+            'restaurant': self.restaurant_1.id
+        }
+        request = self.factory.post(self.endpoint_path, post_request_data, format='json')
+        return self.view(request)
+
+    def test_smallest_free_tables_are_booked_first(self):
+        booked_tables_ids = []
+        for i in range(3):
+            resp = self.post_reservation(self.diners[i * 2:i * 2 + 2])
+            self.assertEqual(200, resp.status_code)
+            booked_tables_ids.append(resp.data['table'])
+
+        self.assertEqual(
+            [self.restaurant_1_table_4_1.id, self.restaurant_1_table_4_2.id, self.restaurant_1_table_6.id],
+            booked_tables_ids
+        )
+
+        resp = self.post_reservation([self.diners[6]])
+        self.assertEqual(409, resp.status_code)
+        self.assertEqual('40906', resp.data['errors']['internal_error_code'])
+
+    def test_free_smallest_table_is_booked(self):
+        resp = self.post_reservation(self.diners[:2], target_datetime='2100-11-03 17:00:00')
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(self.restaurant_1_table_2.id, resp.data['table'])
+
+    def test_no_table_can_hold_the_diners(self):
+        resp = self.post_reservation(self.diners[:7])
+
+        self.assertEqual(409, resp.status_code)
+        self.assertEqual('40903', resp.data['errors']['internal_error_code'])
+
+    def test_restaurant_doesnt_match_the_diet_restrictions(self):
+        resp = self.post_reservation([self.paleo_diner])
+
+        self.assertEqual(409, resp.status_code)
+        self.assertEqual('40905', resp.data['errors']['internal_error_code'])
+
+    def test_invalid_restaurant(self):
+        request = self.factory.post(
+            self.endpoint_path,
+            {'diners': [self.diners[0].id], 'target_datetime': '2100-11-03 15:00:00', 'restaurant': 0},
+            format='json'
+        )
+        resp = self.view(request)
+
+        self.assertEqual(400, resp.status_code)
+        self.assertIn('restaurant', resp.data['errors']['field_errors'])
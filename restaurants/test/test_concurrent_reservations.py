@@ -0,0 +1,86 @@
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from restaurants import custom_errors
+from restaurants.models import Diner, Restaurant, Table
+from restaurants.models.reservation import Reservation
+import restaurants.services.restaurants_service
+
+
+# The in-memory SQLite database of the tests reports the lock conflicts right away instead of waiting for the lock, so
+# the bookings need more attempts
+@override_settings(RESERVATION_BOOKING_MAX_ATTEMPTS=20)
+class ConcurrentReservationsTest(TransactionTestCase):
+    threads_qty = 8
+
+    def setUp(self):
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='23:00:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        self.tables = [Table.objects.create(capacity=2, restaurant=self.restaurant_1) for _ in range(self.threads_qty)]
+        self.diners = [
+            Diner.objects.create(
+                name='Diner {}'.format(i),
+                house_location_lat=19.4349474,
+                house_location_long=-99.1419256
+            )
+            for i in range(self.threads_qty)
+        ]
+
+    def create_reservations_concurrently(self, bookings):
+        """Creates every (diners, table) booking in its own thread, all of them at the same time."""
+        barrier = threading.Barrier(len(bookings))
+        outcomes = [None] * len(bookings)
+
+        def book(position, diners, table):
+            try:
+                barrier.wait()
+                outcomes[position] = restaurants.services.restaurants_service.create_reservation(
+                    diners=[diner.id for diner in diners],
+                    target_datetime='2100-11-03 14:00:00',
+                    table=table.id
+                )
+            except Exception as e:
+                outcomes[position] = e
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(position, diners, table))
+            for position, (diners, table) in enumerate(bookings)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return outcomes
+
+    def test_no_double_booking_of_a_table(self):
+        outcomes = self.create_reservations_concurrently([([diner], self.tables[0]) for diner in self.diners])
+
+        self.assertEqual(1, Reservation.objects.count())
+        self.assertEqual(1, len([outcome for outcome in outcomes if isinstance(outcome, Reservation)]))
+        self.assertTrue(all(
+            isinstance(outcome, (Reservation, custom_errors.TableOccupiedError)) for outcome in outcomes
+        ), outcomes)
+
+    def test_no_double_booking_of_a_diner(self):
+        outcomes = self.create_reservations_concurrently([([self.diners[0]], table) for table in self.tables])
+
+        self.assertEqual(1, Reservation.objects.count())
+        self.assertTrue(all(
+            isinstance(outcome, (Reservation, custom_errors.DinerWithOverlappingReservationError))
+            for outcome in outcomes
+        ), outcomes)
+
+    def test_bookings_of_different_tables(self):
+        outcomes = self.create_reservations_concurrently(list(zip([[diner] for diner in self.diners], self.tables)))
+
+        self.assertTrue(all(isinstance(outcome, Reservation) for outcome in outcomes), outcomes)
+        self.assertEqual(self.threads_qty, Reservation.objects.count())
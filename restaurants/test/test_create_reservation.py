@@ -5,6 +5,7 @@ from restaurants.models import DietType, Diner, Restaurant, Table
 import restaurants.services.restaurants_service
 from restaurants.models.reservation import Reservation
 import restaurants.api.views
+from restaurants import custom_errors
 
 
 class CreateReservationTest(TestCase):
@@ -227,4 +228,80 @@ class CreateReservationTest(TestCase):
         self.assertEqual(new_res.table_id, self.restaurant_3_table_1.id)
         self.assertEqual(new_res.datetime.strftime('%Y-%m-%d %H:%M:%SZ'), target_datetime)
 
+    def test_create_reservation_stores_end_datetime(self):
+        post_request_data = {
+            'diners': [self.diner_3.id],
+            'target_datetime': '2100-11-20 17:00:00Z',
+            'table': self.restaurant_3_table_1.id
+        }
+
+        request = self.factory.post(self.endpoint_path, post_request_data, format='json')
+        resp = self.view(request)
+
+        new_res = Reservation.objects.get(id=resp.data['id'])
+        self.assertEqual(new_res.end_datetime, datetime(year=2100, month=11, day=20, hour=19, tzinfo=timezone.utc))
+
+    def test_cannot_create_reservation_starting_when_the_table_reservation_ends(self):
+        # The existing reservation goes from 14:00 to 16:00, the bounds are inclusive
+        post_request_data = {
+            'diners': [self.diner_3.id],
+            'target_datetime': '2100-11-03 16:00:00Z',
+            'table': self.restaurant_1_table_1.id
+        }
+
+        request = self.factory.post(self.endpoint_path, post_request_data, format='json')
+        resp = self.view(request)
+
+        self.assertEqual(409, resp.status_code)
+        self.assertEqual('40904', resp.data['errors']['internal_error_code'])
+
+
+class CreateReservationQueriesTest(TestCase):
+    max_party_size = 20
+
+    def setUp(self):
+        vegan_diet_type = DietType.objects.create(name='Vegan')
+
+        self.diners = []
+        for i in range(self.max_party_size):
+            diner = Diner.objects.create(
+                name='Diner {}'.format(i),
+                house_location_lat=19.4349474,
+                house_location_long=-99.1419256
+            )
+            diner.diet_types.add(vegan_diet_type)
+            self.diners.append(diner)
+
+        restaurant = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='23:00:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        restaurant.diet_endorsement_types.add(vegan_diet_type)
+        self.table = Table.objects.create(capacity=self.max_party_size, restaurant=restaurant)
+
+    def create_reservation(self, diners, target_datetime):
+        return restaurants.services.restaurants_service.create_reservation(
+            diners=[diner.id for diner in diners],
+            target_datetime=target_datetime,
+            table=self.table.id
+        )
+
+    def test_queries_qty_doesnt_depend_on_party_size(self):
+        # Transaction (savepoint and release), validation (diners, table), locks (table, diners), checks (table and
+        # diners overlaps), inserts (reservation, diners relations)
+        with self.assertNumQueries(10):
+            self.create_reservation(self.diners[:1], '2100-11-03 14:00:00')
+
+        with self.assertNumQueries(10):
+            self.create_reservation(self.diners, '2100-11-04 14:00:00')
+
+    def test_first_diner_with_overlapping_reservation_is_reported(self):
+        self.create_reservation(self.diners[5:7], '2100-11-03 14:00:00')
+        self.table = Table.objects.create(capacity=self.max_party_size, restaurant=self.table.restaurant)
 
+        with self.assertRaises(custom_errors.DinerWithOverlappingReservationError) as context:
+            self.create_reservation(list(reversed(self.diners)), '2100-11-03 15:00:00')
+        self.assertEqual(self.diners[6].id, context.exception.diner_id)
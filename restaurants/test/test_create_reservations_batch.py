@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from restaurants.models import DietType, Diner, Restaurant, Table
+from restaurants.models.reservation import Reservation
+import restaurants.api.views
+
+
+class CreateReservationsBatchTest(TestCase):
+
+    endpoint_path = 'api/v1/reservations/batch/'
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = restaurants.api.views.ReservationsBatchView.as_view()
+
+        # Diet types
+        vegan_diet_type = DietType.objects.create(name='Vegan')
+        paleo_diet_type = DietType.objects.create(name='Paleo')
+
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        self.diner_1.diet_types.add(vegan_diet_type)
+
+        self.diner_2 = Diner.objects.create(
+            name='Tobias',
+            house_location_lat=19.4384214,
+            house_location_long=-99.2036906
+        )
+
+        self.diner_3 = Diner.objects.create(
+            name='Gob',
+            house_location_lat=19.3318331,
+            house_location_long=-99.2078983
+        )
+
+        self.diner_4 = Diner.objects.create(
+            name='George Michael',
+            house_location_lat=19.4058242,
+            house_location_long=-99.1671942
+        )
+        self.diner_4.diet_types.add(paleo_diet_type)
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='23:00:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        self.restaurant_1.diet_endorsement_types.add(vegan_diet_type)
+        self.restaurant_1_table_1 = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+        self.restaurant_1_table_2 = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+
+        # Reservations
+        reservation = Reservation(
+            datetime=datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc),
+            table=self.restaurant_1_table_1
+        )
+        reservation.save()
+        reservation.diners.add(self.diner_1)
+
+    def get_reservation_data(self, diners, target_datetime, table):
+        return {'diners': diners, 'target_datetime': target_datetime, 'table': table}
+
+    def post_batch(self, reservations):
+        request = self.factory.post(self.endpoint_path, {'reservations': reservations}, format='json')
+        return self.view(request)
+
+    def test_results_per_reservation(self):
+        resp = self.post_batch([
+            # Created
+            self.get_reservation_data([self.diner_2.id], '2100-11-03 17:00:00', self.restaurant_1_table_1.id),
+            # Occupied by the existing reservation
+            self.get_reservation_data([self.diner_3.id], '2100-11-03 15:00:00', self.restaurant_1_table_1.id),
+            # Occupied by the first reservation of the batch
+            self.get_reservation_data([self.diner_3.id], '2100-11-03 18:00:00', self.restaurant_1_table_1.id),
+            # The diner is in the first reservation of the batch
+            self.get_reservation_data([self.diner_2.id], '2100-11-03 18:00:00', self.restaurant_1_table_2.id),
+            # The diner is in the existing reservation
+            self.get_reservation_data([self.diner_1.id], '2100-11-03 15:00:00', self.restaurant_1_table_2.id),
+            # Diet restrictions
+            self.get_reservation_data([self.diner_4.id], '2100-11-04 15:00:00', self.restaurant_1_table_2.id),
+            # Capacity
+            {
+                'diners': [self.diner_1.id, self.diner_2.id, self.diner_3.id],
+                'target_datetime': '2100-11-05 15:00:00',
+                'table': self.restaurant_1_table_2.id
+            },
+            # Past time
+            self.get_reservation_data([self.diner_3.id], '2020-11-03 15:00:00', self.restaurant_1_table_2.id),
+            # Not existing diner
+            self.get_reservation_data([0], '2100-11-03 15:00:00', self.restaurant_1_table_2.id),
+            # Created
+            {
+                'diners': [self.diner_1.id, self.diner_3.id],
+                'target_datetime': '2100-11-04 15:00:00',
+                'table': self.restaurant_1_table_2.id
+            },
+        ])
+
+        self.assertEqual(200, resp.status_code)
+        results = resp.data['results']
+        self.assertEqual(
+            [200, 409, 409, 409, 409, 409, 409, 409, 400, 200],
+            [result['status_code'] for result in results]
+        )
+        self.assertEqual(
+            ['40904', '40904', '40901', '40901', '40905', '40903', '40902'],
+            [result['errors']['internal_error_code'] for result in results[1:8]]
+        )
+        self.assertEqual({'diners': ['Invalid pk "0" - object does not exist.']}, results[8]['errors']['field_errors'])
+
+        self.assertEqual(3, Reservation.objects.count())
+        first_reservation = Reservation.objects.get(id=results[0]['reservation']['id'])
+        self.assertEqual([self.diner_2.id], results[0]['reservation']['diners'])
+        self.assertEqual(
+            datetime(year=2100, month=11, day=3, hour=19, minute=0, tzinfo=timezone.utc),
+            first_reservation.end_datetime
+        )
+        self.assertEqual(
+            {self.diner_1.id, self.diner_3.id},
+            set(Reservation.objects.get(id=results[9]['reservation']['id']).diners.values_list('id', flat=True))
+        )
+
+    def test_invalid_batch(self):
+        resp = self.post_batch([])
+
+        self.assertEqual(400, resp.status_code)
+        self.assertIn('reservations', resp.data['errors']['field_errors'])
+
+    def test_validation_queries_qty_doesnt_depend_on_batch_size(self):
+        queries_qties = []
+        start_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0)
+
+        for batch_size in (2, 20):
+            # Every reservation overlaps the existing one, so nothing is inserted
+            reservations = [
+                {
+                    'diners': [self.diner_2.id, self.diner_3.id],
+                    'target_datetime': (start_datetime + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'),
+                    'table': self.restaurant_1_table_1.id
+                }
+                for i in range(batch_size)
+            ]
+
+            with CaptureQueriesContext(connection) as context:
+                resp = self.post_batch(reservations)
+            queries_qties.append(len(context.captured_queries))
+
+            self.assertEqual([409] * batch_size, [result['status_code'] for result in resp.data['results']])
+
+        self.assertEqual(queries_qties[0], queries_qties[1])
@@ -0,0 +1,42 @@
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from restaurants.signals import check_idle_database_connections, record_database_connections_use
+
+
+@override_settings(DB_CONN_HEALTH_CHECK_IDLE_SECONDS=30)
+class DatabaseConnectionsHealthChecksTest(TestCase):
+
+    def setUp(self):
+        # The connection of the test is open, and its last request finished now
+        connection.ensure_connection()
+        record_database_connections_use(sender=None)
+        self.addCleanup(delattr, connection, 'health_check_idle_since')
+
+    def check_idle_database_connections(self, usable, idle_seconds):
+        with mock.patch.object(connection, 'is_usable', return_value=usable) as is_usable, \
+                mock.patch.object(connection, 'close') as close, \
+                mock.patch.object(time, 'monotonic', return_value=connection.health_check_idle_since + idle_seconds):
+            check_idle_database_connections(sender=None)
+        return is_usable, close
+
+    def test_unusable_idle_connection_closed(self):
+        is_usable, close = self.check_idle_database_connections(usable=False, idle_seconds=31)
+        is_usable.assert_called_once_with()
+        close.assert_called_once_with()
+
+    def test_usable_idle_connection_kept(self):
+        _, close = self.check_idle_database_connections(usable=True, idle_seconds=31)
+        close.assert_not_called()
+
+    def test_recently_used_connection_not_checked(self):
+        is_usable, close = self.check_idle_database_connections(usable=False, idle_seconds=30)
+        is_usable.assert_not_called()
+        close.assert_not_called()
+
+    @override_settings(DB_CONN_HEALTH_CHECK_IDLE_SECONDS=0)
+    def test_disabled(self):
+        is_usable, _ = self.check_idle_database_connections(usable=False, idle_seconds=3600)
+        is_usable.assert_not_called()
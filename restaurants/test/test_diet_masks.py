@@ -0,0 +1,150 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from restaurants.models import DietType, Diner, Restaurant, Table
+from restaurants.models.diettype import diet_types_max_qty
+import restaurants.services.restaurants_service
+
+
+class DietMasksTest(TestCase):
+    def setUp(self):
+        # Diet types
+        self.vegan_diet_type = DietType.objects.create(name='Vegan')
+        self.paleo_diet_type = DietType.objects.create(name='Paleo')
+        self.gluten_free_diet_type = DietType.objects.create(name='Gluten-Free')
+
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+
+    def get_diet_types_mask(self, *diet_types):
+        return sum(1 << diet_type.bit for diet_type in diet_types)
+
+    def test_diet_types_get_different_bits(self):
+        self.assertEqual(
+            len({self.vegan_diet_type.bit, self.paleo_diet_type.bit, self.gluten_free_diet_type.bit}),
+            3
+        )
+
+    def test_diet_types_limit(self):
+        DietType.objects.bulk_create([
+            DietType(name='Diet {}'.format(bit), bit=bit) for bit in range(3, diet_types_max_qty)
+        ])
+
+        diet_type = DietType(name='One too many')
+        with self.assertRaises(ValidationError):
+            diet_type.full_clean()
+        with self.assertRaises(ValueError):
+            diet_type.save()
+
+    def test_masks_follow_diet_types_changes(self):
+        self.restaurant_1.diet_endorsement_types.add(self.vegan_diet_type, self.paleo_diet_type)
+        self.diner_1.diet_types.add(self.gluten_free_diet_type)
+        self.restaurant_1.refresh_from_db()
+        self.diner_1.refresh_from_db()
+        self.assertEqual(
+            self.restaurant_1.diet_endorsement_mask,
+            self.get_diet_types_mask(self.vegan_diet_type, self.paleo_diet_type)
+        )
+        self.assertEqual(self.diner_1.diet_types_mask, self.get_diet_types_mask(self.gluten_free_diet_type))
+
+        self.restaurant_1.diet_endorsement_types.remove(self.vegan_diet_type)
+        self.restaurant_1.refresh_from_db()
+        self.assertEqual(self.restaurant_1.diet_endorsement_mask, self.get_diet_types_mask(self.paleo_diet_type))
+
+        self.restaurant_1.diet_endorsement_types.clear()
+        self.restaurant_1.refresh_from_db()
+        self.assertEqual(self.restaurant_1.diet_endorsement_mask, 0)
+
+    def test_masks_follow_reverse_diet_types_changes(self):
+        self.vegan_diet_type.restaurant_set.add(self.restaurant_1)
+        self.vegan_diet_type.diner_set.add(self.diner_1)
+        self.restaurant_1.refresh_from_db()
+        self.diner_1.refresh_from_db()
+        self.assertEqual(self.restaurant_1.diet_endorsement_mask, self.get_diet_types_mask(self.vegan_diet_type))
+        self.assertEqual(self.diner_1.diet_types_mask, self.get_diet_types_mask(self.vegan_diet_type))
+
+        self.vegan_diet_type.restaurant_set.clear()
+        self.restaurant_1.refresh_from_db()
+        self.assertEqual(self.restaurant_1.diet_endorsement_mask, 0)
+
+    def test_masks_follow_diet_types_deletion(self):
+        self.restaurant_1.diet_endorsement_types.add(self.vegan_diet_type, self.paleo_diet_type)
+        self.diner_1.diet_types.add(self.vegan_diet_type)
+        paleo_mask = self.get_diet_types_mask(self.paleo_diet_type)
+
+        self.vegan_diet_type.delete()
+        self.restaurant_1.refresh_from_db()
+        self.diner_1.refresh_from_db()
+        self.assertEqual(self.restaurant_1.diet_endorsement_mask, paleo_mask)
+        self.assertEqual(self.diner_1.diet_types_mask, 0)
+
+        # The bit of the deleted diet type is reused
+        self.assertEqual(DietType.objects.create(name='Keto').bit, 0)
+
+
+class FindRestaurantsDietMaskQueriesTest(TestCase):
+    max_diet_types_qty = 10
+
+    def setUp(self):
+        self.diet_types = [
+            DietType.objects.create(name='Diet {}'.format(i)) for i in range(self.max_diet_types_qty)
+        ]
+
+        self.restaurant_1 = Restaurant.objects.create(
+            name='All diets',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=23.530291579403467,
+            location_long=-68.88613776794003
+        )
+        self.restaurant_1.diet_endorsement_types.add(*self.diet_types)
+        Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='First diet',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=23.93258423336848,
+            location_long=-60.36074714271186
+        )
+        self.restaurant_2.diet_endorsement_types.add(self.diet_types[0])
+        Table.objects.create(capacity=2, restaurant=self.restaurant_2)
+
+    def test_queries_qty_doesnt_depend_on_diet_types_qty(self):
+        queries_qties = []
+
+        for diet_types_qty in range(1, self.max_diet_types_qty + 1):
+            diner = Diner.objects.create(
+                name='Diner {}'.format(diet_types_qty),
+                house_location_lat=19.4349474,
+                house_location_long=-99.1419256
+            )
+            diner.diet_types.add(*self.diet_types[:diet_types_qty])
+
+            with CaptureQueriesContext(connection) as context:
+                restaurants_ids = [
+                    restaurant.id for restaurant in
+                    restaurants.services.restaurants_service.find_restaurants(diners=[diner.id])
+                ]
+            queries_qties.append(len(context.captured_queries))
+
+            expected_restaurants_ids = [self.restaurant_1.id]
+            if diet_types_qty == 1:
+                expected_restaurants_ids.append(self.restaurant_2.id)
+            self.assertEqual(sorted(restaurants_ids), sorted(expected_restaurants_ids))
+
+        self.assertEqual(len(set(queries_qties)), 1)
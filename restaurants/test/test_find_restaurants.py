@@ -149,7 +149,7 @@ class FindRestaurantsTestOR(TestCase):
         # looking for: vegetarian OR gluten
         diners = [self.diner_5.id, self.diner_2.id]
         restaurants_qs = restaurants.services.restaurants_service.find_restaurants(diners=diners, or_version=True)
-        restaurants_ids = restaurants_qs.values_list('id', flat=True)
+        restaurants_ids = restaurants_qs.ids
         self.assertEqual(restaurants_qs.count(), 4)
         self.assertTrue(self.restaurant_1.id in restaurants_ids)
         self.assertTrue(self.restaurant_2.id in restaurants_ids)
@@ -160,7 +160,7 @@ class FindRestaurantsTestOR(TestCase):
         # looking for: (vegetarian OR gluten) AND vegetarian AND vegan
         diners = [self.diner_5.id, self.diner_6.id, self.diner_2.id, self.diner_1.id]
         restaurants_qs = restaurants.services.restaurants_service.find_restaurants(diners=diners, or_version=True)
-        restaurants_ids = restaurants_qs.values_list('id', flat=True)
+        restaurants_ids = restaurants_qs.ids
         self.assertEqual(restaurants_qs.count(), 1)
         self.assertTrue(self.restaurant_1.id in restaurants_ids)
 
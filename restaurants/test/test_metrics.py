@@ -0,0 +1,156 @@
+import threading
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from restaurants.middleware import MetricsMiddleware
+from restaurants.models import Diner, Restaurant, Table
+from restaurants.models.reservation import Reservation
+from restaurants.services import metrics, search_cache
+from restaurants.services.ranking import RankedRestaurants
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('test_duration_seconds', 'Test.', ['function'], buckets=[0.1, 1.0])
+        for value in [0.05, 0.1, 0.5, 5.0]:
+            histogram.observe(value, function='find')
+
+        self.assertEqual(4, histogram.get_count(function='find'))
+        self.assertEqual(0, histogram.get_count(function='book'))
+        self.assertEqual([
+            ('test_duration_seconds_bucket', '{function="find",le="0.1"}', 2),
+            ('test_duration_seconds_bucket', '{function="find",le="1.0"}', 3),
+            ('test_duration_seconds_bucket', '{function="find",le="+Inf"}', 4),
+            ('test_duration_seconds_sum', '{function="find"}', 5.65),
+            ('test_duration_seconds_count', '{function="find"}', 4),
+        ], histogram.get_samples())
+
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter('test_total', 'Test "counter".', ['code']))
+        counter.inc(code='40901')
+        counter.inc(2, code='40901')
+        registry.register_collector(lambda: [('test_hits_total', 'counter', 'Hits.', 7)])
+
+        self.assertEqual(
+            '# HELP test_total Test "counter".\n'
+            '# TYPE test_total counter\n'
+            'test_total{code="40901"} 3\n'
+            '# HELP test_hits_total Hits.\n'
+            '# TYPE test_hits_total counter\n'
+            'test_hits_total 7\n',
+            registry.render()
+        )
+
+    def test_concurrent_increments(self):
+        counter = metrics.Counter('test_total', 'Test.', ['code'])
+        histogram = metrics.Histogram('test_seconds', 'Test.')
+
+        def increment():
+            for _ in range(1000):
+                counter.inc(code='40901')
+                histogram.observe(0.01)
+
+        threads = [threading.Thread(target=increment) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(8000, counter.get(code='40901'))
+        self.assertEqual(8000, histogram.get_count())
+
+    def test_disabled(self):
+        with override_settings(METRICS_ENABLED=False), self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(get_response=lambda request: None)
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsEndpointTest(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        cache.clear()
+        search_cache.reset_stats()
+
+        self.diner = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        restaurant = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        self.table = Table.objects.create(capacity=2, restaurant=restaurant)
+
+    def get_metrics(self) -> str:
+        resp = self.client.get('/metrics')
+        self.assertEqual(200, resp.status_code)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain'))
+        return resp.content.decode()
+
+    def test_views_and_services(self):
+        self.client.get('/api/v1/restaurants/', {'diners': [self.diner.id]})
+
+        self.assertEqual(1, metrics.view_responses.get(view='RestaurantsView', method='GET', status_code=200))
+        self.assertEqual(1, metrics.view_duration.get_count(view='RestaurantsView', method='GET'))
+        self.assertEqual(1, metrics.view_db_queries.get_count(view='RestaurantsView'))
+        self.assertEqual(1, metrics.service_duration.get_count(function='find_restaurants'))
+
+        rendered_metrics = self.get_metrics()
+        self.assertIn(
+            'restaurants_view_responses_total{view="RestaurantsView",method="GET",status_code="200"} 1\n',
+            rendered_metrics
+        )
+        self.assertIn('restaurants_service_duration_seconds_count{function="find_restaurants"} 1\n', rendered_metrics)
+
+    def test_search_duration_includes_the_page(self):
+        def get_page_after(queryset, after, qty):
+            time.sleep(0.03)
+            return []
+
+        with mock.patch.object(RankedRestaurants, 'get_page_after', autospec=True, side_effect=get_page_after):
+            self.client.get('/api/v1/restaurants/', {'diners': [self.diner.id]})
+
+        # The ranking is read when the page is, after find_restaurants returns
+        samples = dict(((name, labels), value) for name, labels, value in metrics.service_duration.get_samples())
+        self.assertGreaterEqual(
+            samples[('restaurants_service_duration_seconds_sum', '{function="find_restaurants"}')], 0.03
+        )
+
+    def test_business_errors(self):
+        target_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc)
+        reservation = Reservation.objects.create(table=self.table, datetime=target_datetime)
+        reservation.diners.add(self.diner)
+
+        resp = self.client.post('/api/v1/reservations/', {
+            'diners': [self.diner.id],
+            'table': self.table.id,
+            'target_datetime': target_datetime.strftime('%Y-%m-%d %H:%M:%S')
+        }, content_type='application/json')
+
+        self.assertEqual(409, resp.status_code)
+        error_code = resp.data['errors']['internal_error_code']
+        self.assertEqual(1, metrics.business_errors.get(code=error_code))
+        self.assertIn('restaurants_business_errors_total{{code="{}"}} 1\n'.format(error_code), self.get_metrics())
+
+    @override_settings(FIND_RESTAURANTS_CACHE_ENABLED=True)
+    def test_search_cache(self):
+        for _ in range(2):
+            self.client.get('/api/v1/restaurants/', {'diners': [self.diner.id]})
+
+        rendered_metrics = self.get_metrics()
+        self.assertIn('restaurants_search_cache_hits_total 1\n', rendered_metrics)
+        self.assertIn('restaurants_search_cache_misses_total 1\n', rendered_metrics)
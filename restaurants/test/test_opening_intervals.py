@@ -0,0 +1,117 @@
+from datetime import datetime, time
+
+from django.test import TestCase
+from restaurants.models import Restaurant, Table
+from restaurants.models.opening_interval import OpeningInterval, get_opening_intervals, get_reservation_intervals, \
+    set_opening_intervals
+import restaurants.services.restaurants_service
+
+
+class OpeningIntervalsTest(TestCase):
+    def test_opening_intervals(self):
+        self.assertEqual([(450, 1320)], get_opening_intervals(time(7, 30), time(22)))
+        # Through midnight
+        self.assertEqual([(840, 1440), (0, 120)], get_opening_intervals(time(14), time(2)))
+        self.assertEqual([(840, 1440), (0, 0)], get_opening_intervals(time(14), time(0)))
+        # The partial minutes are not open
+        self.assertEqual([(841, 1320)], get_opening_intervals(time(14, 0, 30), time(22, 0, 30)))
+        self.assertEqual([], get_opening_intervals(time(14), time(14)))
+
+    def test_reservation_intervals(self):
+        self.assertEqual(
+            [(1260, 1380)],
+            get_reservation_intervals(datetime(2100, 11, 3, 21, 0), datetime(2100, 11, 3, 23, 0))
+        )
+        self.assertEqual(
+            [(1320, 1440), (0, 0)],
+            get_reservation_intervals(datetime(2100, 11, 3, 22, 0), datetime(2100, 11, 4, 0, 0))
+        )
+        # The partial minutes are reserved
+        self.assertEqual(
+            [(1350, 1440), (0, 31)],
+            get_reservation_intervals(datetime(2100, 11, 3, 22, 30, 30), datetime(2100, 11, 4, 0, 30, 30))
+        )
+
+    def test_intervals_follow_the_restaurant_hours(self):
+        restaurant = Restaurant.objects.create(
+            name='Lardo',
+            open_time='08:00:00',
+            close_time='23:00:00',
+            location_lat=19.4349474,
+            location_long=-99.1419256
+        )
+        self.assertEqual([(480, 1380)], list(restaurant.opening_intervals.values_list('start_minute', 'end_minute')))
+
+        restaurant.close_time = '01:00:00'
+        restaurant.save(update_fields=['close_time'])
+        self.assertEqual(
+            [(480, 1440), (0, 60)],
+            list(restaurant.opening_intervals.order_by('-start_minute').values_list('start_minute', 'end_minute'))
+        )
+
+        # The bulk created restaurants get them explicitly
+        Restaurant.objects.bulk_create([
+            Restaurant(name='Bulk', open_time='20:00:00', close_time='00:00:00', location_lat=0, location_long=0,
+                       grid_cell=0)
+        ])
+        bulk_restaurants = list(Restaurant.objects.filter(name='Bulk'))
+        set_opening_intervals(bulk_restaurants)
+        self.assertEqual(2, OpeningInterval.objects.filter(restaurant=bulk_restaurants[0]).count())
+
+
+class FindRestaurantsOpeningHoursTest(TestCase):
+    def setUp(self):
+        self.restaurant_until_midnight = Restaurant.objects.create(
+            name='No endorsement',
+            open_time='14:00:00',
+            close_time='00:00:00',
+            location_lat=19.247787407295091,
+            location_long=-99.14706284469599
+        )
+        Table.objects.create(capacity=2, restaurant=self.restaurant_until_midnight)
+
+        self.restaurant_through_midnight = Restaurant.objects.create(
+            name='Late',
+            open_time='20:00:00',
+            close_time='02:00:00',
+            location_lat=19.4349474,
+            location_long=-99.1419256
+        )
+        Table.objects.create(capacity=2, restaurant=self.restaurant_through_midnight)
+
+        self.restaurant_until_late = Restaurant.objects.create(
+            name='Paleo',
+            open_time='14:00:00',
+            close_time='23:59:00',
+            location_lat=19.4349474,
+            location_long=-99.1419256
+        )
+        Table.objects.create(capacity=2, restaurant=self.restaurant_until_late)
+
+    def find_restaurants_ids(self, target_datetime: str) -> set:
+        return set(restaurants.services.restaurants_service.find_restaurants(
+            target_datetime=target_datetime
+        ).values_list('id', flat=True))
+
+    def test_reservation_until_midnight(self):
+        self.assertEqual(
+            {self.restaurant_until_midnight.id, self.restaurant_through_midnight.id, self.restaurant_until_late.id},
+            self.find_restaurants_ids('2100-11-03 21:00:00')
+        )
+        self.assertEqual(
+            {self.restaurant_until_midnight.id, self.restaurant_through_midnight.id},
+            self.find_restaurants_ids('2100-11-03 22:00:00')
+        )
+
+    def test_reservation_through_midnight(self):
+        self.assertEqual({self.restaurant_through_midnight.id}, self.find_restaurants_ids('2100-11-03 23:00:00'))
+        self.assertEqual({self.restaurant_through_midnight.id}, self.find_restaurants_ids('2100-11-04 00:00:00'))
+        self.assertEqual(set(), self.find_restaurants_ids('2100-11-04 00:00:30'))
+
+    def test_reservation_before_the_opening(self):
+        self.assertEqual(
+            {self.restaurant_until_midnight.id, self.restaurant_until_late.id},
+            self.find_restaurants_ids('2100-11-03 14:00:00')
+        )
+        self.assertEqual(set(), self.find_restaurants_ids('2100-11-03 13:59:00'))
+
@@ -0,0 +1,60 @@
+import io
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from restaurants.models import Diner, Restaurant, Table
+from restaurants.models.diettype import get_diet_types_mask
+from restaurants.models.opening_interval import OpeningInterval
+from restaurants.models.reservation import Reservation
+
+
+class PopulateDbTest(TestCase):
+    def setUp(self):
+        call_command('populatedb', restaurants=40, diners=100, reservations=300, days=5, chunk_size=64, seed=7,
+                     stdout=io.StringIO())
+
+    def test_amounts(self):
+        self.assertEqual(40, Restaurant.objects.count())
+        self.assertEqual(100, Diner.objects.count())
+        self.assertEqual(300, Reservation.objects.count())
+        self.assertFalse(Restaurant.objects.filter(table__isnull=True).exists())
+        self.assertEqual(
+            40, OpeningInterval.objects.values('restaurant_id').distinct().count()
+        )
+
+    def test_diet_masks_match_the_through_rows(self):
+        for restaurant in Restaurant.objects.prefetch_related('diet_endorsement_types'):
+            self.assertEqual(
+                get_diet_types_mask(diet_type.bit for diet_type in restaurant.diet_endorsement_types.all()),
+                restaurant.diet_endorsement_mask
+            )
+        for diner in Diner.objects.prefetch_related('diet_types'):
+            self.assertEqual(
+                get_diet_types_mask(diet_type.bit for diet_type in diner.diet_types.all()),
+                diner.diet_types_mask
+            )
+
+    def test_reservations_dont_overlap(self):
+        self.assertFalse(Reservation.objects.values('table_id', 'datetime').annotate(
+            qty=Count('id')
+        ).filter(qty__gt=1).exists())
+        self.assertFalse(Reservation.diners.through.objects.values('diner_id', 'reservation__datetime').annotate(
+            qty=Count('id')
+        ).filter(qty__gt=1).exists())
+
+        for reservation in Reservation.objects.select_related('table').annotate(diners_qty=Count('diners')):
+            self.assertTrue(1 <= reservation.diners_qty <= reservation.table.capacity)
+            self.assertEqual(reservation.datetime.minute % 15, 0)
+
+    def test_same_seed_same_data(self):
+        restaurants = list(Restaurant.objects.order_by('id').values_list('name', 'location_lat', 'location_long'))
+        Table.objects.all().delete()
+        Restaurant.objects.all().delete()
+        Diner.objects.all().delete()
+        call_command('populatedb', restaurants=40, diners=100, days=5, chunk_size=64, seed=7, stdout=io.StringIO())
+
+        self.assertEqual(
+            restaurants,
+            list(Restaurant.objects.order_by('id').values_list('name', 'location_lat', 'location_long'))
+        )
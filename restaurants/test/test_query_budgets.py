@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from restaurants.api.pagination import RestaurantsCursorPagination
+from restaurants.models import DietType, Diner, Restaurant, Table
+from restaurants.models.reservation import Reservation
+import restaurants.api.views
+
+# Query budgets of the endpoints. They must not depend on the page size, the amount of diners or the amount of diet
+# types, a change that adds queries per restaurant, diner or diet type (an N+1) breaks these tests
+restaurants_page_budget = 2  # restaurants page, diet types of the page
+ranked_restaurants_page_budget = 4  # diners, ranking, restaurants page, diet types of the page
+restaurants_count_budget = 1
+reservation_budget = 11  # the booking (see CreateReservationQueriesTest), diners of the response
+best_fit_reservation_budget = 12  # the booking, candidate tables, diners of the response
+reservation_delete_budget = 3  # reservation, its diners relations, the reservation delete
+available_slots_budget = 6  # diners, ranking, restaurants, tables, reservations, diet types of the restaurants
+reservations_batch_budget = 12  # the booking of the whole batch, diners of the response
+search_cache_stats_budget = 0
+
+
+class QueryBudgetsTest(TestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.target_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc)
+        self.diet_types = []
+        self.diners = []
+        self.restaurants = []
+        self.tables = []
+
+        self.grow(diet_types_qty=2, diners_qty=2, restaurants_qty=25)
+
+    def grow(self, diet_types_qty, diners_qty, restaurants_qty):
+        """Adds diet types, diners and restaurants to the fixture, every new one with all the diet types."""
+        start = len(self.restaurants)
+        self.diet_types.extend([
+            DietType.objects.create(name='Diet {}'.format(len(self.diet_types) + i)) for i in range(diet_types_qty)
+        ])
+
+        for i in range(diners_qty):
+            diner = Diner.objects.create(
+                name='Diner {}'.format(len(self.diners)),
+                house_location_lat=19.4 + i * 0.001,
+                house_location_long=-99.1 - i * 0.001
+            )
+            diner.diet_types.add(*self.diet_types)
+            self.diners.append(diner)
+
+        for i in range(start, start + restaurants_qty):
+            restaurant = Restaurant.objects.create(
+                name='Restaurant {}'.format(i),
+                open_time='08:00:00',
+                close_time='23:00:00',
+                location_lat=19.3 + i * 0.01,
+                location_long=-99.2 + i * 0.01
+            )
+            restaurant.diet_endorsement_types.add(*self.diet_types)
+            self.restaurants.append(restaurant)
+            self.tables.append(Table.objects.create(capacity=50, restaurant=restaurant))
+
+        # The older restaurants endorse every diet type too
+        for restaurant in self.restaurants[:start]:
+            restaurant.diet_endorsement_types.add(*self.diet_types)
+        for diner in self.diners[:len(self.diners) - diners_qty]:
+            diner.diet_types.add(*self.diet_types)
+
+    def get(self, view_class, path, query_params):
+        return view_class.as_view()(self.factory.get(path, query_params))
+
+    def assert_budget(self, budget, request, prepare=None):
+        """
+        Checks the budget of the request with a small page and a big one, before and after growing the fixture. The
+        result of prepare, called before every request without counting its queries, is passed to the request.
+        """
+        for grown in [False, True]:
+            if grown:
+                self.grow(diet_types_qty=6, diners_qty=18, restaurants_qty=40)
+            for page_size in [3, 20]:
+                with self.subTest(grown=grown, page_size=page_size), \
+                        mock.patch.object(RestaurantsCursorPagination, 'page_size', page_size):
+                    prepared = prepare() if prepare is not None else None
+                    with self.assertNumQueries(budget):
+                        resp = request(prepared) if prepare is not None else request()
+                    self.assertIn(resp.status_code, [200, 204])
+
+    def test_restaurants_without_diners(self):
+        self.assert_budget(restaurants_page_budget, lambda: self.get(
+            restaurants.api.views.RestaurantsView, 'api/v1/restaurants/', {}
+        ))
+
+    def get_restaurants(self, query_params):
+        return self.get(restaurants.api.views.RestaurantsView, 'api/v1/restaurants/', {
+            'diners': [diner.id for diner in self.diners],
+            **query_params
+        })
+
+    def test_ranked_restaurants(self):
+        self.assert_budget(ranked_restaurants_page_budget, lambda: self.get_restaurants({}))
+
+    def test_ranked_restaurants_matching_any_diet_type(self):
+        self.assert_budget(ranked_restaurants_page_budget, lambda: self.get_restaurants({'match': 'any'}))
+
+    def test_available_ranked_restaurants_with_count(self):
+        self.assert_budget(ranked_restaurants_page_budget + restaurants_count_budget, lambda: self.get_restaurants({
+            'target_datetime': self.target_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+            'count': 'true'
+        }))
+
+    def test_next_page_of_ranked_restaurants(self):
+        self.assert_budget(
+            ranked_restaurants_page_budget,
+            lambda next_link: restaurants.api.views.RestaurantsView.as_view()(self.factory.get(next_link)),
+            prepare=lambda: self.get_restaurants({}).data['next']
+        )
+
+    def post_reservation(self, data):
+        request = self.factory.post('api/v1/reservations/', {
+            'diners': [diner.id for diner in self.diners],
+            'target_datetime': self.target_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+            **data
+        }, format='json')
+        # Every booking is after the previous one, so the diners are always free
+        self.target_datetime += timedelta(hours=3)
+        return restaurants.api.views.ReservationsView.as_view()(request)
+
+    def test_reservation(self):
+        self.assert_budget(reservation_budget, lambda: self.post_reservation({'table': self.tables[0].id}))
+
+    def test_best_fit_reservation(self):
+        self.assert_budget(best_fit_reservation_budget, lambda: self.post_reservation({
+            'restaurant': self.restaurants[0].id
+        }))
+
+    def test_reservation_delete(self):
+        def create_reservation():
+            reservation = Reservation.objects.create(table=self.tables[0], datetime=self.target_datetime)
+            reservation.diners.add(*self.diners)
+            self.target_datetime += timedelta(hours=3)
+            return reservation.id
+
+        self.assert_budget(
+            reservation_delete_budget,
+            lambda reservation_id: restaurants.api.views.ReservationsView.as_view()(
+                self.factory.delete('api/v1/reservations/{}'.format(reservation_id)), pk=reservation_id
+            ),
+            prepare=create_reservation
+        )
+
+    def test_available_slots(self):
+        self.assert_budget(available_slots_budget, lambda: self.get(
+            restaurants.api.views.RestaurantsAvailableSlotsView, 'api/v1/restaurants/available-slots/', {
+                'diners': [diner.id for diner in self.diners],
+                'window_start': '2100-11-03 12:00:00',
+                'window_end': '2100-11-03 20:00:00',
+            }
+        ))
+
+    def post_reservations_batch(self, batch_size):
+        reservations = []
+        for _ in range(batch_size):
+            reservations.append({
+                'diners': [diner.id for diner in self.diners],
+                'target_datetime': self.target_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+                'table': self.tables[0].id
+            })
+            self.target_datetime += timedelta(hours=3)
+        request = self.factory.post('api/v1/reservations/batch/', {'reservations': reservations}, format='json')
+        resp = restaurants.api.views.ReservationsBatchView.as_view()(request)
+        self.assertEqual([200] * batch_size, [result['status_code'] for result in resp.data['results']])
+        return resp
+
+    def test_reservations_batch(self):
+        # Every request books a bigger batch than the previous one
+        batch_sizes = iter([2, 5, 10, 20])
+        self.assert_budget(reservations_batch_budget, self.post_reservations_batch, prepare=lambda: next(batch_sizes))
+
+    def test_search_cache_stats(self):
+        self.assert_budget(search_cache_stats_budget, lambda: self.get(
+            restaurants.api.views.RestaurantsSearchCacheView, 'api/v1/restaurants/search-cache/', {}
+        ))
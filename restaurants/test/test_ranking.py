@@ -0,0 +1,144 @@
+import random
+
+from django.db.models import F, Value
+from django.db.models.functions import Sqrt, Power
+from django.test import TestCase
+from restaurants.models import Diner, Restaurant
+import restaurants.services.restaurants_service
+from restaurants.services.ranking import DistanceScorer, RankedRestaurants
+
+
+class DistanceScorerTest(TestCase):
+    def test_euclidean_distances(self):
+        scorer = DistanceScorer([(0, 0), (3, 0)])
+        distances = scorer.get_distances([0, 3], [4, 4])
+
+        self.assertEqual(distances.tolist(), [[4.0, 5.0], [5.0, 4.0]])
+        self.assertEqual(scorer.get_total_distances([0, 3], [4, 4]).tolist(), [9.0, 9.0])
+
+    def test_haversine_distances(self):
+        scorer = DistanceScorer([(0, 0)], metric='haversine')
+        distances = scorer.get_distances([0, 90], [1, 0])
+
+        self.assertAlmostEqual(distances[0][0], 111.195, places=2)
+        self.assertAlmostEqual(distances[0][1], 10007.557, places=2)
+
+
+class FindRestaurantsRankingTest(TestCase):
+    def setUp(self):
+        randomizer = random.Random(42)
+
+        self.diners = [
+            Diner.objects.create(
+                name='Diner {}'.format(i),
+                house_location_lat=randomizer.uniform(19.2, 19.6),
+                house_location_long=randomizer.uniform(-99.3, -99.0)
+            )
+            for i in range(3)
+        ]
+
+        for i in range(200):
+            Restaurant.objects.create(
+                name='Restaurant {}'.format(i),
+                open_time='07:30:00',
+                close_time='22:00:00',
+                location_lat=randomizer.uniform(19.0, 19.8),
+                location_long=randomizer.uniform(-99.5, -98.8)
+            )
+
+    def test_euclidean_order_is_the_same_as_the_database_order(self):
+        total_distance_expr = Value(0)
+        for diner in self.diners:
+            total_distance_expr += Sqrt(
+                Power(diner.house_location_lat - F('location_lat'), 2) +
+                Power(diner.house_location_long - F('location_long'), 2)
+            )
+        db_ordered_ids = list(
+            Restaurant.objects.annotate(
+                total_distance=total_distance_expr
+            ).order_by('total_distance', 'id').values_list('id', flat=True)
+        )
+
+        ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(
+            diners=[diner.id for diner in self.diners]
+        )
+
+        self.assertEqual(ranked_restaurants.ids, db_ordered_ids)
+
+    def test_ranked_restaurants_pages(self):
+        ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(
+            diners=[diner.id for diner in self.diners],
+            metric='haversine'
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(ranked_restaurants.count(), 200)
+
+        # Reading the restaurants locations to select the best 40, and then the restaurants of the page
+        with self.assertNumQueries(2):
+            page = ranked_restaurants[20:40]
+        self.assertEqual([restaurant.id for restaurant in page], ranked_restaurants.ids[20:40])
+        self.assertEqual(ranked_restaurants[-1].id, ranked_restaurants.ids[-1])
+
+        total_distances = [restaurant.total_distance for restaurant in ranked_restaurants]
+        self.assertEqual(total_distances, sorted(total_distances))
+
+    def test_top_k_is_the_same_as_the_sorted_ranking(self):
+        # Restaurants on the same location have the same total distance, the ties are sorted by id
+        for i in range(5):
+            Restaurant.objects.create(
+                name='Same location {}'.format(i),
+                open_time='07:30:00',
+                close_time='22:00:00',
+                location_lat=19.4,
+                location_long=-99.1
+            )
+
+        diners_ids = [diner.id for diner in self.diners]
+        sorted_ids = restaurants.services.restaurants_service.find_restaurants(diners=diners_ids).ids
+
+        for k in (1, 7, 50, 205, 300):
+            ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(diners=diners_ids)
+            ranked_restaurants.chunk_size = 16
+            self.assertEqual([restaurant.id for restaurant in ranked_restaurants[0:k]], sorted_ids[:k])
+
+            ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(diners=diners_ids, limit=k)
+            ranked_restaurants.chunk_size = 16
+            self.assertEqual(ranked_restaurants.ids, sorted_ids[:k])
+            self.assertEqual(ranked_restaurants.count(), min(k, 205))
+
+    def test_pages_after_a_key_of_a_known_ranking(self):
+        diners_ids = [diner.id for diner in self.diners]
+        ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(diners=diners_ids)
+        ids, total_distances, _ = ranked_restaurants.get_ranking()
+
+        cached_ranked_restaurants = RankedRestaurants.from_ranking(ids, total_distances)
+        after = (total_distances[29], ids[29])
+        self.assertEqual(
+            [restaurant.id for restaurant in cached_ranked_restaurants.get_page_after(after, 20)],
+            ids[30:50]
+        )
+
+        ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(diners=diners_ids)
+        self.assertEqual([restaurant.id for restaurant in ranked_restaurants.get_page_after(after, 20)], ids[30:50])
+
+    def test_restaurants_deleted_after_the_ranking_are_skipped(self):
+        diners_ids = [diner.id for diner in self.diners]
+        ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(diners=diners_ids)
+        ids, total_distances, _ = ranked_restaurants.get_ranking()
+        Restaurant.objects.filter(id=ids[1]).delete()
+
+        cached_ranked_restaurants = RankedRestaurants.from_ranking(ids, total_distances)
+        self.assertEqual([restaurant.id for restaurant in cached_ranked_restaurants[0:3]], [ids[0], ids[2]])
+        self.assertEqual(cached_ranked_restaurants[2].id, ids[2])
+        # The pages are filled with the next restaurants
+        self.assertEqual(
+            [restaurant.id for restaurant in cached_ranked_restaurants.get_page_after(None, 3)],
+            [ids[0], ids[2], ids[3]]
+        )
+        self.assertEqual(
+            [restaurant.id for restaurant in ranked_restaurants.get_page_after((total_distances[0], ids[0]), 2)],
+            [ids[2], ids[3]]
+        )
+        with self.assertRaises(LookupError):
+            cached_ranked_restaurants[1]
@@ -0,0 +1,250 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from restaurants.models import DietType, Diner, Restaurant, Table
+import restaurants.api.views
+import restaurants.services.restaurants_service
+
+
+class RestaurantsViewTest(TestCase):
+
+    endpoint_path = 'api/v1/restaurants/'
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = restaurants.api.views.RestaurantsView.as_view()
+
+        # Diet types
+        vegan_diet_type = DietType.objects.create(name='Vegan')
+        paleo_diet_type = DietType.objects.create(name='Paleo')
+        gluten_free_diet_type = DietType.objects.create(name='Gluten-Free')
+
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        self.diner_1.diet_types.add(vegan_diet_type, paleo_diet_type)
+
+        self.diner_2 = Diner.objects.create(
+            name='Tobias',
+            house_location_lat=19.4384214,
+            house_location_long=-99.2036906
+        )
+        self.diner_2.diet_types.add(gluten_free_diet_type)
+
+        self.diner_3 = Diner.objects.create(
+            name='Gob',
+            house_location_lat=19.3318331,
+            house_location_long=-99.2078983
+        )
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        self.restaurant_1.diet_endorsement_types.add(vegan_diet_type, gluten_free_diet_type)
+        Table.objects.create(capacity=20, restaurant=self.restaurant_1)
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='08:00:00',
+            close_time='23:00:00',
+            location_lat=23.93258423336848,
+            location_long=-60.36074714271186
+        )
+        self.restaurant_2.diet_endorsement_types.add(vegan_diet_type, paleo_diet_type, gluten_free_diet_type)
+        Table.objects.create(capacity=20, restaurant=self.restaurant_2)
+
+        self.restaurant_3 = Restaurant.objects.create(
+            name='Paleo',
+            open_time='14:00:00',
+            close_time='23:59:00',
+            location_lat=19.247787407295091,
+            location_long=-99.14706284469599
+        )
+        self.restaurant_3.diet_endorsement_types.add(paleo_diet_type)
+        Table.objects.create(capacity=20, restaurant=self.restaurant_3)
+
+    def get_restaurants(self, query_params):
+        request = self.factory.get(self.endpoint_path, query_params)
+        return self.view(request)
+
+    def test_match_all_diet_restrictions(self):
+        resp = self.get_restaurants({'diners': [self.diner_1.id, self.diner_2.id]})
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual([self.restaurant_2.id], [restaurant['id'] for restaurant in resp.data['results']])
+
+    def test_match_any_diet_restriction(self):
+        resp = self.get_restaurants({'diners': [self.diner_1.id, self.diner_2.id, self.diner_3.id], 'match': 'any'})
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(
+            [self.restaurant_1.id, self.restaurant_2.id],
+            [restaurant['id'] for restaurant in resp.data['results']]
+        )
+
+    def test_invalid_match(self):
+        resp = self.get_restaurants({'diners': [self.diner_1.id], 'match': 'some'})
+
+        self.assertEqual(400, resp.status_code)
+        self.assertIn('match', resp.data['errors']['field_errors'])
+
+    def test_invalid_diner(self):
+        resp = self.get_restaurants({'diners': [self.diner_1.id, 0]})
+
+        self.assertEqual(400, resp.status_code)
+        self.assertEqual(
+            {'diners': ['Invalid pk "0" - object does not exist.']},
+            resp.data['errors']['field_errors']
+        )
+
+    def test_max_distance_and_limit(self):
+        resp = self.get_restaurants({'diners': [self.diner_3.id], 'max_distance_km': 40, 'limit': 1})
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual([self.restaurant_3.id], [restaurant['id'] for restaurant in resp.data['results']])
+
+    def test_max_distance_without_diners(self):
+        resp = self.get_restaurants({'max_distance_km': 40})
+
+        self.assertEqual(400, resp.status_code)
+        self.assertIn('max_distance_km', resp.data['errors']['field_errors'])
+
+    def test_match_any_queries_qty_doesnt_depend_on_party_size(self):
+        queries_qties = []
+
+        for party_size in (2, 12):
+            diners_ids = [self.diner_1.id, self.diner_2.id]
+            for i in range(party_size - len(diners_ids)):
+                diner = Diner.objects.create(
+                    name='Diner {}'.format(i),
+                    house_location_lat=19.4349474,
+                    house_location_long=-99.1419256
+                )
+                diner.diet_types.add(*DietType.objects.all())
+                diners_ids.append(diner.id)
+
+            with CaptureQueriesContext(connection) as context:
+                resp = self.get_restaurants({'diners': diners_ids, 'match': 'any'})
+            queries_qties.append(len(context.captured_queries))
+
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual(
+                [self.restaurant_1.id, self.restaurant_2.id],
+                [restaurant['id'] for restaurant in resp.data['results']]
+            )
+
+        self.assertEqual(queries_qties[0], queries_qties[1])
+
+
+class RestaurantsViewPaginationTest(TestCase):
+
+    endpoint_path = 'api/v1/restaurants/'
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = restaurants.api.views.RestaurantsView.as_view()
+
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+
+        for i in range(50):
+            # Every 5 restaurants share the location, so there are ties on the total distance between pages
+            Restaurant.objects.create(
+                name='Restaurant {}'.format(i),
+                open_time='07:30:00',
+                close_time='22:00:00',
+                location_lat=19.4 + (i // 5) * 0.01,
+                location_long=-99.1
+            )
+
+    def get_restaurants(self, query_params):
+        request = self.factory.get(self.endpoint_path, query_params)
+        return self.view(request)
+
+    def get_all_pages(self, query_params):
+        pages = []
+        resp = self.get_restaurants(query_params)
+        while True:
+            self.assertEqual(200, resp.status_code)
+            pages.append([restaurant['id'] for restaurant in resp.data['results']])
+            if resp.data['next'] is None:
+                return pages
+            resp = self.view(self.factory.get(resp.data['next']))
+
+    def test_ranked_pages(self):
+        ranked_ids = restaurants.services.restaurants_service.find_restaurants(diners=[self.diner_1.id]).ids
+
+        pages = self.get_all_pages({'diners': [self.diner_1.id]})
+
+        self.assertEqual([20, 20, 10], [len(page) for page in pages])
+        self.assertEqual(ranked_ids, [restaurant_id for page in pages for restaurant_id in page])
+
+    def test_pages_are_full_when_ranked_restaurants_were_deleted(self):
+        ranked_ids = restaurants.services.restaurants_service.find_restaurants(diners=[self.diner_1.id]).ids
+        deleted_id = ranked_ids[5]
+        in_bulk = Restaurant.objects.in_bulk
+
+        def in_bulk_after_the_delete(ids):
+            # The restaurant is deleted after the ranking is read
+            return {restaurant_id: restaurant for restaurant_id, restaurant in in_bulk(ids).items()
+                    if restaurant_id != deleted_id}
+
+        with mock.patch.object(Restaurant.objects, 'in_bulk', side_effect=in_bulk_after_the_delete):
+            pages = self.get_all_pages({'diners': [self.diner_1.id]})
+
+        self.assertEqual([20, 20, 9], [len(page) for page in pages])
+        self.assertEqual(
+            [restaurant_id for restaurant_id in ranked_ids if restaurant_id != deleted_id],
+            [restaurant_id for page in pages for restaurant_id in page]
+        )
+
+    def test_unsorted_pages(self):
+        pages = self.get_all_pages({})
+
+        self.assertEqual([20, 20, 10], [len(page) for page in pages])
+        self.assertEqual(
+            list(Restaurant.objects.order_by('id').values_list('id', flat=True)),
+            [restaurant_id for page in pages for restaurant_id in page]
+        )
+
+    def test_pages_honor_the_limit(self):
+        pages = self.get_all_pages({'diners': [self.diner_1.id], 'limit': 25})
+        self.assertEqual([20, 5], [len(page) for page in pages])
+        self.assertEqual([20, 20], [len(page) for page in self.get_all_pages({'limit': 40})])
+
+    def test_deep_page_queries_qty_is_the_same_as_the_first_page(self):
+        with CaptureQueriesContext(connection) as context:
+            resp = self.get_restaurants({'diners': [self.diner_1.id]})
+        first_page_queries_qty = len(context.captured_queries)
+
+        # The second page is full as the first one, so both serialize the same amount of restaurants
+        with CaptureQueriesContext(connection) as context:
+            self.view(self.factory.get(resp.data['next']))
+        self.assertEqual(first_page_queries_qty, len(context.captured_queries))
+
+    def test_count_is_optional(self):
+        resp = self.get_restaurants({'diners': [self.diner_1.id]})
+        self.assertNotIn('count', resp.data)
+
+        resp = self.get_restaurants({'diners': [self.diner_1.id], 'count': 'true', 'limit': 30})
+        self.assertEqual(30, resp.data['count'])
+
+    def test_invalid_cursor(self):
+        resp = self.get_restaurants({'diners': [self.diner_1.id], 'cursor': 'not a cursor'})
+
+        self.assertEqual(400, resp.status_code)
+        self.assertIn('cursor', resp.data['errors']['field_errors'])
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import ExitStack, closing
+from datetime import datetime, timezone
+from unittest import mock, skipUnless
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from restaurants import routers
+from restaurants.middleware import PrimaryPinningMiddleware
+from restaurants.models import Diner, Restaurant, Table
+from restaurants.routers import PrimaryReplicaRouter, use_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_the_replicas(self):
+        self.assertIn(self.router.db_for_read(Restaurant), ['replica_1', 'replica_2'])
+        self.assertIn(Restaurant.objects.all().db, ['replica_1', 'replica_2'])
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual('default', self.router.db_for_write(Restaurant))
+        self.assertTrue(self.router.allow_migrate('default', 'restaurants'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'restaurants'))
+
+    def test_pinned_reads_go_to_the_primary(self):
+        with use_primary():
+            with use_primary():
+                self.assertEqual('default', Restaurant.objects.all().db)
+            self.assertEqual('default', Restaurant.objects.all().db)
+        self.assertNotEqual('default', Restaurant.objects.all().db)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertEqual('default', self.router.db_for_read(Restaurant))
+        with self.assertRaises(MiddlewareNotUsed):
+            PrimaryPinningMiddleware(get_response=lambda request: None)
+
+
+# The replicas are SQLite files with copies of the test database taken at different moments, like replicas that lag
+# differently behind the primary database. The reads of the test are not in a transaction, so they can be routed to them
+@skipUnless(connection.vendor == 'sqlite', 'The replicas are copies of a SQLite database.')
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], DATABASE_PRIMARY_PIN_SECONDS=5)
+class ReadReplicasTest(TransactionTestCase):
+
+    def setUp(self):
+        self.replicas_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.replicas_dir.cleanup)
+
+        self.diner = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        self.table = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+        self.copy_to_replica('replica_1')
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='00:00:00',
+            close_time='23:59:00',
+            location_lat=19.4384214,
+            location_long=-99.2036906
+        )
+        Table.objects.create(capacity=2, restaurant=self.restaurant_2)
+        self.copy_to_replica('replica_2')
+
+        self.target_datetime_str = datetime(year=2100, month=11, day=3, hour=14, tzinfo=timezone.utc).strftime(
+            '%Y-%m-%d %H:%M:%S'
+        )
+
+    def copy_to_replica(self, alias):
+        replica_path = os.path.join(self.replicas_dir.name, alias + '.sqlite3')
+        connection.ensure_connection()
+        with closing(sqlite3.connect(replica_path)) as replica_connection:
+            connection.connection.backup(replica_connection)
+
+        connections.databases[alias] = {**connections.databases['default'], 'NAME': replica_path}
+        self.addCleanup(self.remove_replica, alias)
+
+    def remove_replica(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+
+    def search(self, replica=None, **query_params):
+        """Returns the ids of the restaurants found and the databases that served the reads of the request."""
+        with ExitStack() as stack:
+            queries_by_database = {
+                alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in ['default', 'replica_1', 'replica_2']
+            }
+            if replica is not None:
+                stack.enter_context(mock.patch.object(routers.random, 'choice', return_value=replica))
+            resp = self.client.get('/api/v1/restaurants/', {'diners': [self.diner.id], **query_params})
+
+        self.assertEqual(200, resp.status_code)
+        return (
+            [restaurant['id'] for restaurant in resp.data['results']],
+            {alias for alias, queries in queries_by_database.items() if len(queries)}
+        )
+
+    def test_reads_of_a_request_stay_on_one_replica(self):
+        self.assertEqual(([self.restaurant_1.id], {'replica_1'}), self.search('replica_1'))
+        self.assertEqual(
+            ([self.restaurant_2.id, self.restaurant_1.id], {'replica_2'}),
+            self.search('replica_2')
+        )
+
+        for _ in range(10):
+            restaurants_ids, databases = self.search()
+            self.assertEqual(1, len(databases))
+            self.assertEqual(
+                [self.restaurant_1.id] if databases == {'replica_1'} else [self.restaurant_2.id, self.restaurant_1.id],
+                restaurants_ids
+            )
+
+    def test_reads_of_a_thread_stay_on_one_replica(self):
+        self.assertEqual(1, len({Restaurant.objects.all().db for _ in range(10)}))
+
+    def test_reads_in_a_transaction_go_to_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.restaurant_2, Restaurant.objects.get(id=self.restaurant_2.id))
+
+    def test_client_reads_its_writes(self):
+        resp = self.client.post('/api/v1/reservations/', {
+            'diners': [self.diner.id],
+            'table': self.table.id,
+            'target_datetime': self.target_datetime_str
+        }, content_type='application/json')
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual('5', str(self.client.cookies[PrimaryPinningMiddleware.cookie_name]['max-age']))
+
+        # The next requests of the client read the booking from the primary database, until the pin expires
+        self.assertEqual(
+            ([self.restaurant_2.id], {'default'}),
+            self.search(target_datetime=self.target_datetime_str)
+        )
+
+        del self.client.cookies[PrimaryPinningMiddleware.cookie_name]
+        self.assertEqual(
+            ([self.restaurant_1.id], {'replica_1'}),
+            self.search('replica_1', target_datetime=self.target_datetime_str)
+        )
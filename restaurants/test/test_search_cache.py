@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from restaurants.models import DietType, Diner, Restaurant, Table
+from restaurants.models.reservation import Reservation
+import restaurants.api.views
+import restaurants.services.restaurants_service
+import restaurants.services.search_cache
+
+
+@override_settings(FIND_RESTAURANTS_CACHE_ENABLED=True)
+class FindRestaurantsSearchCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        restaurants.services.search_cache.reset_stats()
+
+        self.target_datetime = datetime(year=2100, month=11, day=3, hour=14, minute=0, tzinfo=timezone.utc)
+
+        # Diet types
+        self.vegan_diet_type = DietType.objects.create(name='Vegan')
+
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+        self.diner_2 = Diner.objects.create(
+            name='Tobias',
+            house_location_lat=19.4384214,
+            house_location_long=-99.2036906
+        )
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        self.table_1 = Table.objects.create(capacity=2, restaurant=self.restaurant_1)
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='08:00:00',
+            close_time='23:00:00',
+            location_lat=23.93258423336848,
+            location_long=-60.36074714271186
+        )
+        self.restaurant_2.diet_endorsement_types.add(self.vegan_diet_type)
+        Table.objects.create(capacity=2, restaurant=self.restaurant_2)
+
+    def find_restaurants_ids(self, diners, target_datetime=None):
+        return restaurants.services.restaurants_service.find_restaurants(
+            diners=[diner.id for diner in diners],
+            target_datetime=target_datetime.strftime('%Y-%m-%d %H:%M:%S') if target_datetime else None
+        ).ids
+
+    def test_same_party_search_is_a_hit(self):
+        restaurants_ids = self.find_restaurants_ids([self.diner_1, self.diner_2])
+
+        # Only the diners are read
+        with self.assertNumQueries(1):
+            self.assertEqual(self.find_restaurants_ids([self.diner_2, self.diner_1]), restaurants_ids)
+
+        self.assertEqual(restaurants.services.search_cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_reservation_invalidates_its_days_searches(self):
+        self.assertEqual(
+            self.find_restaurants_ids([self.diner_1], self.target_datetime),
+            [self.restaurant_1.id, self.restaurant_2.id]
+        )
+        next_week_datetime = self.target_datetime + timedelta(days=7)
+        self.find_restaurants_ids([self.diner_1], next_week_datetime)
+
+        reservation = Reservation.objects.create(table=self.table_1, datetime=self.target_datetime + timedelta(hours=1))
+        self.assertEqual(self.find_restaurants_ids([self.diner_1], self.target_datetime), [self.restaurant_2.id])
+        self.find_restaurants_ids([self.diner_1], next_week_datetime)
+        self.assertEqual(restaurants.services.search_cache.get_stats(), {'hits': 1, 'misses': 3})
+
+        # Moving the reservation to another day frees the table in the target datetime again, the previous datetime
+        # is not read again
+        reservation = Reservation.objects.get(id=reservation.id)
+        reservation.datetime = self.target_datetime + timedelta(days=1)
+        with self.assertNumQueries(1):
+            reservation.save()
+        self.assertEqual(
+            self.find_restaurants_ids([self.diner_1], self.target_datetime),
+            [self.restaurant_1.id, self.restaurant_2.id]
+        )
+
+        # Moving it again, from the datetime it was saved with
+        next_day_datetime = self.target_datetime + timedelta(days=1)
+        self.assertEqual(self.find_restaurants_ids([self.diner_1], next_day_datetime), [self.restaurant_2.id])
+        reservation.datetime = self.target_datetime + timedelta(days=2)
+        reservation.save()
+        self.assertEqual(
+            self.find_restaurants_ids([self.diner_1], next_day_datetime),
+            [self.restaurant_1.id, self.restaurant_2.id]
+        )
+
+    def test_diner_diet_types_invalidate_the_diner_searches(self):
+        self.assertEqual(self.find_restaurants_ids([self.diner_1]), [self.restaurant_1.id, self.restaurant_2.id])
+        self.find_restaurants_ids([self.diner_2])
+
+        self.diner_1.diet_types.add(self.vegan_diet_type)
+        self.assertEqual(self.find_restaurants_ids([self.diner_1]), [self.restaurant_2.id])
+        self.find_restaurants_ids([self.diner_2])
+        self.assertEqual(restaurants.services.search_cache.get_stats(), {'hits': 1, 'misses': 3})
+
+    def test_restaurant_changes_invalidate_every_search(self):
+        self.find_restaurants_ids([self.diner_1])
+
+        self.restaurant_1.diet_endorsement_types.add(self.vegan_diet_type)
+        self.diner_1.diet_types.add(self.vegan_diet_type)
+        self.assertEqual(self.find_restaurants_ids([self.diner_1]), [self.restaurant_1.id, self.restaurant_2.id])
+
+        restaurant_3 = Restaurant.objects.create(
+            name='Paleo',
+            open_time='14:00:00',
+            close_time='23:59:00',
+            location_lat=19.4349474,
+            location_long=-99.1419256
+        )
+        restaurant_3.diet_endorsement_types.add(self.vegan_diet_type)
+        Table.objects.create(capacity=2, restaurant=restaurant_3)
+        self.assertEqual(
+            self.find_restaurants_ids([self.diner_1]),
+            [restaurant_3.id, self.restaurant_1.id, self.restaurant_2.id]
+        )
+
+        self.assertEqual(restaurants.services.search_cache.get_stats(), {'hits': 0, 'misses': 3})
+
+    def test_only_the_first_page_of_the_ranking_is_cached(self):
+        ranking_size = restaurants.services.search_cache.ranking_size
+        for i in range(ranking_size + 10):
+            Restaurant.objects.create(
+                name='Restaurant {}'.format(i),
+                open_time='07:30:00',
+                close_time='22:00:00',
+                location_lat=19.4 + i * 0.01,
+                location_long=-99.1
+            )
+        set_ranking = restaurants.services.search_cache.set_ranking
+        with mock.patch.object(restaurants.services.search_cache, 'set_ranking', wraps=set_ranking) as cached_ranking:
+            ranked_ids = self.find_restaurants_ids([self.diner_1])
+        ids, total_distances, is_complete = cached_ranking.call_args[0][1]
+        self.assertEqual(ranked_ids[:ranking_size], ids)
+        self.assertFalse(is_complete)
+
+        # The first page is read from the cached ranking, the next ones are ranked after its last restaurant
+        ranked_restaurants = restaurants.services.restaurants_service.find_restaurants(diners=[self.diner_1.id])
+        with self.assertNumQueries(1):
+            first_page = ranked_restaurants.get_page_after(None, ranking_size)
+        self.assertEqual(ranked_ids[:ranking_size], [restaurant.id for restaurant in first_page])
+        self.assertEqual(
+            ranked_ids[ranking_size:],
+            [restaurant.id for restaurant in ranked_restaurants.get_page_after((total_distances[-1], ids[-1]), 20)]
+        )
+        self.assertEqual(restaurants.services.search_cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_stats_view(self):
+        self.find_restaurants_ids([self.diner_1])
+        self.find_restaurants_ids([self.diner_1])
+
+        request = APIRequestFactory().get('api/v1/restaurants/search-cache/')
+        resp = restaurants.api.views.RestaurantsSearchCacheView.as_view()(request)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual({'enabled': True, 'hits': 1, 'misses': 1}, resp.data)
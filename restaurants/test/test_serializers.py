@@ -0,0 +1,57 @@
+from rest_framework.renderers import JSONRenderer
+from django.test import TestCase
+from restaurants.api.serializers import RestaurantSerializer, RestaurantReadSerializer
+from restaurants.models import DietType, Restaurant
+
+
+class RestaurantReadSerializerTest(TestCase):
+    def setUp(self):
+        # Diet types
+        vegan_diet_type = DietType.objects.create(name='Vegan')
+        paleo_diet_type = DietType.objects.create(name='Paleo')
+        gluten_free_diet_type = DietType.objects.create(name='Gluten-Free')
+
+        # Restaurants
+        restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        restaurant_1.diet_endorsement_types.add(vegan_diet_type, gluten_free_diet_type)
+
+        restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='08:00:00',
+            close_time='00:00:00',
+            location_lat=23,
+            location_long=-60.36074714271186
+        )
+        restaurant_2.diet_endorsement_types.add(vegan_diet_type, paleo_diet_type, gluten_free_diet_type)
+
+        Restaurant.objects.create(
+            name='Without diets',
+            open_time='14:00:00',
+            close_time='23:59:00',
+            location_lat=19.247787407295091,
+            location_long=-99.14706284469599
+        )
+
+    def test_same_json_as_restaurant_serializer(self):
+        restaurants_page = list(Restaurant.objects.order_by('id'))
+
+        self.assertEqual(
+            JSONRenderer().render(RestaurantSerializer(restaurants_page, many=True).data),
+            JSONRenderer().render(RestaurantReadSerializer(restaurants_page, many=True).data)
+        )
+        self.assertEqual(
+            JSONRenderer().render(RestaurantSerializer(restaurants_page[1]).data),
+            JSONRenderer().render(RestaurantReadSerializer(restaurants_page[1]).data)
+        )
+
+    def test_diet_types_of_the_page_in_a_single_query(self):
+        restaurants_page = list(Restaurant.objects.order_by('id'))
+
+        with self.assertNumQueries(1):
+            RestaurantReadSerializer(restaurants_page, many=True).data
@@ -0,0 +1,107 @@
+from django.test import TestCase
+from restaurants.models import Diner, Restaurant
+from restaurants.models.restaurant import get_grid_cell
+import restaurants.services.restaurants_service
+from restaurants.services.ranking import DistanceScorer
+from restaurants.services.spatial import get_bounding_box, get_party_bounding_box, get_grid_cells
+
+
+class SpatialTest(TestCase):
+    def test_bounding_box_contains_the_locations_at_the_distance(self):
+        for lat, long in ((19.43, -99.14), (-33.86, 151.2), (64.14, -21.94)):
+            bounding_box = get_bounding_box(lat, long, 10)
+            scorer = DistanceScorer([(lat, long)], metric='haversine')
+
+            for box_lat, box_long in ((bounding_box.min_lat, long), (bounding_box.max_lat, long),
+                                      (lat, bounding_box.min_long), (lat, bounding_box.max_long)):
+                self.assertGreaterEqual(scorer.get_total_distances([box_lat], [box_long])[0], 10 - 1e-6)
+
+    def test_bounding_box_crossing_the_antimeridian_covers_every_longitude(self):
+        bounding_box = get_bounding_box(0, 179.99, 10)
+        self.assertEqual((bounding_box.min_long, bounding_box.max_long), (-180, 180))
+        self.assertIsNone(get_grid_cells(bounding_box))
+
+    def test_party_bounding_box(self):
+        self.assertFalse(get_party_bounding_box([(19.43, -99.14), (19.5, -99.2)], 10).is_empty())
+        self.assertTrue(get_party_bounding_box([(19.43, -99.14), (25.67, -100.31)], 10).is_empty())
+
+    def test_grid_cells_cover_the_bounding_box(self):
+        bounding_box = get_bounding_box(19.43, -99.14, 10)
+        grid_cells = get_grid_cells(bounding_box)
+
+        self.assertIn(get_grid_cell(bounding_box.min_lat, bounding_box.min_long), grid_cells)
+        self.assertIn(get_grid_cell(bounding_box.max_lat, bounding_box.max_long), grid_cells)
+        self.assertIn(get_grid_cell(19.43, -99.14), grid_cells)
+        self.assertEqual(len(grid_cells), 9)
+
+
+class FindRestaurantsByDistanceTest(TestCase):
+    def setUp(self):
+        # Diners
+        self.diner_1 = Diner.objects.create(
+            name='Maeby',
+            house_location_lat=19.4349474,
+            house_location_long=-99.1419256
+        )
+
+        self.diner_2 = Diner.objects.create(
+            name='Tobias',
+            house_location_lat=19.4384214,
+            house_location_long=-99.2036906
+        )
+
+        # Restaurants
+        self.restaurant_1 = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.4195,
+            location_long=-99.1610
+        )
+
+        self.restaurant_2 = Restaurant.objects.create(
+            name='Lardo',
+            open_time='08:00:00',
+            close_time='23:00:00',
+            location_lat=19.4120,
+            location_long=-99.1713
+        )
+
+        self.restaurant_3 = Restaurant.objects.create(
+            name='Paleo',
+            open_time='14:00:00',
+            close_time='23:59:00',
+            location_lat=19.2478,
+            location_long=-99.1471
+        )
+
+        self.restaurant_4 = Restaurant.objects.create(
+            name='Far away',
+            open_time='14:00:00',
+            close_time='23:59:00',
+            location_lat=25.6866,
+            location_long=-100.3161
+        )
+
+    def test_find_restaurants_with_max_distance(self):
+        restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
+            diners=[self.diner_1.id, self.diner_2.id],
+            max_distance_km=10
+        )
+        self.assertEqual(restaurants_qs.ids, [self.restaurant_1.id, self.restaurant_2.id])
+
+        restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
+            diners=[self.diner_1.id],
+            max_distance_km=25
+        )
+        self.assertEqual(restaurants_qs.ids, [self.restaurant_1.id, self.restaurant_2.id, self.restaurant_3.id])
+
+    def test_find_restaurants_with_limit(self):
+        restaurants_qs = restaurants.services.restaurants_service.find_restaurants(
+            diners=[self.diner_1.id, self.diner_2.id],
+            limit=3
+        )
+        self.assertEqual(restaurants_qs.ids, [self.restaurant_1.id, self.restaurant_2.id, self.restaurant_3.id])
+
+        restaurants_qs = restaurants.services.restaurants_service.find_restaurants(limit=2)
+        self.assertEqual(restaurants_qs.count(), 2)
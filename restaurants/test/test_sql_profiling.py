@@ -0,0 +1,57 @@
+import json
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from restaurants.middleware import SQLProfilingMiddleware
+from restaurants.models import Restaurant, Table
+
+
+class SQLProfilingMiddlewareTest(TestCase):
+
+    endpoint_path = '/api/v1/restaurants/'
+
+    def setUp(self):
+        restaurant = Restaurant.objects.create(
+            name='Panadería Rosetta',
+            open_time='07:30:00',
+            close_time='22:00:00',
+            location_lat=19.530291579403467,
+            location_long=-99.18613776794003
+        )
+        Table.objects.create(capacity=2, restaurant=restaurant)
+
+    def get_server_timing_metrics(self, response) -> dict:
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    @override_settings(SQL_PROFILING_ENABLED=True)
+    def test_server_timing(self):
+        resp = self.client.get(self.endpoint_path)
+
+        self.assertEqual(200, resp.status_code)
+        metrics = self.get_server_timing_metrics(resp)
+        self.assertEqual(['db', 'db-slowest', 'serialize', 'render', 'total'], list(metrics))
+        # The restaurants page and the diet types of the page
+        self.assertEqual('"2 queries"', metrics['db']['desc'])
+        self.assertLessEqual(float(metrics['db']['dur']), float(metrics['total']['dur']))
+
+    @override_settings(SQL_PROFILING_ENABLED=True, SQL_PROFILING_LOG=True)
+    def test_log(self):
+        with self.assertLogs('restaurants.middleware', level='INFO') as logs:
+            self.client.get(self.endpoint_path, {'target_datetime': '2100-11-03 14:00:00'})
+
+        log_data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(('GET', self.endpoint_path, 200), (
+            log_data['method'], log_data['path'], log_data['status_code']
+        ))
+        self.assertEqual(2, log_data['queries'])
+        self.assertIn('SELECT', log_data['slowest_sql'])
+        self.assertIn('serialize_ms', log_data)
+
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.endpoint_path))
+        with self.assertRaises(MiddlewareNotUsed):
+            SQLProfilingMiddleware(get_response=lambda request: None)
@@ -1,7 +1,9 @@
 from django.urls import path, include
 
+from restaurants.views import metrics_view
 
 app_name = 'restaurants'
 urlpatterns = [
     path('api/v1/', include('restaurants.api.urls')),
+    path('metrics', metrics_view),
 ]
@@ -1,3 +1,9 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from restaurants.services import metrics
+
+
+@require_GET
+def metrics_view(request):
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
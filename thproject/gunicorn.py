@@ -0,0 +1,39 @@
+"""
+Gunicorn settings of the production profile (see docker-compose.prod.yml). Run it with:
+
+    gunicorn -c python:thproject.gunicorn thproject.wsgi
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# The searches spend most of their time ranking the restaurants in Python, which holds the GIL, so the requests are
+# served in parallel by processes: one worker per CPU, and one more to use the CPU while the others wait for the
+# database. More threads per worker only make the requests wait for the GIL, which raises the tail latency. Every
+# thread keeps its own database connection, so the database must accept workers * threads connections per instance
+workers = int(os.environ.get("GUNICORN_WORKERS", default=multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", default=1))
+worker_class = 'gthread'
+
+# The application is loaded once, before forking the workers, so they start faster and share its memory
+preload_app = bool(int(os.environ.get("GUNICORN_PRELOAD", default=1)))
+
+# Every worker is restarted after max_requests plus a random amount up to the jitter, which bounds the growth of its
+# memory without restarting all the workers at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", default=1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", default=100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", default=30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", default=5))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # The workers must not inherit the database connections opened while the application was preloaded
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
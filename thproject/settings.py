@@ -42,6 +42,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Only used when SQL_PROFILING_ENABLED is set
+    'restaurants.middleware.SQLProfilingMiddleware',
+    # Only used when METRICS_ENABLED is set
+    'restaurants.middleware.MetricsMiddleware',
+    # Only used when there are DATABASE_REPLICAS
+    'restaurants.middleware.PrimaryPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,9 +89,86 @@ DATABASES = {
         "PASSWORD": os.environ.get("SQL_PASSWORD", "password"),
         "HOST": os.environ.get("SQL_HOST", "localhost"),
         "PORT": os.environ.get("SQL_PORT", "5432"),
+        # Seconds a connection is kept open to be reused by the next requests of its thread, 0 closes it at the end of
+        # every request
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", default=0)),
     }
 }
 
+# Read replicas of the default database, as a space separated list of hosts (of database files with SQLite). The reads
+# of every request go to a replica chosen at random, see restaurants.routers
+DATABASE_REPLICAS = []
+for position, replica in enumerate(os.environ.get("SQL_REPLICAS", default="").split(), start=1):
+    replica_alias = 'replica_{}'.format(position)
+    DATABASES[replica_alias] = {
+        **DATABASES['default'],
+        ('NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'): replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(replica_alias)
+
+DATABASE_ROUTERS = ['restaurants.routers.PrimaryReplicaRouter']
+
+# Seconds the reads of a client go to the primary database after one of its writes, so it reads its own writes while
+# the replicas catch up
+DATABASE_PRIMARY_PIN_SECONDS = int(os.environ.get("DATABASE_PRIMARY_PIN_SECONDS", default=5))
+
+# The persistent connections idle for longer than these seconds are checked at the start of the next request of their
+# thread, and closed when they are no longer usable (e.g. the database closed them while they were idle), so the
+# request opens a new one instead of failing. The connections used more recently are not checked, 0 disables the checks
+DB_CONN_HEALTH_CHECK_IDLE_SECONDS = int(os.environ.get("DB_CONN_HEALTH_CHECK_IDLE_SECONDS", default=30))
+
+# In-memory table availability index used by the restaurants search. It is only updated by the writes of the process
+# that owns it, so it must only be enabled when a single process serves the API
+AVAILABILITY_INDEX_ENABLED = bool(int(os.environ.get("AVAILABILITY_INDEX_ENABLED", default=0)))
+AVAILABILITY_INDEX_HORIZON_DAYS = int(os.environ.get("AVAILABILITY_INDEX_HORIZON_DAYS", default=60))
+AVAILABILITY_INDEX_SLOT_MINUTES = int(os.environ.get("AVAILABILITY_INDEX_SLOT_MINUTES", default=15))
+
+# Bookings that fail because of a lock conflict (a deadlock, or a busy SQLite database) are retried up to this amount
+# of attempts
+RESERVATION_BOOKING_MAX_ATTEMPTS = int(os.environ.get("RESERVATION_BOOKING_MAX_ATTEMPTS", default=5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get("CACHE_BACKEND", default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get("CACHE_LOCATION", default='thproject'),
+    }
+}
+
+# Cache of the rankings of the restaurants searches with diners, invalidated by the writes through model signals. It
+# must use a cache shared by all the processes (e.g. the file based one) when more than one process serves the API
+FIND_RESTAURANTS_CACHE_ENABLED = bool(int(os.environ.get("FIND_RESTAURANTS_CACHE_ENABLED", default=0)))
+FIND_RESTAURANTS_CACHE_ALIAS = os.environ.get("FIND_RESTAURANTS_CACHE_ALIAS", default='default')
+FIND_RESTAURANTS_CACHE_TIMEOUT = int(os.environ.get("FIND_RESTAURANTS_CACHE_TIMEOUT", default=300))
+
+# The reservations that ended more than these days ago are moved to the archive by the archive_reservations command
+RESERVATIONS_RETENTION_DAYS = int(os.environ.get("RESERVATIONS_RETENTION_DAYS", default=30))
+
+# Profiling of the queries and the serialization of every request, added to a Server-Timing header and, with
+# SQL_PROFILING_LOG, logged as JSON by the restaurants.middleware logger
+SQL_PROFILING_ENABLED = bool(int(os.environ.get("SQL_PROFILING_ENABLED", default=0)))
+SQL_PROFILING_LOG = bool(int(os.environ.get("SQL_PROFILING_LOG", default=0)))
+
+# In-process metrics of the services and the views, exposed at /metrics
+METRICS_ENABLED = bool(int(os.environ.get("METRICS_ENABLED", default=0)))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'restaurants.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators